@@ -7,3 +7,77 @@ PROPERTY_SERVICE_URL = os.getenv("PROPERTY_SERVICE_URL", "http://localhost:3002"
 RESERVATION_SERVICE_URL = os.getenv("RESERVATION_SERVICE_URL", "http://localhost:3003")
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://localhost:3001")
 CHATBOT_PORT = int(os.getenv("CHATBOT_PORT", 8001))
+
+# Client HTTP partagé vers les services amont
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 2.0))
+PROPERTY_SERVICE_TIMEOUT = float(os.getenv("PROPERTY_SERVICE_TIMEOUT", 5.0))
+RESERVATION_SERVICE_TIMEOUT = float(os.getenv("RESERVATION_SERVICE_TIMEOUT", 5.0))
+
+# Cache du catalogue de propriétés (secondes)
+PROPERTY_CACHE_TTL = float(os.getenv("PROPERTY_CACHE_TTL", 30))
+PROPERTY_CACHE_STALE_TTL = float(os.getenv("PROPERTY_CACHE_STALE_TTL", 300))
+PROPERTY_CACHE_MAX_ENTRIES = int(os.getenv("PROPERTY_CACHE_MAX_ENTRIES", 1000))
+
+# Cache HTTP des GET amont (ETag / Last-Modified / Cache-Control), 0 = désactivé
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Réplique locale du catalogue pour la recherche (secondes entre deux synchronisations, 0 = à la demande)
+CATALOGUE_REFRESH_INTERVAL = float(os.getenv("CATALOGUE_REFRESH_INTERVAL", 30))
+
+# Index de disponibilité (secondes / nombre de propriétés indexées)
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", 15))
+AVAILABILITY_MAX_PROPERTIES = int(os.getenv("AVAILABILITY_MAX_PROPERTIES", 5000))
+
+# Recherche de propriétés libres (vérifications concurrentes)
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", 20))
+SEARCH_CALL_TIMEOUT = float(os.getenv("SEARCH_CALL_TIMEOUT", 2.0))
+
+# Traitement par lots (/api/chat/batch)
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", 16))
+CHAT_BATCH_MAX_SIZE = int(os.getenv("CHAT_BATCH_MAX_SIZE", 1000))
+
+# Sessions conversationnelles (memory | sqlite)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_TTL = float(os.getenv("SESSION_TTL", 1800))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 100000))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 64 * 1024 * 1024))
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "data/sessions.sqlite3")
+
+# Timeouts par endpoint amont (secondes, par défaut celui du service)
+ENDPOINT_TIMEOUTS = {
+    "properties.list": float(os.getenv("TIMEOUT_PROPERTIES_LIST", PROPERTY_SERVICE_TIMEOUT)),
+    "properties.get": float(os.getenv("TIMEOUT_PROPERTIES_GET", min(2.0, PROPERTY_SERVICE_TIMEOUT))),
+    "properties.delete": float(os.getenv("TIMEOUT_PROPERTIES_DELETE", PROPERTY_SERVICE_TIMEOUT)),
+    "reservations.mine": float(os.getenv("TIMEOUT_RESERVATIONS_MINE", RESERVATION_SERVICE_TIMEOUT)),
+    "reservations.all": float(os.getenv("TIMEOUT_RESERVATIONS_ALL", RESERVATION_SERVICE_TIMEOUT)),
+    "reservations.property": float(os.getenv("TIMEOUT_RESERVATIONS_PROPERTY", min(2.0, RESERVATION_SERVICE_TIMEOUT))),
+    "reservations.create": float(os.getenv("TIMEOUT_RESERVATIONS_CREATE", RESERVATION_SERVICE_TIMEOUT)),
+    "reservations.delete": float(os.getenv("TIMEOUT_RESERVATIONS_DELETE", RESERVATION_SERVICE_TIMEOUT)),
+}
+
+# Résilience: réessais des GET idempotents et disjoncteurs par service amont
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", 2))
+UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", 0.1))
+UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", 1.0))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))
+
+# Observabilité: propagation du contexte de trace W3C (traceparent) vers les services amont
+TRACE_PROPAGATION = os.getenv("TRACE_PROPAGATION", "true").lower() in ("1", "true", "yes")
+
+# Détection d'intention: keywords (règles seules) | hybrid (règles puis classifieur, nécessite numpy)
+INTENT_BACKEND = os.getenv("INTENT_BACKEND", "keywords").lower()
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "models/intent_classifier.npz")
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", 0.5))
+
+# Authentification: vérification locale des JWT d'auth-service (HS256, même JWT_SECRET qu'auth-service).
+# Pas de valeur par défaut: sans JWT_SECRET ni JWT_SECRET_FILE, aucun jeton n'est accepté
+JWT_SECRET = os.getenv("JWT_SECRET")
+# Fichier contenant le secret (prioritaire), relu périodiquement pour suivre les rotations (secondes)
+JWT_SECRET_FILE = os.getenv("JWT_SECRET_FILE")
+JWT_SECRET_REFRESH_INTERVAL = float(os.getenv("JWT_SECRET_REFRESH_INTERVAL", 300))
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", 10000))
@@ -1,14 +1,33 @@
-from fastapi import FastAPI, HTTPException
+import json
+from datetime import date
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Any
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, Any, List
 from app.services.chatbot_engine import ChatbotEngine
-from app.config import CHATBOT_PORT
+from app.services import auth, http_client, api_client, catalogue, intent_matcher, search
+from app.services.metrics import CONTENT_TYPE, RequestMetricsMiddleware, registry
+from app.services.tracing import TraceContextMiddleware
+from app.config import CHATBOT_PORT, CHAT_BATCH_MAX_SIZE
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ouvre le client HTTP partagé au démarrage et le ferme à l'arrêt"""
+    auth.check_configuration()
+    await http_client.start_client()
+    # Réplique du catalogue synchronisée en arrière-plan pour la recherche
+    catalogue.replica.start()
+    yield
+    await catalogue.replica.stop()
+    await http_client.close_client()
 
 app = FastAPI(
     title="Chatbot Service",
     description="Service de chatbot pour la plateforme de réservation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -20,14 +39,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Contexte de trace (traceparent) et métriques par route
+app.add_middleware(TraceContextMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
+# Compteurs des caches lus à chaque scrape de /metrics
+registry.collected(
+    "chat_cache_lookups_total", "Lectures des caches par résultat (hit, stale, miss)", ("cache", "result"),
+    lambda: {
+        (name, result): stats[key]
+        for name, stats in api_client.cache_stats().items()
+        for result, key in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))
+    },
+    kind="counter",
+)
+registry.collected(
+    "chat_cache_hit_ratio", "Part des lectures servies par le cache (frais ou périmé)", ("cache",),
+    lambda: {(name,): stats["hit_ratio"] for name, stats in api_client.cache_stats().items()},
+)
+registry.collected(
+    "chat_http_cache_lookups_total", "GET amont par résultat (fresh: sans requête, not_modified: 304, miss: 200)",
+    ("result",),
+    lambda: {
+        (result,): api_client.http_cache_stats()[key]
+        for result, key in (("fresh", "fresh_hits"), ("not_modified", "not_modified"), ("miss", "misses"))
+    },
+    kind="counter",
+)
+registry.collected(
+    "chat_http_cache_bytes", "Taille des corps gardés par le cache HTTP", (),
+    lambda: {(): api_client.http_cache_stats()["bytes"]},
+)
+registry.collected(
+    "chat_http_cache_saved_bytes_total", "Octets de corps non retéléchargés grâce au cache HTTP", (),
+    lambda: {(): api_client.http_cache_stats()["bytes_saved"]},
+    kind="counter",
+)
+registry.collected(
+    "chat_catalogue_documents", "Propriétés dans la réplique locale du catalogue", (),
+    lambda: {(): len(catalogue.replica.index)},
+)
+registry.collected(
+    "chat_catalogue_age_seconds", "Âge de la dernière synchronisation réussie de la réplique", (),
+    lambda: {(): catalogue.replica.stats()["age_s"]} if catalogue.replica.synced_at is not None else {},
+)
+registry.collected(
+    "chat_auth_token_checks_total", "Jetons JWT par résultat (hit: cache, verified: signature vérifiée, rejected: invalide)",
+    ("result",),
+    lambda: {(result,): auth.verifier.stats()[key] for result, key in (("hit", "hits"), ("verified", "verified"), ("rejected", "rejected"))},
+    kind="counter",
+)
+registry.collected(
+    "chat_upstream_circuit_open", "1 si le disjoncteur du service amont n'est pas fermé", ("upstream",),
+    lambda: {(name,): int(api_client.is_degraded(name)) for name in api_client.breakers},
+)
+
 # Instance du chatbot
 chatbot = ChatbotEngine()
 
 class ChatRequest(BaseModel):
     message: str
+    # Ignorés: l'identité vient du jeton vérifié (voir authenticated)
     user_id: Optional[str] = None
     token: Optional[str] = None
     user_role: Optional[str] = None
+    page: Optional[int] = Field(None, ge=1)
+    session_id: Optional[str] = None
+
+def authenticated(request: ChatRequest) -> dict:
+    """Paramètres du moteur, avec user_id et user_role tirés des claims du JWT vérifié"""
+    return {**request.model_dump(), **auth.identify(request.token)}
 
 class ChatResponse(BaseModel):
     intent: str
@@ -35,6 +116,23 @@ class ChatResponse(BaseModel):
     data: Optional[Any] = None
     actions: list = []
 
+class ChatBatchRequest(BaseModel):
+    messages: List[ChatRequest] = Field(..., max_length=CHAT_BATCH_MAX_SIZE)
+
+class ChatBatchItem(BaseModel):
+    index: int
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchItem]
+
+class AvailabilitySearchRequest(BaseModel):
+    check_in: date
+    check_out: date
+    max_price: Optional[float] = None
+    location: Optional[str] = None
+
 @app.get("/")
 async def root():
     return {"status": "online", "service": "chatbot-service"}
@@ -45,36 +143,103 @@ async def health_check():
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    """Endpoint principal pour discuter avec le chatbot"""
+    """Endpoint principal pour discuter avec le chatbot.
+    
+    Le corps est déjà encodé par le moteur (pré-encodé pour les intentions
+    statiques): ChatResponse ne sert qu'à documenter le schéma.
+    """
     try:
-        response = await chatbot.process_message(
-            message=request.message,
-            user_id=request.user_id,
-            token=request.token,
-            user_role=request.user_role
-        )
-        return response
+        body = await chatbot.process_message_json(**authenticated(request))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=body, media_type="application/json")
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Réponse en Server-Sent Events: intention et en-tête tout de suite, puis chaque ligne"""
+    async def stream():
+        try:
+            async for event, data in chatbot.stream_message(**authenticated(request)):
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """Même flux d'événements que /api/chat/stream, un message JSON par requête"""
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                request = ChatRequest.model_validate(await websocket.receive_json())
+            except (ValidationError, ValueError) as e:
+                await websocket.send_json({"event": "error", "data": {"detail": str(e)}})
+                continue
+            try:
+                async for event, data in chatbot.stream_message(**authenticated(request)):
+                    await websocket.send_json({"event": event, "data": data})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"event": "error", "data": {"detail": str(e)}})
+    except WebSocketDisconnect:
+        pass
+
+@app.post("/api/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest):
+    """Traite un lot de messages (rejeu d'historique, tests), erreurs par élément"""
+    results = await chatbot.process_batch([authenticated(r) for r in request.messages])
+    return {"results": [{"index": i, **result} for i, result in enumerate(results)]}
+
+@app.post("/api/chat/available")
+async def search_available(request: AvailabilitySearchRequest):
+    """Propriétés libres sur une période, envoyées (NDJSON) au fur et à mesure"""
+    if request.check_out <= request.check_in:
+        raise HTTPException(status_code=400, detail="check_out doit être après check_in")
+
+    async def stream():
+        count = 0
+        async for result in search.iter_available_properties(
+            request.check_in.isoformat(), request.check_out.isoformat(), request.max_price, request.location
+        ):
+            count += 1
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        yield json.dumps({"done": True, "count": count}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/api/chat/stats")
+async def get_stats():
+    """Compteurs internes (caches, déduplication) pour le réglage du service"""
+    return {
+        "caches": api_client.cache_stats(),
+        "http_cache": api_client.http_cache_stats(),
+        "catalogue": catalogue.replica.stats(),
+        "singleflight": api_client.singleflight_stats(),
+        "sessions": chatbot.sessions.stats(),
+        "intents": chatbot.detector.stats(),
+        "auth": auth.verifier.stats(),
+    }
+
+@app.get("/api/chat/upstreams")
+async def get_upstreams():
+    """État des disjoncteurs des services amont (closed | open | half_open)"""
+    return {"upstreams": api_client.upstream_stats()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
 @app.get("/api/chat/intents")
 async def get_intents():
     """Liste les intentions supportées par le chatbot"""
-    return {
-        "intents": [
-            {"name": "greeting", "examples": ["Bonjour", "Salut", "Hello"]},
-            {"name": "help", "examples": ["Aide", "Help", "Comment faire"]},
-            {"name": "list_properties", "examples": ["Voir les propriétés", "Liste des logements"]},
-            {"name": "make_reservation", "examples": ["Je veux réserver", "Réserver"]},
-            {"name": "my_reservations", "examples": ["Mes réservations", "Mon historique"]},
-            {"name": "check_availability", "examples": ["Vérifier disponibilité", "Est-ce libre"]},
-            {"name": "cancel_info", "examples": ["Comment annuler", "Annulation"]},
-            {"name": "price_info", "examples": ["Prix", "Combien ça coûte"]},
-            {"name": "reviews_info", "examples": ["Avis", "Commentaires"]},
-            {"name": "account_info", "examples": ["Mon compte", "Inscription"]},
-            {"name": "contact", "examples": ["Contact", "Support"]},
-        ]
-    }
+    return {"intents": [{"name": name, "examples": examples} for name, examples in intent_matcher.INTENT_EXAMPLES.items()]}
 
 if __name__ == "__main__":
     import uvicorn
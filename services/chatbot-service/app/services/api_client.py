@@ -1,142 +1,353 @@
+import hashlib
+import time
+from typing import Any, Optional, Tuple
+
 import httpx
-from app.config import PROPERTY_SERVICE_URL, RESERVATION_SERVICE_URL
 
-async def get_all_properties():
-    """Récupère toutes les propriétés disponibles"""
-    async with httpx.AsyncClient() as client:
+from app.config import (
+    PROPERTY_SERVICE_URL,
+    RESERVATION_SERVICE_URL,
+    PROPERTY_CACHE_TTL,
+    PROPERTY_CACHE_STALE_TTL,
+    PROPERTY_CACHE_MAX_ENTRIES,
+    AVAILABILITY_TTL,
+    AVAILABILITY_MAX_PROPERTIES,
+    UPSTREAM_RETRIES,
+    UPSTREAM_RETRY_BASE_DELAY,
+    UPSTREAM_RETRY_MAX_DELAY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    HTTP_CACHE_MAX_BYTES,
+)
+from app.services.availability import AvailabilityIndex
+from app.services.cache import AsyncTTLCache
+from app.services.http_cache import HttpCache
+from app.services import metrics, tracing
+from app.services.http_client import get_client, TIMEOUTS
+from app.services.resilience import CircuitBreaker, UpstreamError, retry_async
+from app.services.singleflight import SingleFlight
+
+# Caches du catalogue (liste complète et fiches individuelles)
+properties_cache = AsyncTTLCache("properties", PROPERTY_CACHE_TTL, PROPERTY_CACHE_STALE_TTL, max_entries=1)
+property_cache = AsyncTTLCache("property", PROPERTY_CACHE_TTL, PROPERTY_CACHE_STALE_TTL, PROPERTY_CACHE_MAX_ENTRIES)
+
+# Validateurs et corps décodés des réponses amont (requêtes conditionnelles)
+http_cache = HttpCache(HTTP_CACHE_MAX_BYTES)
+
+# Fusion des lectures identiques concurrentes vers les services amont
+upstream_flight = SingleFlight("upstream")
+
+# Disjoncteurs par service amont
+PROPERTY_UPSTREAM = "property-service"
+RESERVATION_UPSTREAM = "reservation-service"
+breakers = {
+    name: CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+    for name in (PROPERTY_UPSTREAM, RESERVATION_UPSTREAM)
+}
+
+# Erreurs transitoires: réseau, timeout, 5xx
+TRANSIENT_ERRORS = (httpx.TransportError, UpstreamError)
+
+def _auth_scope(token: Optional[str]) -> str:
+    """Portée d'authentification d'une requête (empreinte du token, jamais le token)"""
+    if not token:
+        return "anonymous"
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+async def _get(upstream: str, endpoint: str, url: str, token: Optional[str] = None) -> Tuple[int, Any]:
+    """GET partagé entre appelants identiques: retourne (status_code, json si 200).
+
+    Les GET sont idempotents: les erreurs transitoires sont réessayées avec
+    backoff et jitter, puis comptées par le disjoncteur du service amont.
+    Une réponse encore fraîche est servie par le cache HTTP; sinon la
+    requête est conditionnelle et un 304 réutilise le corps déjà décodé.
+    """
+    key = (url, _auth_scope(token))
+    cached = http_cache.fresh(key)
+    if cached is not None:
+        return 200, cached.body
+
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    breaker = breakers[upstream]
+    timeout = TIMEOUTS[endpoint]
+
+    async def attempt():
+        cached = http_cache.get(key)
+        request_headers = {**(headers or {}), **cached.validators()} if cached is not None else headers
+        started = time.perf_counter()
         try:
-            response = await client.get(f"{PROPERTY_SERVICE_URL}/api/properties")
-            if response.status_code == 200:
-                result = response.json()
-                # L'API retourne {success, count, data}
-                return result.get("data", []) if isinstance(result, dict) else result
-            return []
+            async with get_client() as client:
+                response = await client.get(url, headers=tracing.outgoing_headers(request_headers), timeout=timeout)
         except Exception as e:
-            print(f"Erreur API propriétés: {e}")
-            return []
+            metrics.record_upstream(upstream, endpoint, type(e).__name__, time.perf_counter() - started)
+            raise
+        metrics.record_upstream(upstream, endpoint, response.status_code, time.perf_counter() - started)
+        if response.status_code >= 500:
+            raise UpstreamError(upstream, response.status_code)
+        if response.status_code == 304:
+            revalidated = http_cache.revalidated(key, response)
+            if revalidated is not None:
+                return 200, revalidated.body
+        if response.status_code != 200:
+            return response.status_code, None
+        body = response.json()
+        http_cache.store(key, response, body)
+        return 200, body
 
-async def get_property_by_id(property_id: str):
-    """Récupère une propriété par son ID"""
-    async with httpx.AsyncClient() as client:
+    def on_retry(attempt_number, error):
+        breaker.retries += 1
+
+    async def fetch():
+        trial = breaker.check()
         try:
-            response = await client.get(f"{PROPERTY_SERVICE_URL}/api/properties/{property_id}")
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Erreur API propriété: {e}")
-            return None
+            result = await retry_async(
+                attempt, UPSTREAM_RETRIES, UPSTREAM_RETRY_BASE_DELAY, UPSTREAM_RETRY_MAX_DELAY,
+                TRANSIENT_ERRORS, on_retry
+            )
+        except TRANSIENT_ERRORS:
+            breaker.record_failure()
+            raise
+        finally:
+            if trial:
+                breaker.release_trial()
+        breaker.record_success()
+        return result
+
+    started = time.perf_counter()
+    try:
+        return await upstream_flight.do(("GET",) + key, fetch)
+    finally:
+        metrics.add_upstream_time(time.perf_counter() - started)
+
+async def _send(upstream: str, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """Écriture vers un service amont: une seule tentative (non idempotente)"""
+    breaker = breakers[upstream]
+    trial = breaker.check()
+    kwargs["headers"] = tracing.outgoing_headers(kwargs.get("headers"))
+    started = time.perf_counter()
+    try:
+        async with get_client() as client:
+            response = await client.request(method, url, timeout=TIMEOUTS[endpoint], **kwargs)
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        metrics.record_upstream(upstream, endpoint, type(e).__name__, elapsed)
+        metrics.add_upstream_time(elapsed)
+        if isinstance(e, httpx.TransportError):
+            breaker.record_failure()
+        raise
+    finally:
+        if trial:
+            breaker.release_trial()
+    elapsed = time.perf_counter() - started
+    metrics.record_upstream(upstream, endpoint, response.status_code, elapsed)
+    metrics.add_upstream_time(elapsed)
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+def _forget(url: str, token: Optional[str] = None):
+    """Oublie une réponse du cache HTTP après une écriture (même si encore fraîche)"""
+    http_cache.discard((url, _auth_scope(token)))
+
+def is_degraded(upstream: str) -> bool:
+    """Vrai si le disjoncteur du service amont n'est pas fermé"""
+    return breakers[upstream].state != "closed"
+
+def upstream_stats() -> dict:
+    """État et compteurs des disjoncteurs"""
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+def _unwrap(result):
+    """Les APIs retournent {success, count, data} ou directement une liste"""
+    return result.get("data", []) if isinstance(result, dict) else result
+
+async def _fetch_all_properties():
+    """Télécharge le catalogue (lève une exception en cas d'erreur)"""
+    status, body = await _get(PROPERTY_UPSTREAM, "properties.list", f"{PROPERTY_SERVICE_URL}/api/properties")
+    if status != 200:
+        raise RuntimeError(f"property-service a répondu {status}")
+    return _unwrap(body)
+
+async def _fetch_property(property_id: str):
+    """Télécharge une propriété, None si elle n'existe pas"""
+    status, body = await _get(PROPERTY_UPSTREAM, "properties.get", f"{PROPERTY_SERVICE_URL}/api/properties/{property_id}")
+    if status == 404:
+        return None
+    if status != 200:
+        raise RuntimeError(f"property-service a répondu {status}")
+    return body
+
+async def fetch_catalogue():
+    """Catalogue complet par requête conditionnelle, sans cache TTL (lève une exception en cas d'erreur)"""
+    return await _fetch_all_properties()
+
+async def get_all_properties():
+    """Récupère toutes les propriétés disponibles (via le cache)"""
+    try:
+        return await properties_cache.get_or_load("all", _fetch_all_properties)
+    except Exception as e:
+        print(f"Erreur API propriétés: {e}")
+        # Mode dégradé: dernier catalogue connu, même périmé
+        return properties_cache.get("all", [])
+
+async def get_property_by_id(property_id: str):
+    """Récupère une propriété par son ID (via le cache)"""
+    try:
+        return await property_cache.get_or_load(property_id, lambda: _fetch_property(property_id))
+    except Exception as e:
+        print(f"Erreur API propriété: {e}")
+        return property_cache.get(property_id)
+
+async def _fetch_property_reservations(property_id: str):
+    """Réservations d'une propriété, None si non vérifiable"""
+    status, body = await _get(
+        RESERVATION_UPSTREAM, "reservations.property", f"{RESERVATION_SERVICE_URL}/api/reservations/property/{property_id}"
+    )
+    if status != 200:
+        return None
+    return _unwrap(body)
+
+# Index des séjours bloquants par propriété
+availability_index = AvailabilityIndex(_fetch_property_reservations, AVAILABILITY_TTL, AVAILABILITY_MAX_PROPERTIES)
+
+def cache_stats() -> dict:
+    """Compteurs des caches du catalogue et de disponibilité"""
+    return {
+        properties_cache.name: properties_cache.stats(),
+        property_cache.name: property_cache.stats(),
+        "availability": availability_index.stats(),
+    }
+
+def http_cache_stats() -> dict:
+    """Compteurs du cache HTTP (304, réponses fraîches, octets évités)"""
+    return http_cache.stats()
+
+def singleflight_stats() -> dict:
+    """Compteurs de déduplication des lectures amont"""
+    return upstream_flight.stats()
 
 async def get_user_reservations(user_id: str, token: str):
     """Récupère les réservations d'un utilisateur"""
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": f"Bearer {token}"}
-            response = await client.get(
-                f"{RESERVATION_SERVICE_URL}/api/reservations",
-                headers=headers
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("data", []) if isinstance(result, dict) else result
-            return []
-        except Exception as e:
-            print(f"Erreur API réservations: {e}")
-            return []
+    try:
+        status, body = await _get(RESERVATION_UPSTREAM, "reservations.mine", f"{RESERVATION_SERVICE_URL}/api/reservations", token)
+        if status == 200:
+            return _unwrap(body)
+        return []
+    except Exception as e:
+        print(f"Erreur API réservations: {e}")
+        return []
 
 async def create_reservation(data: dict, token: str):
     """Crée une nouvelle réservation"""
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            }
-            response = await client.post(
-                f"{RESERVATION_SERVICE_URL}/api/reservations",
-                json=data,
-                headers=headers
+    try:
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        response = await _send(
+            RESERVATION_UPSTREAM, "reservations.create", "POST",
+            f"{RESERVATION_SERVICE_URL}/api/reservations",
+            json=data,
+            headers=headers
+        )
+        created = response.json() if response.status_code == 201 else None
+        if created is not None:
+            _forget(f"{RESERVATION_SERVICE_URL}/api/reservations", token)
+            reservation = _unwrap(created)
+            availability_index.record_reservation(
+                data.get("propertyId"),
+                reservation.get("_id") if isinstance(reservation, dict) else None,
+                data.get("startDate", ""),
+                data.get("endDate", "")
             )
-            return {
-                "success": response.status_code == 201,
-                "data": response.json() if response.status_code == 201 else None,
-                "message": "Réservation créée avec succès!" if response.status_code == 201 else "Erreur lors de la réservation"
-            }
-        except Exception as e:
-            print(f"Erreur création réservation: {e}")
-            return {"success": False, "message": str(e)}
+        return {
+            "success": response.status_code == 201,
+            "data": created,
+            "message": "Réservation créée avec succès!" if response.status_code == 201 else "Erreur lors de la réservation"
+        }
+    except Exception as e:
+        print(f"Erreur création réservation: {e}")
+        return {"success": False, "message": str(e)}
 
 async def check_availability(property_id: str, check_in: str, check_out: str):
     """Vérifie la disponibilité d'une propriété"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{RESERVATION_SERVICE_URL}/api/reservations/property/{property_id}"
-            )
-            if response.status_code == 200:
-                reservations = response.json()
-                # Vérifier s'il y a des conflits de dates
-                for res in reservations:
-                    if res.get("status") in ["confirmed", "pending"]:
-                        res_start = res.get("checkIn", "")[:10]
-                        res_end = res.get("checkOut", "")[:10]
-                        if not (check_out <= res_start or check_in >= res_end):
-                            return {"available": False, "message": "Cette propriété n'est pas disponible pour ces dates."}
-                return {"available": True, "message": "La propriété est disponible!"}
-            return {"available": True, "message": "Disponibilité non vérifiable, mais vous pouvez essayer."}
-        except Exception as e:
-            print(f"Erreur vérification disponibilité: {e}")
-            return {"available": True, "message": "Impossible de vérifier la disponibilité."}
+    try:
+        available = await availability_index.is_available(property_id, check_in, check_out)
+    except Exception as e:
+        print(f"Erreur vérification disponibilité: {e}")
+        return {"available": True, "verified": False, "message": "Impossible de vérifier la disponibilité."}
+    return _availability_result(available)
+
+async def check_availability_many(queries: list):
+    """Vérifie plusieurs (property_id, check_in, check_out) en une passe"""
+    try:
+        results = await availability_index.check_many(queries)
+    except Exception as e:
+        print(f"Erreur vérification disponibilité: {e}")
+        results = [None] * len(queries)
+    return [_availability_result(available) for available in results]
+
+def _availability_result(available):
+    if available is None:
+        return {"available": True, "verified": False, "message": "Disponibilité non vérifiable, mais vous pouvez essayer."}
+    if not available:
+        return {"available": False, "verified": True, "message": "Cette propriété n'est pas disponible pour ces dates."}
+    return {"available": True, "verified": True, "message": "La propriété est disponible!"}
 
 # ============ FONCTIONS ADMIN ============
 
 async def delete_property(property_id: str, token: str):
     """Supprime une propriété (admin seulement)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": f"Bearer {token}"}
-            response = await client.delete(
-                f"{PROPERTY_SERVICE_URL}/api/properties/{property_id}",
-                headers=headers
-            )
-            return {
-                "success": response.status_code in [200, 204],
-                "message": "Propriété supprimée avec succès!" if response.status_code in [200, 204] else "Erreur lors de la suppression"
-            }
-        except Exception as e:
-            print(f"Erreur suppression propriété: {e}")
-            return {"success": False, "message": str(e)}
+    try:
+        headers = {"Authorization": f"Bearer {token}"}
+        response = await _send(
+            PROPERTY_UPSTREAM, "properties.delete", "DELETE",
+            f"{PROPERTY_SERVICE_URL}/api/properties/{property_id}",
+            headers=headers
+        )
+        if response.status_code in [200, 204]:
+            properties_cache.invalidate()
+            property_cache.invalidate(property_id)
+            _forget(f"{PROPERTY_SERVICE_URL}/api/properties")
+            _forget(f"{PROPERTY_SERVICE_URL}/api/properties/{property_id}")
+            availability_index.invalidate(property_id)
+        return {
+            "success": response.status_code in [200, 204],
+            "message": "Propriété supprimée avec succès!" if response.status_code in [200, 204] else "Erreur lors de la suppression"
+        }
+    except Exception as e:
+        print(f"Erreur suppression propriété: {e}")
+        return {"success": False, "message": str(e)}
 
 async def get_all_reservations(token: str):
     """Récupère toutes les réservations (admin seulement)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": f"Bearer {token}"}
-            response = await client.get(
-                f"{RESERVATION_SERVICE_URL}/api/reservations/all",
-                headers=headers
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("data", []) if isinstance(result, dict) else result
-            return []
-        except Exception as e:
-            print(f"Erreur API réservations: {e}")
-            return []
+    try:
+        status, body = await _get(RESERVATION_UPSTREAM, "reservations.all", f"{RESERVATION_SERVICE_URL}/api/reservations/all", token)
+        if status == 200:
+            return _unwrap(body)
+        return []
+    except Exception as e:
+        print(f"Erreur API réservations: {e}")
+        return []
 
 async def delete_reservation(reservation_id: str, token: str):
     """Supprime une réservation (admin seulement)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"Authorization": f"Bearer {token}"}
-            response = await client.delete(
-                f"{RESERVATION_SERVICE_URL}/api/reservations/{reservation_id}",
-                headers=headers
-            )
-            return {
-                "success": response.status_code in [200, 204],
-                "message": "Réservation supprimée avec succès!" if response.status_code in [200, 204] else "Erreur lors de la suppression"
-            }
-        except Exception as e:
-            print(f"Erreur suppression réservation: {e}")
-            return {"success": False, "message": str(e)}
+    try:
+        headers = {"Authorization": f"Bearer {token}"}
+        response = await _send(
+            RESERVATION_UPSTREAM, "reservations.delete", "DELETE",
+            f"{RESERVATION_SERVICE_URL}/api/reservations/{reservation_id}",
+            headers=headers
+        )
+        if response.status_code in [200, 204]:
+            availability_index.forget_reservation(reservation_id)
+            _forget(f"{RESERVATION_SERVICE_URL}/api/reservations/all", token)
+        return {
+            "success": response.status_code in [200, 204],
+            "message": "Réservation supprimée avec succès!" if response.status_code in [200, 204] else "Erreur lors de la suppression"
+        }
+    except Exception as e:
+        print(f"Erreur suppression réservation: {e}")
+        return {"success": False, "message": str(e)}
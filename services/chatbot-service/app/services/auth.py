@@ -0,0 +1,202 @@
+"""Vérification locale des JWT émis par auth-service.
+
+auth-service signe {id, role, iat, exp} en HS256 avec JWT_SECRET
+(jsonwebtoken): le chatbot vérifie la signature et l'expiration avec le
+même secret, sans appel à auth-service. L'identité (user_id, rôle) vient
+des claims vérifiés, jamais des champs envoyés par le client.
+
+Les vérifications réussies sont gardées dans un LRU (clé: SHA-256 du
+jeton) jusqu'à l'expiration du jeton. Le secret peut venir d'un fichier
+(secret Docker/Kubernetes) relu périodiquement: une rotation vide le cache.
+
+Limite connue: un compte supprimé ou un mot de passe changé après
+l'émission du jeton n'est pas détecté avant son expiration (auth-service
+le vérifie en base, pas le chatbot).
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.config import JWT_CACHE_MAX_ENTRIES, JWT_SECRET, JWT_SECRET_FILE, JWT_SECRET_REFRESH_INTERVAL
+
+# Durée maximale en cache d'un jeton sans claim exp (secondes)
+NO_EXPIRY_TTL = 3600.0
+
+
+class InvalidToken(Exception):
+    """Jeton mal formé, mal signé ou expiré"""
+
+
+class Identity(NamedTuple):
+    user_id: str
+    role: Optional[str]
+    expires_at: float
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def sign(claims: dict, secret: str) -> str:
+    """Jeton HS256 au format d'auth-service (benchmarks, outils de test)"""
+    header = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    signature = hmac.new(secret.encode("utf-8"), f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64encode(signature)}"
+
+
+def decode(token: str, secret: bytes, now: float) -> dict:
+    """Claims d'un jeton HS256 dont la signature et les dates sont valides"""
+    if not token.isascii():
+        raise InvalidToken("jeton mal formé: caractères non ASCII")
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, binascii.Error) as e:
+        raise InvalidToken(f"jeton mal formé: {e}")
+    # L'algorithme est imposé: jamais "none" ni un algorithme choisi par le client
+    if not isinstance(header, dict) or header.get("alg") != "HS256":
+        raise InvalidToken("algorithme non accepté")
+    expected = hmac.new(secret, f"{header_b64}.{payload_b64}".encode("ascii"), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise InvalidToken("signature invalide")
+    try:
+        claims = json.loads(_b64decode(payload_b64))
+    except (ValueError, binascii.Error) as e:
+        raise InvalidToken(f"claims illisibles: {e}")
+    if not isinstance(claims, dict):
+        raise InvalidToken("claims illisibles")
+    if isinstance(claims.get("exp"), (int, float)) and now >= claims["exp"]:
+        raise InvalidToken("jeton expiré")
+    if isinstance(claims.get("nbf"), (int, float)) and now < claims["nbf"]:
+        raise InvalidToken("jeton pas encore valide")
+    return claims
+
+
+class SecretSource:
+    """Secret HS256 partagé: JWT_SECRET, ou fichier relu toutes les `refresh_interval` secondes"""
+
+    def __init__(self, secret: Optional[str], path: Optional[str] = None, refresh_interval: float = 300):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        # Le fichier, s'il est donné, remplace le secret: illisible, aucun jeton n'est accepté
+        self._secret = secret.encode("utf-8") if secret and not path else None
+        self._next_reload = 0.0
+        self.reloads = 0
+        self.errors = 0
+
+    def current(self) -> Optional[bytes]:
+        if self.path and time.monotonic() >= self._next_reload:
+            self._reload()
+        return self._secret
+
+    def _reload(self):
+        self._next_reload = time.monotonic() + self.refresh_interval
+        try:
+            with open(self.path, "rb") as f:
+                secret = f.read().strip()
+        except OSError as e:
+            self.errors += 1
+            print(f"⚠️ Secret JWT {self.path} illisible, secret précédent conservé: {e}")
+            return
+        if secret and secret != self._secret:
+            self._secret = secret
+            self.reloads += 1
+
+
+class TokenVerifier:
+    """Vérifie les jetons et garde les identités valides en LRU jusqu'à leur expiration"""
+
+    def __init__(self, secrets: SecretSource, max_entries: int = JWT_CACHE_MAX_ENTRIES):
+        self.secrets = secrets
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, Identity]" = OrderedDict()
+        self._secret: Optional[bytes] = None
+        self.hits = 0
+        self.misses = 0
+        self.verified = 0
+        self.rejected = 0
+
+    def verify(self, token: str) -> Optional[Identity]:
+        """Identité du jeton, None s'il est invalide ou si aucun secret n'est configuré"""
+        secret = self.secrets.current()
+        if secret != self._secret:
+            # Rotation du secret: les vérifications passées ne valent plus
+            self._cache.clear()
+            self._secret = secret
+        if not secret:
+            return None
+
+        now = time.time()
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        identity = self._cache.get(key)
+        if identity is not None:
+            if now < identity.expires_at:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return identity
+            del self._cache[key]
+
+        self.misses += 1
+        try:
+            claims = decode(token, secret, now)
+        except InvalidToken:
+            self.rejected += 1
+            return None
+        if not claims.get("id"):
+            self.rejected += 1
+            return None
+        expires_at = float(claims["exp"]) if isinstance(claims.get("exp"), (int, float)) else now + NO_EXPIRY_TTL
+        identity = Identity(str(claims["id"]), claims.get("role"), expires_at)
+        self.verified += 1
+        if self.max_entries > 0:
+            self._cache[key] = identity
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return identity
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "secret_reloads": self.secrets.reloads,
+            "secret_errors": self.secrets.errors,
+        }
+
+
+verifier = TokenVerifier(SecretSource(JWT_SECRET, JWT_SECRET_FILE, JWT_SECRET_REFRESH_INTERVAL))
+
+
+def check_configuration() -> bool:
+    """Signale au démarrage l'absence de secret: tous les utilisateurs seraient anonymes"""
+    if JWT_SECRET or JWT_SECRET_FILE:
+        return True
+    print("⚠️ Ni JWT_SECRET ni JWT_SECRET_FILE configuré: aucun jeton ne sera accepté")
+    return False
+
+
+def identify(token: Optional[str]) -> dict:
+    """Paramètres d'identité du moteur (user_id, token, user_role) d'après le jeton vérifié.
+
+    Sans jeton valide, l'utilisateur est anonyme: les champs user_id et
+    user_role envoyés par le client sont ignorés.
+    """
+    identity = verifier.verify(token) if token else None
+    if identity is None:
+        return {"user_id": None, "token": None, "user_role": None}
+    return {"user_id": identity.user_id, "token": token, "user_role": identity.role}
@@ -0,0 +1,154 @@
+import asyncio
+from bisect import bisect_left
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from app.services.cache import AsyncTTLCache
+
+# Statuts qui bloquent un créneau
+BLOCKING_STATUSES = ("confirmed", "pending")
+
+
+def stay_bounds(reservation: dict) -> Tuple[str, str]:
+    """Dates (AAAA-MM-JJ) d'une réservation, quel que soit le nom des champs"""
+    start = reservation.get("startDate") or reservation.get("checkIn") or ""
+    end = reservation.get("endDate") or reservation.get("checkOut") or ""
+    return str(start)[:10], str(end)[:10]
+
+
+class PropertyIntervals:
+    """Index trié des séjours bloquants d'une propriété.
+
+    Les séjours sont triés par date d'arrivée et `max_end[i]` garde le départ
+    le plus tardif parmi les i+1 premiers séjours: un chevauchement avec
+    [check_in, check_out) existe si, parmi les séjours arrivés avant
+    check_out, l'un part après check_in. Requête en O(log n).
+    """
+
+    __slots__ = ("starts", "ends", "ids", "max_end")
+
+    def __init__(self, reservations: Iterable[dict] = ()):
+        stays = sorted(
+            (stay_bounds(r) + (str(r.get("_id", "")),))
+            for r in reservations
+            if r.get("status") in BLOCKING_STATUSES
+        )
+        self.starts: List[str] = [s[0] for s in stays]
+        self.ends: List[str] = [s[1] for s in stays]
+        self.ids: List[str] = [s[2] for s in stays]
+        self.max_end: List[str] = []
+        self._rebuild_from(0)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _rebuild_from(self, pos: int):
+        del self.max_end[pos:]
+        current = self.max_end[-1] if self.max_end else ""
+        for end in self.ends[pos:]:
+            if end > current:
+                current = end
+            self.max_end.append(current)
+
+    def overlaps(self, check_in: str, check_out: str) -> bool:
+        idx = bisect_left(self.starts, check_out)
+        return idx > 0 and self.max_end[idx - 1] > check_in
+
+    def add(self, reservation_id: str, start: str, end: str):
+        pos = bisect_left(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.ids.insert(pos, reservation_id)
+        self._rebuild_from(pos)
+
+    def remove(self, reservation_id: str) -> bool:
+        try:
+            pos = self.ids.index(reservation_id)
+        except ValueError:
+            return False
+        del self.starts[pos], self.ends[pos], self.ids[pos]
+        self._rebuild_from(pos)
+        return True
+
+
+class AvailabilityIndex:
+    """Index de disponibilité par propriété, chargé à la demande.
+
+    Les index sont mis en cache (TTL + LRU) et mis à jour directement quand
+    une réservation est créée ou supprimée via le chatbot. Le loader retourne
+    la liste des réservations d'une propriété, ou None si elle n'est pas
+    vérifiable (rien n'est alors mis en cache).
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable[Optional[list]]], ttl: float, max_properties: int):
+        self._loader = loader
+        self._cache = AsyncTTLCache("availability", ttl, 0.0, max_properties, on_evict=self._drop_owners)
+        # ID de réservation -> ID de propriété, pour les suppressions (index en cache uniquement)
+        self._owners: dict = {}
+
+    async def _load(self, property_id: str) -> Optional[PropertyIntervals]:
+        reservations = await self._loader(property_id)
+        if reservations is None:
+            return None
+        index = PropertyIntervals(reservations)
+        for reservation_id in index.ids:
+            self._owners[reservation_id] = property_id
+        return index
+
+    def _drop_owners(self, property_id: str, index: PropertyIntervals):
+        """Un index quitte le cache (LRU, TTL, invalidation): ses séjours ne sont plus suivis"""
+        current = self._cache.get(property_id)
+        # Rechargement: les séjours encore présents dans le nouvel index restent suivis
+        kept = set(current.ids) if current is not None else ()
+        for reservation_id in index.ids:
+            if reservation_id not in kept and self._owners.get(reservation_id) == property_id:
+                del self._owners[reservation_id]
+
+    async def get(self, property_id: str) -> Optional[PropertyIntervals]:
+        return await self._cache.get_or_load(property_id, lambda: self._load(property_id))
+
+    async def is_available(self, property_id: str, check_in: str, check_out: str) -> Optional[bool]:
+        """True/False, ou None si la disponibilité n'est pas vérifiable"""
+        index = await self.get(property_id)
+        if index is None:
+            return None
+        return not index.overlaps(check_in, check_out)
+
+    async def check_many(self, queries: List[Tuple[str, str, str]]) -> List[Optional[bool]]:
+        """Requêtes groupées (property_id, check_in, check_out): chaque index n'est chargé qu'une fois"""
+        property_ids = list(dict.fromkeys(q[0] for q in queries))
+        loaded = await asyncio.gather(*(self.get(pid) for pid in property_ids), return_exceptions=True)
+        indexes = {
+            pid: (None if isinstance(index, BaseException) else index)
+            for pid, index in zip(property_ids, loaded)
+        }
+        return [
+            None if indexes[pid] is None else not indexes[pid].overlaps(check_in, check_out)
+            for pid, check_in, check_out in queries
+        ]
+
+    def record_reservation(self, property_id: str, reservation_id: Optional[str], start: str, end: str):
+        """Ajoute un séjour créé via le chatbot à l'index chargé"""
+        index = self._cache.get(property_id)
+        if index is None:
+            return
+        if not reservation_id:
+            # Sans ID on ne pourrait pas la retirer plus tard: on recharge
+            self._cache.invalidate(property_id)
+            return
+        index.add(reservation_id, start[:10], end[:10])
+        self._owners[reservation_id] = property_id
+
+    def forget_reservation(self, reservation_id: str):
+        """Retire un séjour supprimé via le chatbot"""
+        property_id = self._owners.pop(reservation_id, None)
+        if property_id is None:
+            return
+        index = self._cache.get(property_id)
+        if index is not None:
+            index.remove(reservation_id)
+
+    def invalidate(self, property_id: Optional[str] = None):
+        self._cache.invalidate(property_id)
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "tracked_reservations": len(self._owners)}
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.services.singleflight import SingleFlight
+
+
+class AsyncTTLCache:
+    """Cache asynchrone en mémoire: TTL, stale-while-revalidate, LRU.
+
+    - frais (âge < ttl): servi directement
+    - périmé (âge < ttl + stale_ttl): servi tel quel, un seul rafraîchissement
+      part en arrière-plan
+    - expiré ou absent: chargé, les appels concurrents partagent le même chargement
+
+    Le loader doit lever une exception en cas d'erreur amont: les erreurs et
+    les valeurs None ne sont jamais mises en cache. `on_evict(key, value)` est
+    appelé pour chaque valeur qui quitte le cache (LRU, remplacement, invalidation).
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, max_entries: int = 1024,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.name = name
+        self.on_evict = on_evict
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flight = SingleFlight(name)
+        self._background: set = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if not self._flight.in_flight(key):
+                    task = asyncio.ensure_future(self._load(key, loader))
+                    self._background.add(task)
+                    task.add_done_callback(self._background_done)
+                return value
+        self.misses += 1
+        return await self._load(key, loader)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Charge une clé en fusionnant les chargements concurrents"""
+        if self._flight.in_flight(key):
+            self.coalesced += 1
+        else:
+            self.refreshes += 1
+        return await self._flight.do(key, lambda: self._load_and_store(key, loader))
+
+    async def _load_and_store(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Dernière valeur connue, même périmée (mode dégradé)"""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else default
+
+    def set(self, key: Hashable, value: Any):
+        previous = self._entries.get(key)
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        if previous is not None and previous[0] is not value:
+            self._evicted(key, previous[0])
+        while len(self._entries) > self.max_entries:
+            evicted_key, (evicted, _) = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._evicted(evicted_key, evicted)
+
+    def invalidate(self, key: Hashable = None):
+        if key is None:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        else:
+            entry = self._entries.pop(key, None)
+            entries = [(key, entry)] if entry is not None else []
+        for evicted_key, (evicted, _) in entries:
+            self._evicted(evicted_key, evicted)
+
+    def _evicted(self, key: Hashable, value: Any):
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "refreshes": self.refreshes,
+            "coalesced": self.coalesced,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+        }
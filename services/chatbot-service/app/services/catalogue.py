@@ -0,0 +1,322 @@
+import asyncio
+import re
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Awaitable, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from app.config import CATALOGUE_REFRESH_INTERVAL
+from app.services import api_client
+from app.services import intent_matcher
+from app.services.intent_matcher import MAX_PRICE_RE, MIN_PRICE_RE, PLACE_RE, PRICE_RANGE_RE
+from app.services.search import normalize, property_location
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Mots-outils ignorés dans les requêtes et les lieux ("Boulogne-sur-Mer" -> boulogne, mer)
+STOPWORDS = frozenset((
+    "a", "au", "aux", "en", "de", "du", "des", "d", "la", "le", "les", "l", "un", "une", "sur", "sous",
+    "et", "ou", "pour", "avec", "dans", "vers", "par", "je", "j", "me", "moi", "svp", "plus", "moins",
+    "entre", "max", "min", "maximum", "minimum", "budget", "partir", "pas", "cher", "nuit",
+))
+
+PRICE_MAX = float("inf")
+# Borne haute des ids pour les recherches dichotomiques dans (prix, id)
+ID_SENTINEL = "\uffff"
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots normalisés (minuscules, sans accents) d'au moins deux caractères"""
+    return [token for token in TOKEN_RE.findall(normalize(text)) if len(token) > 1 and token not in STOPWORDS]
+
+
+def _price(prop: dict) -> Optional[float]:
+    try:
+        return float(prop.get("price"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _amount(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+class SearchQuery(NamedTuple):
+    places: Tuple[str, ...]
+    terms: Tuple[str, ...]
+    min_price: Optional[float]
+    max_price: Optional[float]
+    location: Optional[str] = None
+
+
+def parse_query(message: str, is_known_place: Optional[Callable[[str], bool]] = None) -> SearchQuery:
+    """Filtres d'une recherche: "appartement à Lyon entre 50 et 80$".
+
+    Les lieux explicites ("à Lyon") sont obligatoires; les autres mots
+    servent à classer (titre) ou filtrer (s'ils désignent un lieu connu).
+    Un mot en minuscules après une préposition ("à louer", "dans la liste")
+    n'est un lieu que si `is_known_place` le reconnaît.
+    """
+    min_price = max_price = None
+    price_range = PRICE_RANGE_RE.search(message)
+    if price_range:
+        low, high = sorted((_amount(price_range.group(1)), _amount(price_range.group(2))))
+        min_price, max_price = low, high
+        message = PRICE_RANGE_RE.sub(" ", message)
+    maximum = MAX_PRICE_RE.search(message)
+    if maximum:
+        max_price = _amount(maximum.group(1))
+        message = MAX_PRICE_RE.sub(" ", message)
+    minimum = MIN_PRICE_RE.search(message)
+    if minimum:
+        min_price = _amount(minimum.group(1))
+        message = MIN_PRICE_RE.sub(" ", message)
+
+    places, labels, unknown = [], [], []
+    for capitalized, lowercase in PLACE_RE.findall(message):
+        tokens = tokenize(capitalized or lowercase)
+        if lowercase and is_known_place is not None and not is_known_place(lowercase):
+            unknown.extend(tokens)
+        elif tokens:
+            places.extend(tokens)
+            labels.append(capitalized or lowercase)
+    terms = [token for token in tokenize(PLACE_RE.sub(" ", message)) if not token.isdigit() or len(token) >= 4]
+    terms.extend(unknown)
+    return SearchQuery(
+        tuple(dict.fromkeys(places)), tuple(dict.fromkeys(terms)), min_price, max_price, ", ".join(labels) or None
+    )
+
+
+class CatalogueIndex:
+    """Index en mémoire du catalogue.
+
+    - index inversé jeton -> ids, séparé pour les lieux (location, ville,
+      pays, code postal) et les titres
+    - tableau trié (prix, id) pour les fourchettes de prix par dichotomie
+
+    Les mises à jour sont incrémentales: seuls les documents ajoutés,
+    modifiés ou supprimés sont réindexés.
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, dict] = {}
+        self._place_index: Dict[str, Set[str]] = {}
+        self._title_index: Dict[str, Set[str]] = {}
+        self._doc_tokens: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self._prices: List[Tuple[float, str]] = []
+        self._price_of: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, prop: dict):
+        property_id = str(prop["_id"])
+        if property_id in self.documents:
+            self.remove(property_id)
+        address = prop.get("address") if isinstance(prop.get("address"), dict) else {}
+        places = frozenset(tokenize(f"{property_location(prop)} {address.get('postalCode', '')}"))
+        titles = frozenset(tokenize(str(prop.get("title", ""))))
+        for token in places:
+            self._place_index.setdefault(token, set()).add(property_id)
+        for token in titles:
+            self._title_index.setdefault(token, set()).add(property_id)
+        self._doc_tokens[property_id] = (places, titles)
+        price = _price(prop)
+        if price is not None:
+            insort(self._prices, (price, property_id))
+            self._price_of[property_id] = price
+        self.documents[property_id] = prop
+
+    def remove(self, property_id: str) -> bool:
+        if self.documents.pop(property_id, None) is None:
+            return False
+        places, titles = self._doc_tokens.pop(property_id)
+        for index, tokens in ((self._place_index, places), (self._title_index, titles)):
+            for token in tokens:
+                ids = index[token]
+                ids.discard(property_id)
+                if not ids:
+                    del index[token]
+        price = self._price_of.pop(property_id, None)
+        if price is not None:
+            del self._prices[bisect_left(self._prices, (price, property_id))]
+        return True
+
+    def sync(self, properties: list) -> Tuple[int, int, int]:
+        """Aligne l'index sur un instantané du catalogue: (ajoutés, modifiés, supprimés)"""
+        added = updated = 0
+        seen = set()
+        for prop in properties:
+            if not isinstance(prop, dict) or not prop.get("_id"):
+                continue
+            property_id = str(prop["_id"])
+            seen.add(property_id)
+            current = self.documents.get(property_id)
+            if current is None:
+                added += 1
+                self.add(prop)
+            elif current is not prop and current != prop:
+                updated += 1
+                self.add(prop)
+        removed = [property_id for property_id in self.documents if property_id not in seen]
+        for property_id in removed:
+            self.remove(property_id)
+        return added, updated, len(removed)
+
+    def is_known_place(self, text: str) -> bool:
+        """Tous les mots de `text` désignent un lieu du catalogue"""
+        tokens = tokenize(text)
+        return bool(tokens) and all(token in self._place_index for token in tokens)
+
+    def _price_slice(self, min_price: Optional[float], max_price: Optional[float]) -> List[Tuple[float, str]]:
+        low = bisect_left(self._prices, (min_price, "")) if min_price is not None else 0
+        high = bisect_right(self._prices, (max_price, ID_SENTINEL)) if max_price is not None else len(self._prices)
+        return self._prices[low:high]
+
+    def search(self, query: SearchQuery) -> List[dict]:
+        """Propriétés qui satisfont tous les filtres, les plus pertinentes puis les moins chères d'abord"""
+        # Lieux explicites, puis mots de la requête qui désignent un lieu connu
+        required = set(query.places)
+        required.update(term for term in query.terms if term in self._place_index)
+        boosts = [term for term in query.terms if term not in required and term in self._title_index]
+
+        candidates: Optional[Set[str]] = None
+        for token in sorted(required, key=lambda t: len(self._place_index.get(t, ()))):
+            ids = self._place_index.get(token)
+            if not ids:
+                return []
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        has_price_filter = query.min_price is not None or query.max_price is not None
+        if candidates is not None and (not has_price_filter or len(candidates) < 64):
+            # Peu de candidats: filtre direct sur leur prix
+            low = query.min_price if query.min_price is not None else -PRICE_MAX
+            high = query.max_price if query.max_price is not None else PRICE_MAX
+            price_of = self._price_of
+            matched = sorted(
+                (price_of.get(i, PRICE_MAX), i) for i in candidates
+                if not has_price_filter or low <= price_of.get(i, PRICE_MAX) <= high
+            )
+        else:
+            # Fourchette de prix par dichotomie, déjà triée par prix
+            matched = self._price_slice(query.min_price, query.max_price)
+            if candidates is not None:
+                matched = [entry for entry in matched if entry[1] in candidates]
+            elif not has_price_filter:
+                unpriced = sorted(i for i in self.documents if i not in self._price_of)
+                matched = matched + [(PRICE_MAX, i) for i in unpriced]
+
+        if boosts:
+            title_tokens = self._doc_tokens
+            # Tri stable: à pertinence égale, l'ordre par prix est conservé
+            matched = sorted(matched, key=lambda entry: -sum(t in title_tokens[entry[1]][1] for t in boosts))
+        return [self.documents[property_id] for _, property_id in matched]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.documents),
+            "place_tokens": len(self._place_index),
+            "title_tokens": len(self._title_index),
+            "priced": len(self._prices),
+        }
+
+
+class CatalogueReplica:
+    """Réplique locale du catalogue, rafraîchie en arrière-plan.
+
+    Chaque rafraîchissement est une requête conditionnelle (cache HTTP):
+    un 304 rend le même objet et ne coûte rien; sinon seuls les documents
+    qui diffèrent sont réindexés. En cas d'erreur amont, la dernière
+    réplique reste servie.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[list]], refresh_interval: float):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.index = CatalogueIndex()
+        self._snapshot = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.synced_at: Optional[float] = None
+        self.syncs = 0
+        self.unchanged = 0
+        self.errors = 0
+        self.added = 0
+        self.updated = 0
+        self.removed = 0
+        self.last_sync_ms = 0.0
+
+    async def refresh(self) -> bool:
+        """Un rafraîchissement; False si le service amont est injoignable"""
+        async with self._lock:
+            try:
+                properties = await self.loader()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Réplique du catalogue non rafraîchie: {e}")
+                return False
+            started = time.perf_counter()
+            if properties is self._snapshot:
+                self.unchanged += 1
+            else:
+                added, updated, removed = self.index.sync(properties)
+                self.added += added
+                self.updated += updated
+                self.removed += removed
+                self._snapshot = properties
+            self.last_sync_ms = (time.perf_counter() - started) * 1000
+            self.syncs += 1
+            self.synced_at = time.monotonic()
+            return True
+
+    async def ensure_loaded(self):
+        """Premier chargement à la demande (avant la première boucle de fond)"""
+        if self.synced_at is None:
+            await self.refresh()
+
+    def forget(self, property_id: str):
+        """Retire tout de suite une propriété supprimée par le chatbot"""
+        self.index.remove(property_id)
+
+    async def search(self, message: str) -> Tuple[SearchQuery, List[dict]]:
+        await self.ensure_loaded()
+        query = parse_query(message, self.index.is_known_place)
+        return query, self.index.search(query)
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            **self.index.stats(),
+            "syncs": self.syncs,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+            "added": self.added,
+            "updated": self.updated,
+            "removed": self.removed,
+            "last_sync_ms": round(self.last_sync_ms, 3),
+            "age_s": round(time.monotonic() - self.synced_at, 1) if self.synced_at is not None else None,
+        }
+
+
+# Réplique partagée, démarrée par le lifespan de l'application
+replica = CatalogueReplica(api_client.fetch_catalogue, CATALOGUE_REFRESH_INTERVAL)
+# Les lieux en minuscules ("dans montréal") ne comptent comme filtre que s'ils sont au catalogue
+intent_matcher.set_place_lookup(replica.index.is_known_place)
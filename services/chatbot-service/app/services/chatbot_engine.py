@@ -1,171 +1,124 @@
+import asyncio
 import re
-from typing import Optional, Tuple
-from app.services import api_client
+import time
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+from app.config import CHAT_BATCH_CONCURRENCY
+from app.services import api_client, catalogue, intent_matcher, json_codec, metrics, search
+from app.services.intent_classifier import create_intent_detector
+from app.services.session_store import SessionState, create_session_store
 
-class ChatbotEngine:
-    """Moteur de chatbot pour la plateforme de réservation"""
-    
-    def __init__(self):
-        self.context = {}
-    
-    def parse_reservation_request(self, message: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-        """Extrait l'ID de propriété et les dates d'un message de réservation"""
-        date_pattern = r'(\d{4}-\d{2}-\d{2})'
-        dates = re.findall(date_pattern, message)
-        
-        id_pattern = r'([a-fA-F0-9]{24})'
-        ids = re.findall(id_pattern, message)
-        
-        property_id = ids[0] if ids else None
-        check_in = dates[0] if len(dates) >= 1 else None
-        check_out = dates[1] if len(dates) >= 2 else None
-        
-        return property_id, check_in, check_out
-    
-    def extract_id(self, message: str) -> Optional[str]:
-        """Extrait un ID MongoDB du message"""
-        id_pattern = r'([a-fA-F0-9]{24})'
-        ids = re.findall(id_pattern, message)
-        return ids[0] if ids else None
-        
-    def detect_intent(self, message: str, user_role: Optional[str] = None) -> str:
-        """Détecte l'intention de l'utilisateur - uniquement questions liées au site"""
-        message_lower = message.lower()
-        
-        # ============ INTENTIONS COMMUNES ============
-        
-        # Salutations
-        if any(word in message_lower for word in ["bonjour", "salut", "hello", "hi", "hey", "bonsoir"]):
-            return "greeting"
-        
-        # Aide
-        if any(word in message_lower for word in ["aide", "help", "aider", "quoi faire", "que peux-tu", "que peux tu", "commandes"]):
-            return "help"
-        
-        # Fonctionnement du site
-        if any(phrase in message_lower for phrase in ["comment fonctionne", "comment ça marche", "comment ca marche", "c'est quoi", "qu'est-ce que", "présentation", "presentation", "fonctionnement", "à quoi sert", "a quoi sert", "expliquer le site", "explique le site"]):
-            return "site_info"
-        
-        # Remerciement
-        if any(word in message_lower for word in ["merci", "thanks", "parfait", "super", "génial", "excellent"]):
-            return "thanks"
-        
-        # Au revoir
-        if any(word in message_lower for word in ["bye", "au revoir", "à bientôt", "ciao", "bonne journée", "bonne nuit"]):
-            return "goodbye"
-        
-        # ============ PROPRIÉTÉS ============
-        
-        # Voir les propriétés
-        if any(word in message_lower for word in ["propriété", "propriétés", "proprietes", "logement", "logements", "appartement", "maison", "liste", "voir les", "afficher"]):
-            if "supprimer" in message_lower or "effacer" in message_lower or "delete" in message_lower:
-                return "admin_delete_property"
-            return "list_properties"
-        
-        # ============ RÉSERVATIONS ============
-        
-        # Mes réservations (locataire)
-        if any(word in message_lower for word in ["mes réservation", "mes reservation", "mes reservations", "mes réservations", "mon historique", "mes locations"]):
-            return "my_reservations"
-        
-        # Voir toutes les réservations (admin)
-        if ("toutes" in message_lower or "all" in message_lower or "tout" in message_lower) and ("réservation" in message_lower or "reservation" in message_lower):
-            return "admin_all_reservations"
-        
-        # Supprimer réservation (admin)
-        if ("supprimer" in message_lower or "effacer" in message_lower or "delete" in message_lower or "annuler" in message_lower) and ("réservation" in message_lower or "reservation" in message_lower):
-            return "admin_delete_reservation"
-        
-        # Réserver
-        if any(word in message_lower for word in ["réserver", "reserver", "reservation", "réservation", "book", "louer"]):
-            return "make_reservation"
-        
-        # ============ VÉRIFIER SI C'EST UNE RÉSERVATION DIRECTE ============
-        
-        property_id, check_in, check_out = self.parse_reservation_request(message)
-        if property_id and check_in and check_out:
-            return "create_reservation"
-        
-        # ============ SUPPRESSION AVEC ID ============
-        
-        if self.extract_id(message) and ("supprimer" in message_lower or "effacer" in message_lower or "delete" in message_lower):
-            if "réservation" in message_lower or "reservation" in message_lower:
-                return "admin_delete_reservation"
-            else:
-                return "admin_delete_property"
-        
-        # ============ INFORMATIONS SUR LE SITE ============
-        
-        # Prix
-        if any(word in message_lower for word in ["prix", "coût", "cout", "tarif", "combien", "payer", "paiement"]):
-            return "price_info"
-        
-        # Annulation
-        if any(word in message_lower for word in ["annuler", "annulation", "cancel", "rembours"]):
-            return "cancel_info"
-        
-        # Avis
-        if any(word in message_lower for word in ["avis", "review", "commentaire", "note", "évaluation", "evaluation"]):
-            return "reviews_info"
-        
-        # Compte
-        if any(word in message_lower for word in ["compte", "profil", "inscription", "connexion", "mot de passe", "password", "login", "signup"]):
-            return "account_info"
-        
-        # Contact
-        if any(word in message_lower for word in ["contact", "contacter", "téléphone", "telephone", "email", "support", "joindre"]):
-            return "contact"
-        
-        # ============ QUESTION HORS SUJET ============
-        return "out_of_scope"
-    
-    async def process_message(self, message: str, user_id: Optional[str] = None, token: Optional[str] = None, user_role: Optional[str] = None) -> dict:
-        """Traite un message et retourne une réponse"""
-        intent = self.detect_intent(message, user_role)
-        
-        response = {
-            "intent": intent,
-            "message": "",
-            "data": None,
-            "actions": []
-        }
-        
-        # ============ SALUTATIONS ============
-        if intent == "greeting":
-            if user_role == "admin":
-                response["message"] = "👋 Bonjour Administrateur! Je peux vous aider à:\n\n• Voir toutes les propriétés\n• Supprimer une propriété\n• Voir toutes les réservations\n• Supprimer une réservation\n\nTapez 'aide' pour voir les commandes."
-            else:
-                response["message"] = "👋 Bonjour! Je suis l'assistant de réservation. Je peux vous aider à:\n\n• Voir les propriétés disponibles\n• Faire une réservation\n• Consulter vos réservations\n\nTapez 'aide' pour voir les commandes."
-        
-        # ============ AIDE ============
-        elif intent == "help":
-            if user_role == "admin":
-                response["message"] = """🤖 **Commandes Admin:**
+PRICE_RE = re.compile(r'(?:sous|moins de|max(?:imum)?|budget|<=?)\s*(\d+(?:[.,]\d+)?)', re.IGNORECASE)
+LOCATION_RE = re.compile(r"(?:\bà|\ba|\bau|\ben|\bdans|\bsur)\s+([A-ZÀ-Ý][\w'-]*(?:\s+[A-ZÀ-Ý][\w'-]*)*)")
 
-📋 **Propriétés**
-• "Voir les propriétés" - Liste toutes les propriétés
-• "Supprimer propriété [ID]" - Supprime une propriété
+PAGE_RE = re.compile(r'\bpage\s*(\d+)', re.IGNORECASE)
 
-📅 **Réservations**
-• "Toutes les réservations" - Liste toutes les réservations
-• "Supprimer réservation [ID]" - Supprime une réservation
+# Intentions qui lisent le catalogue complet
+CATALOGUE_INTENTS = {"list_properties", "find_available"}
 
-💡 Exemple: "Supprimer propriété 507f1f77bcf86cd799439011" """
-            else:
-                response["message"] = """🤖 **Commandes disponibles:**
+# Taille des pages des listes
+PROPERTIES_PAGE_SIZE = 10
+RESERVATIONS_PAGE_SIZE = 10
+ADMIN_RESERVATIONS_PAGE_SIZE = 15
+
+# ============ FORMATAGE DES LISTES ============
+
+def format_property(p: dict) -> str:
+    return f"🏠 **{p.get('title', 'Sans titre')}** - {p.get('price', 'N/A')}$/nuit\n   📍 {p.get('location', 'Non spécifié')}\n   🔑 ID: `{p.get('_id', 'N/A')}`"
+
+def format_available(r: dict) -> str:
+    p = r["property"]
+    line = f"🏠 **{p.get('title', 'Sans titre')}** - {p.get('price', 'N/A')}$/nuit\n   📍 {search.property_location(p) or 'Non spécifié'}\n   🔑 ID: `{p.get('_id', 'N/A')}`"
+    return line if r["verified"] else line + "\n   ⚠️ Disponibilité non vérifiée"
+
+def format_my_reservation(r: dict) -> str:
+    return f"📅 **Réservation** `{r.get('_id', 'N/A')[:8]}...`\n   Du {str(r.get('startDate', 'N/A'))[:10]} au {str(r.get('endDate', 'N/A'))[:10]}\n   Statut: {r.get('status', 'N/A')}"
+
+def format_admin_reservation(r: dict) -> str:
+    return f"📅 `{r.get('_id', 'N/A')}`\n   Du {str(r.get('startDate', 'N/A'))[:10]} au {str(r.get('endDate', 'N/A'))[:10]} | Statut: {r.get('status', 'N/A')}"
+
+# Listes envoyées en streaming: (en-tête, message si vide, taille de page, commande, formatage)
+LISTINGS = {
+    "list_properties": ("📋 **Propriétés disponibles:**", "😕 Aucune propriété disponible pour le moment.", PROPERTIES_PAGE_SIZE, "voir les propriétés", format_property),
+    "my_reservations": ("📋 **Vos réservations:**", "📭 Vous n'avez aucune réservation pour le moment.", RESERVATIONS_PAGE_SIZE, "mes réservations", format_my_reservation),
+    "admin_all_reservations": ("📋 **Toutes les réservations:**", "📭 Aucune réservation dans le système.", ADMIN_RESERVATIONS_PAGE_SIZE, "toutes les réservations", format_admin_reservation),
+}
+
+# Service amont de chaque liste: si son disjoncteur est ouvert, une liste vide
+# signifie "indisponible" et non "aucun résultat"
+LISTING_UPSTREAMS = {
+    "list_properties": api_client.PROPERTY_UPSTREAM,
+    "find_available": api_client.PROPERTY_UPSTREAM,
+    "search_properties": api_client.PROPERTY_UPSTREAM,
+    "my_reservations": api_client.RESERVATION_UPSTREAM,
+    "admin_all_reservations": api_client.RESERVATION_UPSTREAM,
+}
+
+def empty_message(intent: str, default: str) -> str:
+    """Message d'une liste vide, ou message dégradé si le service amont est indisponible"""
+    if api_client.is_degraded(LISTING_UPSTREAMS[intent]):
+        return "⚠️ Ce service est momentanément indisponible. Réessayez dans un instant."
+    return default
+
+def describe_query(query: catalogue.SearchQuery) -> str:
+    """Résumé lisible des filtres d'une recherche"""
+    parts = [query.location] if query.location else []
+    if query.min_price is not None and query.max_price is not None:
+        parts.append(f"entre {query.min_price:g}$ et {query.max_price:g}$")
+    elif query.max_price is not None:
+        parts.append(f"sous {query.max_price:g}$")
+    elif query.min_price is not None:
+        parts.append(f"à partir de {query.min_price:g}$")
+    return ", ".join(parts) or "toutes les propriétés"
+
+def paginate(items: list, page: int, page_size: int) -> Tuple[list, int, int]:
+    """Retourne (éléments de la page, page effective, nombre de pages)"""
+    total_pages = max(1, -(-len(items) // page_size))
+    page = min(max(1, page), total_pages)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, total_pages
+
+def page_footer(page: int, total_pages: int, command: str) -> str:
+    if total_pages <= 1:
+        return ""
+    footer = f"\n\n📄 Page {page}/{total_pages}"
+    if page < total_pages:
+        footer += f" - tapez `{command} page {page + 1}` pour la suite"
+    return footer
+
+# ============ RÉPONSES FIXES ============
+
+# Intention -> texte, par variante de rôle (None: tout utilisateur)
+STATIC_MESSAGES = {
+    "greeting": {
+        None: "👋 Bonjour! Je suis l'assistant de réservation. Je peux vous aider à:\n\n• Voir les propriétés disponibles\n• Faire une réservation\n• Consulter vos réservations\n\nTapez 'aide' pour voir les commandes.",
+        "admin": "👋 Bonjour Administrateur! Je peux vous aider à:\n\n• Voir toutes les propriétés\n• Supprimer une propriété\n• Voir toutes les réservations\n• Supprimer une réservation\n\nTapez 'aide' pour voir les commandes.",
+    },
+    "help": {
+        None: """🤖 **Commandes disponibles:**
 
 📋 **Propriétés**
 • "Voir les propriétés" - Liste les propriétés disponibles
+• "Logement à [ville] sous [prix]$" - Recherche filtrée (aussi "entre [prix] et [prix]$")
+• "Trouve un logement libre du [date-début] au [date-fin]" - Propriétés libres (filtres: "à [ville]", "sous [prix]$")
 
 📅 **Réservations**
 • "Réserver [ID] [date-début] [date-fin]" - Faire une réservation
 • "Mes réservations" - Voir vos réservations
 
-💡 Exemple: "Réserver 507f1f77bcf86cd799439011 2024-01-15 2024-01-20" """
-        
-        # ============ INFO SUR LE SITE ============
-        elif intent == "site_info":
-            response["message"] = """🏠 **Bienvenue sur notre plateforme de réservation!**
+💡 Exemple: "Réserver 507f1f77bcf86cd799439011 2024-01-15 2024-01-20" """,
+        "admin": """🤖 **Commandes Admin:**
+
+📋 **Propriétés**
+• "Voir les propriétés" - Liste toutes les propriétés
+• "Supprimer propriété [ID]" - Supprime une propriété
+
+📅 **Réservations**
+• "Toutes les réservations" - Liste toutes les réservations
+• "Supprimer réservation [ID]" - Supprime une réservation
+
+💡 Exemple: "Supprimer propriété 507f1f77bcf86cd799439011" """,
+    },
+    "site_info": {None: """🏠 **Bienvenue sur notre plateforme de réservation!**
 
 **Comment ça marche:**
 
@@ -182,175 +135,477 @@ class ChatbotEngine:
 • 👤 **Locataire** - Réservez des propriétés
 • 🏠 **Propriétaire** - Publiez vos logements
 
-Tapez 'aide' pour voir les commandes disponibles!"""
-        
-        # ============ LISTER PROPRIÉTÉS ============
-        elif intent == "list_properties":
-            properties = await api_client.get_all_properties()
-            if properties:
-                prop_list = "\n".join([
-                    f"🏠 **{p.get('title', 'Sans titre')}** - {p.get('price', 'N/A')}$/nuit\n   📍 {p.get('location', 'Non spécifié')}\n   🔑 ID: `{p.get('_id', 'N/A')}`"
-                    for p in properties[:10]
-                ])
-                response["message"] = f"📋 **Propriétés disponibles:**\n\n{prop_list}"
-                response["data"] = properties[:10]
-            else:
-                response["message"] = "😕 Aucune propriété disponible pour le moment."
-        
-        # ============ MES RÉSERVATIONS (LOCATAIRE) ============
-        elif intent == "my_reservations":
-            if not user_id or not token:
-                response["message"] = "🔐 Vous devez être connecté pour voir vos réservations."
-                response["actions"] = ["login_required"]
-            else:
-                reservations = await api_client.get_user_reservations(user_id, token)
-                if reservations:
-                    res_list = "\n".join([
-                        f"📅 **Réservation** `{r.get('_id', 'N/A')[:8]}...`\n   Du {str(r.get('startDate', 'N/A'))[:10]} au {str(r.get('endDate', 'N/A'))[:10]}\n   Statut: {r.get('status', 'N/A')}"
-                        for r in reservations[:10]
-                    ])
-                    response["message"] = f"📋 **Vos réservations:**\n\n{res_list}"
-                    response["data"] = reservations
-                else:
-                    response["message"] = "📭 Vous n'avez aucune réservation pour le moment."
-        
-        # ============ FAIRE UNE RÉSERVATION ============
-        elif intent == "make_reservation":
-            response["message"] = """📅 **Pour réserver, envoyez:**
-
-`[ID propriété] [date-arrivée] [date-départ]`
-
-📝 Format des dates: AAAA-MM-JJ
-
-💡 Exemple: `507f1f77bcf86cd799439011 2024-01-15 2024-01-20`
-
-Tapez "voir les propriétés" pour obtenir les IDs."""
-        
-        # ============ CRÉER RÉSERVATION DIRECTE ============
-        elif intent == "create_reservation":
-            property_id, check_in, check_out = self.parse_reservation_request(message)
-            
-            if not user_id or not token:
-                response["message"] = "🔐 Vous devez être connecté pour réserver.\n\nConnectez-vous puis réessayez!"
-                response["actions"] = ["login_required"]
-            else:
-                availability = await api_client.check_availability(property_id, check_in, check_out)
-                
-                if not availability.get("available", True):
-                    response["message"] = f"❌ {availability.get('message', 'Propriété non disponible pour ces dates.')}"
-                else:
-                    reservation_data = {
-                        "propertyId": property_id,
-                        "startDate": check_in,
-                        "endDate": check_out
-                    }
-                    result = await api_client.create_reservation(reservation_data, token)
-                    
-                    if result.get("success"):
-                        response["message"] = f"✅ **Réservation créée!**\n\n📅 Du {check_in} au {check_out}\n🏠 Propriété: `{property_id[:8]}...`\n\nTapez 'mes réservations' pour voir vos réservations."
-                        response["data"] = result.get("data")
-                    else:
-                        response["message"] = f"❌ Erreur: {result.get('message', 'Erreur inconnue')}"
-        
-        # ============ ADMIN: TOUTES LES RÉSERVATIONS ============
-        elif intent == "admin_all_reservations":
-            if user_role != "admin":
-                response["message"] = "🚫 Cette commande est réservée aux administrateurs."
-            elif not token:
-                response["message"] = "🔐 Vous devez être connecté."
-            else:
-                reservations = await api_client.get_all_reservations(token)
-                if reservations:
-                    res_list = "\n".join([
-                        f"📅 `{r.get('_id', 'N/A')}`\n   Du {str(r.get('startDate', 'N/A'))[:10]} au {str(r.get('endDate', 'N/A'))[:10]} | Statut: {r.get('status', 'N/A')}"
-                        for r in reservations[:15]
-                    ])
-                    response["message"] = f"📋 **Toutes les réservations:**\n\n{res_list}\n\n💡 Pour supprimer: `supprimer réservation [ID]`"
-                    response["data"] = reservations
-                else:
-                    response["message"] = "📭 Aucune réservation dans le système."
-        
-        # ============ ADMIN: SUPPRIMER PROPRIÉTÉ ============
-        elif intent == "admin_delete_property":
-            if user_role != "admin":
-                response["message"] = "🚫 Cette commande est réservée aux administrateurs."
-            elif not token:
-                response["message"] = "🔐 Vous devez être connecté."
-            else:
-                property_id = self.extract_id(message)
-                if not property_id:
-                    response["message"] = "❌ Veuillez spécifier l'ID de la propriété à supprimer.\n\n💡 Exemple: `supprimer propriété 507f1f77bcf86cd799439011`"
-                else:
-                    result = await api_client.delete_property(property_id, token)
-                    if result.get("success"):
-                        response["message"] = f"✅ Propriété `{property_id[:8]}...` supprimée avec succès!"
-                    else:
-                        response["message"] = f"❌ Erreur: {result.get('message', 'Impossible de supprimer')}"
-        
-        # ============ ADMIN: SUPPRIMER RÉSERVATION ============
-        elif intent == "admin_delete_reservation":
-            if user_role != "admin":
-                response["message"] = "🚫 Cette commande est réservée aux administrateurs."
-            elif not token:
-                response["message"] = "🔐 Vous devez être connecté."
-            else:
-                reservation_id = self.extract_id(message)
-                if not reservation_id:
-                    response["message"] = "❌ Veuillez spécifier l'ID de la réservation à supprimer.\n\n💡 Exemple: `supprimer réservation 507f1f77bcf86cd799439011`"
-                else:
-                    result = await api_client.delete_reservation(reservation_id, token)
-                    if result.get("success"):
-                        response["message"] = f"✅ Réservation `{reservation_id[:8]}...` supprimée avec succès!"
-                    else:
-                        response["message"] = f"❌ Erreur: {result.get('message', 'Impossible de supprimer')}"
-        
-        # ============ INFORMATIONS ============
-        elif intent == "price_info":
-            response["message"] = """💰 **Informations sur les prix:**
+Tapez 'aide' pour voir les commandes disponibles!"""},
+    "price_info": {None: """💰 **Informations sur les prix:**
 
 • Les prix affichés sont **par nuit**
 • Des frais de service de 10% s'appliquent
 • Le paiement se fait à la réservation
 
-Consultez une propriété pour voir le prix exact."""
-
-        elif intent == "cancel_info":
-            response["message"] = """❌ **Politique d'annulation:**
+Consultez une propriété pour voir le prix exact."""},
+    "cancel_info": {None: """❌ **Politique d'annulation:**
 
 • Annulation **gratuite** jusqu'à 48h avant l'arrivée
 • Annulation tardive: remboursement de 50%
 • Non-présentation: aucun remboursement
 
-Pour annuler, allez dans "Mes réservations"."""
-
-        elif intent == "reviews_info":
-            response["message"] = """⭐ **Avis et évaluations:**
+Pour annuler, allez dans "Mes réservations"."""},
+    "reviews_info": {None: """⭐ **Avis et évaluations:**
 
 • Vous pouvez laisser un avis après votre séjour
 • Les notes vont de 1 à 5 étoiles
-• Les avis aident les autres utilisateurs"""
-
-        elif intent == "account_info":
-            response["message"] = """👤 **Gestion du compte:**
+• Les avis aident les autres utilisateurs"""},
+    "account_info": {None: """👤 **Gestion du compte:**
 
 • **Inscription**: Cliquez sur "S'inscrire"
 • **Connexion**: Cliquez sur "Se connecter"
-• **Profil**: Modifiez vos informations dans votre profil"""
-
-        elif intent == "contact":
-            response["message"] = """📞 **Contact:**
+• **Profil**: Modifiez vos informations dans votre profil"""},
+    "contact": {None: """📞 **Contact:**
 
 • Email: support@reservations.com
-• Horaires: Lun-Ven, 9h-18h"""
+• Horaires: Lun-Ven, 9h-18h"""},
+    "thanks": {None: "😊 Avec plaisir! N'hésitez pas si vous avez d'autres questions sur le site!"},
+    "goodbye": {None: "👋 Au revoir! À bientôt sur notre plateforme!"},
+    "out_of_scope": {None: "❌ **Désolé, je ne peux répondre qu'aux questions concernant le site.**\n\nTapez 'aide' pour voir ce que je peux faire."},
+}
+
+MAKE_RESERVATION_MESSAGE = """📅 **Pour réserver, envoyez:**
+
+`[ID propriété] [date-arrivée] [date-départ]`
+
+📝 Format des dates: AAAA-MM-JJ
+
+💡 Exemple: `507f1f77bcf86cd799439011 2024-01-15 2024-01-20`
+
+Tapez "voir les propriétés" pour obtenir les IDs."""
+
+def role_variant(user_role: Optional[str]) -> Optional[str]:
+    return "admin" if user_role == "admin" else None
 
-        elif intent == "thanks":
-            response["message"] = "😊 Avec plaisir! N'hésitez pas si vous avez d'autres questions sur le site!"
+def static_message(intent: str, user_role: Optional[str]) -> str:
+    """Texte d'une intention statique (hors sujet pour une intention inconnue)"""
+    variants = STATIC_MESSAGES.get(intent, STATIC_MESSAGES[intent_matcher.DEFAULT_INTENT])
+    return variants.get(role_variant(user_role), variants[None])
+
+# Corps JSON de /api/chat encodés une fois pour toutes: (intention, variante de rôle) -> octets
+STATIC_BODIES = {
+    (intent, role): json_codec.dumps({"intent": intent, "message": static_message(intent, role), "data": None, "actions": []})
+    for intent in STATIC_MESSAGES
+    for role in (None, "admin")
+}
+
+def session_key(user_id: Optional[str], session_id: Optional[str]) -> Optional[str]:
+    """Clé de l'état conversationnel: l'utilisateur vérifié, sinon la session anonyme.
+
+    Les deux espaces de clés sont séparés, et session_id (choisi par le
+    client) est ignoré dès qu'une identité vérifiée existe: personne ne
+    peut lire ou amorcer le flux de réservation d'un autre utilisateur.
+    """
+    if user_id:
+        return f"user:{user_id}"
+    if session_id:
+        return f"anon:{session_id}"
+    return None
+
+class Turn(NamedTuple):
+    """Contexte d'un message, transmis aux gestionnaires d'intention"""
+    message: str
+    user_id: Optional[str]
+    token: Optional[str]
+    user_role: Optional[str]
+    page: int
+    session_key: Optional[str]
+    reservation: Optional[tuple]
+
+class ChatbotEngine:
+    """Moteur de chatbot pour la plateforme de réservation"""
+    
+    def __init__(self, sessions=None):
+        # État conversationnel par user_id / session_id (flux multi-tours)
+        self.sessions = sessions if sessions is not None else create_session_store()
+        # Règles par mots-clés, ou hybride règles + classifieur (INTENT_BACKEND)
+        self.detector = create_intent_detector()
+        # Gestionnaire de chaque intention; les autres reçoivent un texte fixe
+        self.handlers = {
+            "list_properties": self._list_properties,
+            "search_properties": self._search_properties,
+            "find_available": self._find_available,
+            "my_reservations": self._my_reservations,
+            "make_reservation": self._make_reservation,
+            "create_reservation": self._create_reservation,
+            "admin_all_reservations": self._admin_all_reservations,
+            "admin_delete_property": self._admin_delete_property,
+            "admin_delete_reservation": self._admin_delete_reservation,
+        }
+    
+    def parse_reservation_request(self, message: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Extrait l'ID de propriété et les dates d'un message de réservation"""
+        return intent_matcher.parse_dates_and_id(message)
+    
+    def parse_search_filters(self, message: str) -> Tuple[Optional[float], Optional[str]]:
+        """Extrait un prix maximum et un lieu d'une recherche ("à Lyon sous 80$")"""
+        prices = PRICE_RE.findall(message)
+        max_price = float(prices[0].replace(",", ".")) if prices else None
+        
+        locations = LOCATION_RE.findall(message)
+        location = locations[0] if locations else None
+        
+        return max_price, location
+    
+    def extract_id(self, message: str) -> Optional[str]:
+        """Extrait un ID MongoDB du message"""
+        ids = intent_matcher.ID_RE.findall(message)
+        return ids[0] if ids else None
+        
+    def detect_intent(self, message: str, user_role: Optional[str] = None) -> str:
+        """Détecte l'intention de l'utilisateur - uniquement questions liées au site"""
+        return metrics.timed_detect(self.detector.detect, message)
+    
+    async def process_batch(self, requests: List[dict], concurrency: int = CHAT_BATCH_CONCURRENCY) -> List[dict]:
+        """Traite plusieurs messages en parallèle (borné), résultats dans l'ordre d'entrée.
+        
+        Chaque élément vaut {"response": ...} ou {"error": ...}. Le catalogue
+        est chargé une seule fois pour tout le lot si une intention en a besoin.
+        Les intentions sont détectées en un seul passage (classifieur vectorisé).
+        """
+        intents = self.detector.detect_many([r.get("message", "") for r in requests])
+        if CATALOGUE_INTENTS.intersection(intents):
+            await api_client.get_all_properties()
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(request: dict, intent: str) -> dict:
+            async with semaphore:
+                try:
+                    return {"response": await self.process_message(**request, intent=intent), "error": None}
+                except Exception as e:
+                    return {"response": None, "error": str(e)}
+        
+        return await asyncio.gather(*(run(r, intent) for r, intent in zip(requests, intents)))
+    
+    def parse_page(self, message: str, page: Optional[int] = None) -> int:
+        """Page demandée: paramètre explicite, sinon "page N" dans le message"""
+        if page:
+            return page
+        pages = PAGE_RE.findall(message)
+        return int(pages[0]) if pages else 1
+    
+    def _can_stream(self, intent: str, user_id: Optional[str], token: Optional[str], user_role: Optional[str]) -> bool:
+        """Les listes sont envoyées ligne par ligne; les refus passent par process_message"""
+        if intent in ("list_properties", "find_available"):
+            return True
+        if intent == "my_reservations":
+            return bool(user_id and token)
+        if intent == "admin_all_reservations":
+            return user_role == "admin" and bool(token)
+        return False
+    
+    async def stream_message(self, message: str, user_id: Optional[str] = None, token: Optional[str] = None, user_role: Optional[str] = None, page: Optional[int] = None, session_id: Optional[str] = None) -> AsyncIterator[Tuple[str, dict]]:
+        """Traite un message en produisant des événements (nom, données) au fil de l'eau.
+        
+        intent -> header -> item* -> footer -> end pour les listes; intent ->
+        message -> end pour les autres intentions.
+        """
+        started = time.perf_counter()
+        with metrics.message_timings() as timings:
+            intent = self.detect_intent(message, user_role)
+            yield "intent", {"intent": intent}
+            
+            if not self._can_stream(intent, user_id, token, user_role):
+                response = await self._process_message(message, user_id, token, user_role, page, session_id)
+                metrics.record_message(response["intent"], time.perf_counter() - started, timings)
+                yield "message", response
+                yield "end", {}
+                return
             
-        elif intent == "goodbye":
-            response["message"] = "👋 Au revoir! À bientôt sur notre plateforme!"
+            async for event in self._stream_listing(intent, message, user_id, token, page):
+                yield event
+            metrics.record_message(intent, time.perf_counter() - started, timings)
+    
+    async def _stream_listing(self, intent: str, message: str, user_id: Optional[str], token: Optional[str], page: Optional[int]) -> AsyncIterator[Tuple[str, dict]]:
+        """Événements header -> item* -> footer -> end d'une liste"""
+        page = self.parse_page(message, page)
+        
+        if intent == "find_available":
+            _, check_in, check_out = self.parse_reservation_request(message)
+            max_price, location = self.parse_search_filters(message)
+            yield "header", {"text": f"📋 **Propriétés libres du {check_in} au {check_out}:**"}
+            count = 0
+            async for result in search.iter_available_properties(check_in, check_out, max_price, location):
+                count += 1
+                yield "item", {"text": format_available(result), "item": result["property"]}
+            if count:
+                yield "footer", {"text": f"💡 Pour réserver: `[ID] {check_in} {check_out}`"}
+            else:
+                yield "footer", {"text": empty_message(intent, f"😕 Aucune propriété libre du {check_in} au {check_out} avec ces critères.")}
+            yield "end", {"total": count}
+            return
+        
+        header, empty, page_size, command, formatter = LISTINGS[intent]
+        yield "header", {"text": header}
+        if intent == "list_properties":
+            items = await api_client.get_all_properties()
+        elif intent == "my_reservations":
+            items = await api_client.get_user_reservations(user_id, token)
+        else:
+            items = await api_client.get_all_reservations(token)
+        
+        if not items:
+            yield "footer", {"text": empty_message(intent, empty)}
+            yield "end", {"total": 0, "page": 1, "total_pages": 1}
+            return
+        
+        page_items, page, total_pages = paginate(items, page, page_size)
+        for item in page_items:
+            yield "item", {"text": formatter(item), "item": item}
+        footer = page_footer(page, total_pages, command).strip()
+        if footer:
+            yield "footer", {"text": footer}
+        yield "end", {"total": len(items), "page": page, "total_pages": total_pages}
+    
+    async def _reservation_flow(self, session_key: str, message: str, intent: str) -> Tuple[str, Optional[tuple], Optional[str]]:
+        """Poursuit le flux "réserver" sur plusieurs messages.
+        
+        Retourne (intention, (property_id, check_in, check_out) si complet,
+        question à poser si une information manque encore).
+        """
+        property_id, check_in, check_out = self.parse_reservation_request(message)
+        if intent == "make_reservation":
+            await self.sessions.set(session_key, SessionState("reserve", property_id, check_in, check_out))
+            return intent, None, None
+        
+        # Seuls les messages qui apportent un ID ou des dates poursuivent le flux
+        if intent not in ("out_of_scope", "create_reservation") or not (property_id or check_in):
+            return intent, None, None
+        state = await self.sessions.get(session_key)
+        if state is None or state.flow != "reserve":
+            return intent, None, None
+        
+        state.property_id = property_id or state.property_id
+        if check_in and check_out:
+            state.check_in, state.check_out = check_in, check_out
+        elif check_in:
+            if state.check_in and not state.check_out:
+                state.check_out = check_in
+            else:
+                state.check_in = check_in
+        
+        if state.property_id and state.check_in and state.check_out:
+            await self.sessions.delete(session_key)
+            return "create_reservation", (state.property_id, state.check_in, state.check_out), None
+        
+        await self.sessions.set(session_key, state)
+        if not state.property_id:
+            question = "🔑 Quel est l'ID de la propriété à réserver?\n\nTapez \"voir les propriétés\" pour obtenir les IDs."
+        elif not state.check_in:
+            question = "📅 Quelles sont vos dates? Envoyez `[date-arrivée] [date-départ]`\n\n📝 Format des dates: AAAA-MM-JJ"
+        else:
+            question = f"📅 Arrivée le {state.check_in}. Quelle est votre date de départ? (AAAA-MM-JJ)"
+        return "make_reservation", None, question
+    
+    async def process_message(self, message: str, user_id: Optional[str] = None, token: Optional[str] = None, user_role: Optional[str] = None, page: Optional[int] = None, session_id: Optional[str] = None, intent: Optional[str] = None) -> dict:
+        """Traite un message et retourne une réponse (intention déjà détectée en lot si fournie)"""
+        started = time.perf_counter()
+        with metrics.message_timings() as timings:
+            response = await self._process_message(message, user_id, token, user_role, page, session_id, intent)
+        # Intention finale: le flux de réservation peut la changer en cours de route
+        metrics.record_message(response["intent"], time.perf_counter() - started, timings)
+        return response
+    
+    async def process_message_json(self, message: str, user_id: Optional[str] = None, token: Optional[str] = None, user_role: Optional[str] = None, page: Optional[int] = None, session_id: Optional[str] = None) -> bytes:
+        """Comme process_message, mais retourne directement le corps JSON de la réponse.
+        
+        Les intentions statiques répondent avec des octets pré-encodés (ni
+        dictionnaire, ni validation); les autres sont encodées par json_codec.
+        """
+        started = time.perf_counter()
+        with metrics.message_timings() as timings:
+            intent = self.detect_intent(message, user_role)
+            body = self.static_body(intent, message, session_key(user_id, session_id), user_role)
+            if body is None:
+                response = await self._process_message(message, user_id, token, user_role, page, session_id, intent)
+                intent, body = response["intent"], json_codec.dumps(response)
+        metrics.record_message(intent, time.perf_counter() - started, timings)
+        return body
+    
+    def static_body(self, intent: str, message: str, session_key: Optional[str], user_role: Optional[str]) -> Optional[bytes]:
+        """Corps pré-encodé si la réponse ne dépend que de l'intention et du rôle, sinon None"""
+        if intent not in STATIC_MESSAGES:
+            return None
+        # Un ID ou des dates "hors sujet" peuvent poursuivre un flux de réservation
+        if intent == intent_matcher.DEFAULT_INTENT and session_key:
+            property_id, check_in, _ = self.parse_reservation_request(message)
+            if property_id or check_in:
+                return None
+        return STATIC_BODIES[(intent, role_variant(user_role))]
+    
+    async def _process_message(self, message: str, user_id: Optional[str], token: Optional[str], user_role: Optional[str], page: Optional[int], session_id: Optional[str], intent: Optional[str] = None) -> dict:
+        if intent is None:
+            intent = self.detect_intent(message, user_role)
+        page = self.parse_page(message, page)
+        
+        # Flux multi-tours: l'ID et les dates peuvent arriver en plusieurs messages
+        reservation, question = None, None
+        key = session_key(user_id, session_id)
+        if key:
+            intent, reservation, question = await self._reservation_flow(key, message, intent)
+        
+        response = {
+            "intent": intent,
+            "message": "",
+            "data": None,
+            "actions": []
+        }
         
-        # ============ QUESTION HORS SUJET ============
+        if question:
+            response["message"] = question
         else:
-            response["message"] = "❌ **Désolé, je ne peux répondre qu'aux questions concernant le site.**\n\nTapez 'aide' pour voir ce que je peux faire."
+            handler = self.handlers.get(intent, self._static)
+            await handler(Turn(message, user_id, token, user_role, page, key, reservation), response)
         
         return response
+    
+    # ============ RÉPONSES FIXES ============
+    async def _static(self, turn: Turn, response: dict):
+        response["message"] = static_message(response["intent"], turn.user_role)
+    
+    # ============ LISTER PROPRIÉTÉS ============
+    async def _list_properties(self, turn: Turn, response: dict):
+        properties = await api_client.get_all_properties()
+        if properties:
+            items, page, total_pages = paginate(properties, turn.page, PROPERTIES_PAGE_SIZE)
+            prop_list = "\n".join([format_property(p) for p in items])
+            response["message"] = f"📋 **Propriétés disponibles:**\n\n{prop_list}" + page_footer(page, total_pages, "voir les propriétés")
+            response["data"] = items
+        else:
+            response["message"] = empty_message("list_properties", "😕 Aucune propriété disponible pour le moment.")
+    
+    # ============ RECHERCHE FILTRÉE (RÉPLIQUE LOCALE) ============
+    async def _search_properties(self, turn: Turn, response: dict):
+        message = turn.message
+        query, results = await catalogue.replica.search(PAGE_RE.sub(" ", message))
+        if results:
+            items, page, total_pages = paginate(results, turn.page, PROPERTIES_PAGE_SIZE)
+            prop_list = "\n".join([format_property(p) for p in items])
+            response["message"] = f"🔎 **{len(results)} propriété(s) - {describe_query(query)}:**\n\n{prop_list}" + page_footer(page, total_pages, PAGE_RE.sub("", message).strip())
+            response["data"] = items
+        else:
+            response["message"] = empty_message("search_properties", f"😕 Aucune propriété ne correspond à votre recherche ({describe_query(query)}).")
+    
+    # ============ CHERCHER UNE PROPRIÉTÉ LIBRE ============
+    async def _find_available(self, turn: Turn, response: dict):
+        message = turn.message
+        _, check_in, check_out = self.parse_reservation_request(message)
+        max_price, location = self.parse_search_filters(message)
+        results = await search.find_available_properties(check_in, check_out, max_price, location)
+        if results:
+            items, page, total_pages = paginate(results, turn.page, PROPERTIES_PAGE_SIZE)
+            prop_list = "\n".join([format_available(r) for r in items])
+            response["message"] = f"📋 **Propriétés libres du {check_in} au {check_out}:**\n\n{prop_list}\n\n💡 Pour réserver: `[ID] {check_in} {check_out}`" + page_footer(page, total_pages, PAGE_RE.sub("", message).strip())
+            response["data"] = [r["property"] for r in items]
+        else:
+            response["message"] = empty_message("find_available", f"😕 Aucune propriété libre du {check_in} au {check_out} avec ces critères.")
+    
+    # ============ MES RÉSERVATIONS (LOCATAIRE) ============
+    async def _my_reservations(self, turn: Turn, response: dict):
+        if not turn.user_id or not turn.token:
+            response["message"] = "🔐 Vous devez être connecté pour voir vos réservations."
+            response["actions"] = ["login_required"]
+            return
+        reservations = await api_client.get_user_reservations(turn.user_id, turn.token)
+        if reservations:
+            items, page, total_pages = paginate(reservations, turn.page, RESERVATIONS_PAGE_SIZE)
+            res_list = "\n".join([format_my_reservation(r) for r in items])
+            response["message"] = f"📋 **Vos réservations:**\n\n{res_list}" + page_footer(page, total_pages, "mes réservations")
+            response["data"] = items
+        else:
+            response["message"] = empty_message("my_reservations", "📭 Vous n'avez aucune réservation pour le moment.")
+    
+    # ============ FAIRE UNE RÉSERVATION ============
+    async def _make_reservation(self, turn: Turn, response: dict):
+        response["message"] = MAKE_RESERVATION_MESSAGE
+        if turn.session_key:
+            response["message"] += "\n\n💬 Vous pouvez aussi m'envoyer l'ID puis les dates, un message à la fois."
+    
+    # ============ CRÉER RÉSERVATION DIRECTE ============
+    async def _create_reservation(self, turn: Turn, response: dict):
+        property_id, check_in, check_out = turn.reservation or self.parse_reservation_request(turn.message)
+        
+        if not turn.user_id or not turn.token:
+            response["message"] = "🔐 Vous devez être connecté pour réserver.\n\nConnectez-vous puis réessayez!"
+            response["actions"] = ["login_required"]
+            return
+        
+        availability = await api_client.check_availability(property_id, check_in, check_out)
+        if not availability.get("available", True):
+            response["message"] = f"❌ {availability.get('message', 'Propriété non disponible pour ces dates.')}"
+            return
+        
+        reservation_data = {
+            "propertyId": property_id,
+            "startDate": check_in,
+            "endDate": check_out
+        }
+        result = await api_client.create_reservation(reservation_data, turn.token)
+        
+        if result.get("success"):
+            response["message"] = f"✅ **Réservation créée!**\n\n📅 Du {check_in} au {check_out}\n🏠 Propriété: `{property_id[:8]}...`\n\nTapez 'mes réservations' pour voir vos réservations."
+            response["data"] = result.get("data")
+        else:
+            response["message"] = f"❌ Erreur: {result.get('message', 'Erreur inconnue')}"
+    
+    def _admin_refusal(self, turn: Turn) -> Optional[str]:
+        """Message de refus d'une commande admin, None si elle est autorisée"""
+        if turn.user_role != "admin":
+            return "🚫 Cette commande est réservée aux administrateurs."
+        if not turn.token:
+            return "🔐 Vous devez être connecté."
+        return None
+    
+    # ============ ADMIN: TOUTES LES RÉSERVATIONS ============
+    async def _admin_all_reservations(self, turn: Turn, response: dict):
+        refusal = self._admin_refusal(turn)
+        if refusal:
+            response["message"] = refusal
+            return
+        reservations = await api_client.get_all_reservations(turn.token)
+        if reservations:
+            items, page, total_pages = paginate(reservations, turn.page, ADMIN_RESERVATIONS_PAGE_SIZE)
+            res_list = "\n".join([format_admin_reservation(r) for r in items])
+            response["message"] = f"📋 **Toutes les réservations:**\n\n{res_list}\n\n💡 Pour supprimer: `supprimer réservation [ID]`" + page_footer(page, total_pages, "toutes les réservations")
+            response["data"] = items
+        else:
+            response["message"] = empty_message("admin_all_reservations", "📭 Aucune réservation dans le système.")
+    
+    # ============ ADMIN: SUPPRIMER PROPRIÉTÉ ============
+    async def _admin_delete_property(self, turn: Turn, response: dict):
+        refusal = self._admin_refusal(turn)
+        if refusal:
+            response["message"] = refusal
+            return
+        property_id = self.extract_id(turn.message)
+        if not property_id:
+            response["message"] = "❌ Veuillez spécifier l'ID de la propriété à supprimer.\n\n💡 Exemple: `supprimer propriété 507f1f77bcf86cd799439011`"
+            return
+        result = await api_client.delete_property(property_id, turn.token)
+        if result.get("success"):
+            catalogue.replica.forget(property_id)
+            response["message"] = f"✅ Propriété `{property_id[:8]}...` supprimée avec succès!"
+        else:
+            response["message"] = f"❌ Erreur: {result.get('message', 'Impossible de supprimer')}"
+    
+    # ============ ADMIN: SUPPRIMER RÉSERVATION ============
+    async def _admin_delete_reservation(self, turn: Turn, response: dict):
+        refusal = self._admin_refusal(turn)
+        if refusal:
+            response["message"] = refusal
+            return
+        reservation_id = self.extract_id(turn.message)
+        if not reservation_id:
+            response["message"] = "❌ Veuillez spécifier l'ID de la réservation à supprimer.\n\n💡 Exemple: `supprimer réservation 507f1f77bcf86cd799439011`"
+            return
+        result = await api_client.delete_reservation(reservation_id, turn.token)
+        if result.get("success"):
+            response["message"] = f"✅ Réservation `{reservation_id[:8]}...` supprimée avec succès!"
+        else:
+            response["message"] = f"❌ Erreur: {result.get('message', 'Impossible de supprimer')}"
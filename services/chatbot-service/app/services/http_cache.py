@@ -0,0 +1,146 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import httpx
+
+MAX_AGE_RE = re.compile(r"\bmax-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+class CachedResponse:
+    """Réponse 200 mémorisée: validateurs, corps déjà décodé et fraîcheur"""
+
+    __slots__ = ("etag", "last_modified", "body", "size", "expires_at")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], body: Any, size: int, expires_at: float):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.size = size
+        self.expires_at = expires_at
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """En-têtes d'une requête conditionnelle"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def freshness(cache_control: str) -> Optional[float]:
+    """Durée de fraîcheur (secondes) d'après Cache-Control, None si la réponse ne doit pas être gardée.
+
+    Sans max-age (ou avec no-cache), la réponse est gardée mais revalidée
+    à chaque lecture: seul le 304 évite alors le téléchargement.
+    """
+    directives = cache_control.lower()
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    match = MAX_AGE_RE.search(directives)
+    return float(match.group(1)) if match else 0.0
+
+
+class HttpCache:
+    """Cache HTTP des GET amont (RFC 9111, sous-ensemble utile au chatbot).
+
+    - frais (max-age non écoulé): servi sans requête
+    - sinon: requête conditionnelle (If-None-Match / If-Modified-Since);
+      sur 304, l'objet déjà décodé est réutilisé sans relire de JSON
+    - LRU borné par la taille cumulée des corps reçus (octets)
+
+    La clé inclut la portée d'authentification: une réponse propre à un
+    utilisateur n'est jamais servie à un autre. Les corps sont partagés
+    entre appelants et ne doivent pas être modifiés.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.bytes = 0
+        self.fresh_hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def fresh(self, key: Hashable) -> Optional[CachedResponse]:
+        """Entrée servable sans requête, None s'il faut interroger le service amont"""
+        entry = self._entries.get(key)
+        if entry is None or not entry.is_fresh(time.monotonic()):
+            return None
+        self._entries.move_to_end(key)
+        self.fresh_hits += 1
+        self.bytes_saved += entry.size
+        return entry
+
+    def store(self, key: Hashable, response: httpx.Response, body: Any):
+        """Mémorise une réponse 200 si elle porte un validateur ou un max-age"""
+        self.misses += 1
+        if self.max_bytes <= 0:
+            return
+        max_age = freshness(response.headers.get("cache-control", ""))
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        size = len(response.content)
+        if max_age is None or not (etag or last_modified or max_age) or size > self.max_bytes:
+            self.discard(key)
+            return
+        self.discard(key)
+        self._entries[key] = CachedResponse(etag, last_modified, body, size, time.monotonic() + max_age)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def revalidated(self, key: Hashable, response: httpx.Response) -> Optional[CachedResponse]:
+        """Réponse 304: prolonge l'entrée et retourne le corps déjà décodé"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        max_age = freshness(response.headers.get("cache-control", ""))
+        if max_age is None:
+            self.discard(key)
+            return entry
+        entry.expires_at = time.monotonic() + max_age
+        entry.etag = response.headers.get("etag", entry.etag)
+        self.not_modified += 1
+        self.bytes_saved += entry.size
+        return entry
+
+    def discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.fresh_hits + self.not_modified + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "fresh_hits": self.fresh_hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "hit_ratio": round((self.fresh_hits + self.not_modified) / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
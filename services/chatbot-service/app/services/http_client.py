@@ -0,0 +1,73 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+
+from app.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT,
+    PROPERTY_SERVICE_TIMEOUT,
+    RESERVATION_SERVICE_TIMEOUT,
+    ENDPOINT_TIMEOUTS,
+)
+
+# Client partagé, ouvert et fermé par le lifespan de l'application
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 nécessite le paquet optionnel `h2`"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def upstream_timeout(total: float) -> httpx.Timeout:
+    """Construit le timeout d'un service amont (connexion plafonnée)"""
+    return httpx.Timeout(total, connect=min(HTTP_CONNECT_TIMEOUT, total))
+
+
+# Timeout explicite de chaque endpoint amont
+TIMEOUTS = {endpoint: upstream_timeout(total) for endpoint, total in ENDPOINT_TIMEOUTS.items()}
+
+
+async def start_client() -> httpx.AsyncClient:
+    """Ouvre le client HTTP partagé (keep-alive, pool de connexions)"""
+    global _client
+    if _client is None:
+        http2 = HTTP2_ENABLED and _http2_available()
+        if HTTP2_ENABLED and not http2:
+            print("⚠️ HTTP2_ENABLED ignoré: installez `httpx[http2]`")
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=upstream_timeout(max(PROPERTY_SERVICE_TIMEOUT, RESERVATION_SERVICE_TIMEOUT)),
+            http2=http2,
+        )
+    return _client
+
+
+async def close_client():
+    """Ferme le client HTTP partagé"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def get_client():
+    """Fournit le client partagé, ou un client éphémère hors du lifespan (scripts)"""
+    if _client is not None:
+        yield _client
+    else:
+        async with httpx.AsyncClient() as client:
+            yield client
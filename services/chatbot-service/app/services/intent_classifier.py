@@ -0,0 +1,306 @@
+"""Classifieur d'intentions: TF-IDF sur n-grammes de caractères + régression logistique.
+
+Tout est vectorisé avec NumPy, pour un lot entier de messages: les
+n-grammes (octets UTF-8 du texte normalisé) sont codés en entiers, puis
+retrouvés dans le vocabulaire trié par dichotomie. Le modèle tient dans
+un artefact .npz (codes du vocabulaire, idf, poids, biais, classes).
+
+Entraînement hors ligne, depuis les exemples de /api/chat/intents et un
+corpus annoté:
+
+    cd services/chatbot-service
+    python -m app.services.intent_classifier --corpus benchmarks/intent_corpus.json
+"""
+import argparse
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import INTENT_BACKEND, INTENT_CLASSIFIER_THRESHOLD, INTENT_MODEL_PATH
+from app.services import intent_matcher
+from app.services.search import normalize
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle (INTENT_BACKEND=hybrid)
+    np = None
+
+SPACES_RE = re.compile(r"\s+")
+
+NGRAM_RANGE = (2, 4)
+
+# Intentions qui dépendent d'un ID, de dates ou de filtres, et actions d'administration
+# (suppressions): réservées aux règles, jamais devinées par le classifieur
+RULE_ONLY_INTENTS = frozenset(
+    intent for intent, _, condition in intent_matcher.RULES if condition is not None or intent.startswith("admin_")
+)
+
+
+def _encode(message: str) -> bytes:
+    """Texte normalisé (minuscules, sans accents, espaces réduits) encadré d'espaces"""
+    return (" " + SPACES_RE.sub(" ", normalize(message)).strip() + " ").encode("utf-8")
+
+
+def ngram_codes(messages: Sequence[str], ngram_range: Tuple[int, int] = NGRAM_RANGE):
+    """(ligne, code) de chaque n-gramme de chaque message, en tableaux NumPy.
+
+    Un n-gramme de n octets devient l'entier big-endian de ses octets,
+    marqué de sa longueur (n << 40); les n-grammes à cheval sur deux
+    messages sont écartés.
+    """
+    encoded = [_encode(message) for message in messages]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+    owner = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+    rows, codes = [], []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        count = len(data) - n + 1
+        if count <= 0:
+            continue
+        code = np.full(count, n << 40, dtype=np.int64)
+        for k in range(n):
+            code |= data[k:k + count] << (8 * (n - 1 - k))
+        same = owner[:count] == owner[n - 1:n - 1 + count]
+        rows.append(owner[:count][same])
+        codes.append(code[same])
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(codes)
+
+
+class IntentClassifier:
+    """TF-IDF (n-grammes de caractères, normalisé L2) puis softmax linéaire"""
+
+    def __init__(self, vocabulary, idf, weights, bias, classes: Sequence[str], ngram_range=NGRAM_RANGE):
+        self.vocabulary = vocabulary  # codes triés (int64)
+        self.idf = idf
+        self.weights = weights  # (features, classes)
+        self.bias = bias
+        self.classes = list(classes)
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+
+    # ============ VECTORISATION ============
+
+    def _tfidf(self, messages: Sequence[str]):
+        """Matrice creuse (lignes, colonnes, valeurs) triée par ligne, lignes normalisées L2"""
+        rows, codes = ngram_codes(messages, self.ngram_range)
+        index = np.searchsorted(self.vocabulary, codes)
+        index[index == len(self.vocabulary)] = 0
+        known = self.vocabulary[index] == codes
+        rows, cols = rows[known], index[known]
+        # Fréquence de chaque (ligne, colonne), triée par ligne
+        keys, tf = np.unique(rows * len(self.vocabulary) + cols, return_counts=True)
+        rows, cols = keys // len(self.vocabulary), keys % len(self.vocabulary)
+        values = tf * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(messages)))
+        values = values / norms[rows]
+        return rows, cols, values
+
+    def decision_function(self, messages: Sequence[str]):
+        scores = np.tile(self.bias, (len(messages), 1))
+        rows, cols, values = self._tfidf(messages)
+        if len(rows):
+            # Somme par ligne des contributions valeur x poids (lignes contiguës)
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            contributions = values[:, None] * self.weights[cols]
+            scores[rows[starts]] += np.add.reduceat(contributions, starts, axis=0)
+        return scores
+
+    def predict_proba(self, messages: Sequence[str]):
+        scores = self.decision_function(messages)
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, messages: Sequence[str]) -> Tuple[List[str], List[float]]:
+        """(intention, probabilité) de chaque message"""
+        if not messages:
+            return [], []
+        proba = self.predict_proba(messages)
+        best = proba.argmax(axis=1)
+        return [self.classes[i] for i in best], proba[np.arange(len(messages)), best].tolist()
+
+    # ============ ENTRAÎNEMENT ============
+
+    @classmethod
+    def train(cls, messages: Sequence[str], labels: Sequence[str], epochs: int = 300, learning_rate: float = 2.0,
+              l2: float = 1e-4, ngram_range: Tuple[int, int] = NGRAM_RANGE) -> "IntentClassifier":
+        """Régression logistique multinomiale, descente de gradient (avec moment) sur tout le lot"""
+        rows, codes = ngram_codes(messages, ngram_range)
+        vocabulary = np.unique(codes)
+        # idf lissé: log((1 + n) / (1 + df)) + 1
+        df = np.bincount(np.searchsorted(vocabulary, np.unique(rows * (1 << 48) + codes) % (1 << 48)),
+                         minlength=len(vocabulary))
+        idf = np.log((1 + len(messages)) / (1 + df)) + 1.0
+        classes = sorted(set(labels))
+        model = cls(vocabulary, idf, np.zeros((len(vocabulary), len(classes))), np.zeros(len(classes)), classes,
+                    ngram_range)
+
+        r, c, v = model._tfidf(messages)
+        x = np.zeros((len(messages), len(vocabulary)))
+        x[r, c] = v
+        y = np.zeros((len(messages), len(classes)))
+        y[np.arange(len(messages)), [classes.index(label) for label in labels]] = 1.0
+        # Classes rares pondérées pour ne pas être absorbées par les fréquentes
+        sample_weight = (1.0 / y.sum(axis=0))[y.argmax(axis=1)]
+        sample_weight *= len(messages) / sample_weight.sum()
+
+        velocity_w, velocity_b = np.zeros_like(model.weights), np.zeros_like(model.bias)
+        for _ in range(epochs):
+            scores = x @ model.weights + model.bias
+            scores -= scores.max(axis=1, keepdims=True)
+            proba = np.exp(scores)
+            proba /= proba.sum(axis=1, keepdims=True)
+            error = (proba - y) * sample_weight[:, None] / len(messages)
+            velocity_w = 0.9 * velocity_w - learning_rate * (x.T @ error + l2 * model.weights)
+            velocity_b = 0.9 * velocity_b - learning_rate * error.sum(axis=0)
+            model.weights += velocity_w
+            model.bias += velocity_b
+
+        # Artefact compact: les n-grammes sans poids utile sont retirés
+        keep = np.abs(model.weights).max(axis=1) > 1e-3
+        model.vocabulary, model.idf, model.weights = vocabulary[keep], idf[keep], model.weights[keep]
+        return model
+
+    # ============ ARTEFACT ============
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            vocabulary=self.vocabulary,
+            idf=self.idf.astype(np.float32),
+            weights=self.weights.astype(np.float32),
+            bias=self.bias.astype(np.float32),
+            classes=np.array(self.classes),
+            ngram_range=np.array(self.ngram_range),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(
+                artifact["vocabulary"],
+                artifact["idf"].astype(np.float64),
+                artifact["weights"].astype(np.float64),
+                artifact["bias"].astype(np.float64),
+                artifact["classes"].tolist(),
+                artifact["ngram_range"].tolist(),
+            )
+
+
+# ============ BACKENDS DE DÉTECTION ============
+
+class KeywordDetector:
+    """Règles par mots-clés seules (IntentMatcher)"""
+
+    backend = "keywords"
+
+    def __init__(self, matcher: intent_matcher.IntentMatcher = intent_matcher.matcher):
+        self.matcher = matcher
+
+    def detect(self, message: str) -> str:
+        return self.matcher.detect(message)
+
+    def detect_many(self, messages: Sequence[str]) -> List[str]:
+        return [self.matcher.detect(message) for message in messages]
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+
+class HybridDetector(KeywordDetector):
+    """Règles d'abord (chemin rapide), classifieur pour ce qu'elles ne reconnaissent pas.
+
+    Seuls les messages classés hors sujet par les règles passent par le
+    classifieur; sa prédiction n'est retenue qu'au-delà de `threshold`
+    et jamais pour une intention qui exige un ID, des dates ou des filtres.
+    """
+
+    backend = "hybrid"
+
+    def __init__(self, classifier: IntentClassifier, threshold: float = INTENT_CLASSIFIER_THRESHOLD,
+                 matcher: intent_matcher.IntentMatcher = intent_matcher.matcher):
+        super().__init__(matcher)
+        self.classifier = classifier
+        self.threshold = threshold
+        self.fast_path = 0
+        self.classified = 0
+        self.accepted = 0
+
+    def _resolve(self, intent: str, probability: float) -> str:
+        if intent in RULE_ONLY_INTENTS or probability < self.threshold:
+            return intent_matcher.DEFAULT_INTENT
+        if intent != intent_matcher.DEFAULT_INTENT:
+            self.accepted += 1
+        return intent
+
+    def detect(self, message: str) -> str:
+        return self.detect_many([message])[0]
+
+    def detect_many(self, messages: Sequence[str]) -> List[str]:
+        intents = [self.matcher.detect(message) for message in messages]
+        pending = [i for i, intent in enumerate(intents) if intent == intent_matcher.DEFAULT_INTENT and messages[i].strip()]
+        self.fast_path += len(messages) - len(pending)
+        if pending:
+            self.classified += len(pending)
+            predicted, probabilities = self.classifier.predict([messages[i] for i in pending])
+            for i, intent, probability in zip(pending, predicted, probabilities):
+                intents[i] = self._resolve(intent, probability)
+        return intents
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "threshold": self.threshold,
+            "fast_path": self.fast_path,
+            "classified": self.classified,
+            "accepted": self.accepted,
+        }
+
+
+def create_intent_detector(backend: str = INTENT_BACKEND, model_path: str = INTENT_MODEL_PATH):
+    """Backend choisi par INTENT_BACKEND (keywords | hybrid), règles seules si le modèle est indisponible"""
+    if backend != "hybrid":
+        return KeywordDetector()
+    if np is None:
+        print("⚠️ INTENT_BACKEND=hybrid ignoré: installez `numpy`")
+        return KeywordDetector()
+    try:
+        return HybridDetector(IntentClassifier.load(model_path))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"⚠️ Modèle d'intentions {model_path} illisible, règles seules: {e}")
+        return KeywordDetector()
+
+
+# ============ DONNÉES D'ENTRAÎNEMENT ============
+
+def training_data(corpus_path: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """Exemples de /api/chat/intents puis corpus annoté, limités aux intentions traitées"""
+    known = {intent for intent, _, _ in intent_matcher.RULES} | {intent_matcher.DEFAULT_INTENT}
+    pairs = [(example, name) for name, examples in intent_matcher.INTENT_EXAMPLES.items() for example in examples]
+    if corpus_path:
+        with open(corpus_path, encoding="utf-8") as f:
+            pairs += [(item["message"], item["intent"]) for item in json.load(f)]
+    pairs = [(message, intent) for message, intent in pairs if intent in known and message.strip()]
+    return [message for message, _ in pairs], [intent for _, intent in pairs]
+
+
+def main(args):
+    messages, labels = training_data(args.corpus)
+    model = IntentClassifier.train(messages, labels, epochs=args.epochs)
+    model.save(args.output)
+    predicted, _ = model.predict(messages)
+    accuracy = sum(p == label for p, label in zip(predicted, labels)) / len(labels)
+    size = os.path.getsize(args.output)
+    print(f"✅ {args.output}: {len(messages)} exemples, {len(model.classes)} intentions, "
+          f"{len(model.vocabulary)} n-grammes, {size / 1024:.0f} Ko (exactitude entraînement {accuracy:.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="benchmarks/intent_corpus.json")
+    parser.add_argument("--output", default=INTENT_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=300)
+    main(parser.parse_args())
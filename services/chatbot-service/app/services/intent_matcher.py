@@ -0,0 +1,256 @@
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Expressions compilées une seule fois
+DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+ID_RE = re.compile(r'([a-fA-F0-9]{24})')
+
+# Filtres de recherche: prix ("sous 80$", "plus de 50", "entre 50 et 100") et lieu ("à Lyon", "dans montréal")
+MAX_PRICE_RE = re.compile(r'(?:sous|moins de|max(?:imum)?|budget|<=?)\s*(\d+(?:[.,]\d+)?)\s*\$?', re.IGNORECASE)
+MIN_PRICE_RE = re.compile(r'(?:plus de|au moins|min(?:imum)?|[àa] partir de|>=?)\s*(\d+(?:[.,]\d+)?)\s*\$?', re.IGNORECASE)
+PRICE_RANGE_RE = re.compile(r'entre\s*(\d+(?:[.,]\d+)?)\s*\$?\s*et\s*(\d+(?:[.,]\d+)?)\s*\$?', re.IGNORECASE)
+# Lieu en majuscule après une préposition, ou un mot après "à/au/aux/dans/vers"
+# (ce dernier n'est un lieu que s'il est connu du catalogue, voir has_place)
+PLACE_RE = re.compile(
+    r"(?:\b(?:à|a|au|aux|en|dans|sur|vers)\s+([A-ZÀ-Ý][\w'-]*(?:\s+[A-ZÀ-Ý][\w'-]*)*))"
+    r"|(?:\b(?:à|au|aux|dans|vers)\s+([^\W\d_][\w'-]+))"
+)
+
+# ============ GROUPES DE MOTS-CLÉS ============
+# Recherche par sous-chaîne dans le message en minuscules (comme `word in message`)
+
+KEYWORD_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "greeting": ("bonjour", "salut", "hello", "hi", "hey", "bonsoir"),
+    "help": ("aide", "help", "aider", "quoi faire", "que peux-tu", "que peux tu", "commandes"),
+    "site_info": (
+        "comment fonctionne", "comment ça marche", "comment ca marche", "c'est quoi", "qu'est-ce que",
+        "présentation", "presentation", "fonctionnement", "à quoi sert", "a quoi sert",
+        "expliquer le site", "explique le site",
+    ),
+    "thanks": ("merci", "thanks", "parfait", "super", "génial", "excellent"),
+    "goodbye": ("bye", "au revoir", "à bientôt", "ciao", "bonne journée", "bonne nuit"),
+    "search": ("libre", "disponible", "dispo", "trouve", "cherche"),
+    "property": (
+        "propriété", "propriétés", "proprietes", "logement", "logements", "appartement", "maison",
+        "liste", "voir les", "afficher",
+    ),
+    "delete": ("supprimer", "effacer", "delete"),
+    "cancel_verb": ("annuler",),
+    "my_reservations": (
+        "mes réservation", "mes reservation", "mes reservations", "mes réservations", "mon historique",
+        "mes locations",
+    ),
+    "all": ("toutes", "all", "tout"),
+    "reservation_word": ("réservation", "reservation"),
+    "book": ("réserver", "reserver", "reservation", "réservation", "book", "louer"),
+    "price_info": ("prix", "coût", "cout", "tarif", "combien", "payer", "paiement"),
+    "cancel_info": ("annuler", "annulation", "cancel", "rembours"),
+    "reviews_info": ("avis", "review", "commentaire", "note", "évaluation", "evaluation"),
+    "account_info": (
+        "compte", "profil", "inscription", "connexion", "mot de passe", "password", "login", "signup",
+    ),
+    "contact": ("contact", "contacter", "téléphone", "telephone", "email", "support", "joindre"),
+}
+
+# ============ TABLE DE PRIORITÉ ============
+# (intention, groupes requis - chacun doit matcher, alternatives = tuple,
+#  condition supplémentaire sur le message). Évaluée dans l'ordre: la
+# première règle satisfaite l'emporte.
+
+RULES: Tuple[Tuple[str, Tuple[Tuple[str, ...], ...], Optional[str]], ...] = (
+    ("greeting", (("greeting",),), None),
+    ("help", (("help",),), None),
+    ("site_info", (("site_info",),), None),
+    ("thanks", (("thanks",),), None),
+    ("goodbye", (("goodbye",),), None),
+    ("find_available", (("search",),), "dates_without_id"),
+    ("admin_delete_property", (("property",), ("delete",)), None),
+    ("search_properties", (("property", "search"),), "search_filters"),
+    ("list_properties", (("property",),), None),
+    ("my_reservations", (("my_reservations",),), None),
+    ("admin_all_reservations", (("all",), ("reservation_word",)), None),
+    ("admin_delete_reservation", (("delete", "cancel_verb"), ("reservation_word",)), None),
+    ("make_reservation", (("book",),), None),
+    ("create_reservation", (), "id_and_dates"),
+    ("admin_delete_reservation", (("delete",), ("reservation_word",)), "has_id"),
+    ("admin_delete_property", (("delete",),), "has_id"),
+    ("price_info", (("price_info",),), None),
+    ("cancel_info", (("cancel_info",),), None),
+    ("reviews_info", (("reviews_info",),), None),
+    ("account_info", (("account_info",),), None),
+    ("contact", (("contact",),), None),
+)
+
+DEFAULT_INTENT = "out_of_scope"
+
+# Exemples publiés par /api/chat/intents (aussi données d'entraînement du classifieur)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "greeting": ["Bonjour", "Salut", "Hello"],
+    "help": ["Aide", "Help", "Comment faire"],
+    "list_properties": ["Voir les propriétés", "Liste des logements"],
+    "make_reservation": ["Je veux réserver", "Réserver"],
+    "my_reservations": ["Mes réservations", "Mon historique"],
+    "check_availability": ["Vérifier disponibilité", "Est-ce libre"],
+    "search_properties": ["Logement à Lyon sous 80$", "Appartement à Paris entre 50 et 120$"],
+    "find_available": ["Trouve un logement libre du 2024-07-01 au 2024-07-05", "Logement disponible à Lyon sous 80$ du 2024-07-01 au 2024-07-05"],
+    "cancel_info": ["Comment annuler", "Annulation"],
+    "price_info": ["Prix", "Combien ça coûte"],
+    "reviews_info": ["Avis", "Commentaires"],
+    "account_info": ["Mon compte", "Inscription"],
+    "contact": ["Contact", "Support"],
+}
+
+
+def parse_dates_and_id(message: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(property_id, check_in, check_out) trouvés dans le message"""
+    dates = DATE_RE.findall(message)
+    ids = ID_RE.findall(message)
+    return (
+        ids[0] if ids else None,
+        dates[0] if len(dates) >= 1 else None,
+        dates[1] if len(dates) >= 2 else None,
+    )
+
+
+def _dates_without_id(message: str) -> bool:
+    property_id, check_in, check_out = parse_dates_and_id(message)
+    return bool(check_in and check_out and not property_id)
+
+
+def _id_and_dates(message: str) -> bool:
+    property_id, check_in, check_out = parse_dates_and_id(message)
+    return bool(property_id and check_in and check_out)
+
+
+def _has_id(message: str) -> bool:
+    return ID_RE.search(message) is not None
+
+
+# Reconnaît un lieu écrit en minuscules ("dans montréal"); installé par la réplique
+# du catalogue. Sans catalogue, seuls les lieux en majuscule comptent.
+_known_place: Callable[[str], bool] = lambda text: False
+
+
+def set_place_lookup(lookup: Callable[[str], bool]):
+    global _known_place
+    _known_place = lookup
+
+
+def has_place(message: str) -> bool:
+    """Lieu explicite: en majuscule ("à Lyon") ou lieu connu ("dans montréal"), jamais "à louer" """
+    return any(capitalized or _known_place(lowercase) for capitalized, lowercase in PLACE_RE.findall(message))
+
+
+def _search_filters(message: str) -> bool:
+    return any(regex.search(message) for regex in (MAX_PRICE_RE, MIN_PRICE_RE, PRICE_RANGE_RE)) or has_place(message)
+
+
+CONDITIONS: Dict[str, Callable[[str], bool]] = {
+    "dates_without_id": _dates_without_id,
+    "id_and_dates": _id_and_dates,
+    "has_id": _has_id,
+    "search_filters": _search_filters,
+}
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex factorisée en trie: au plus un essai par caractère et par position"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Gourmand: la correspondance la plus longue est essayée d'abord
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """Détecteur d'intention compilé: un seul balayage du message.
+
+    Tous les mots-clés sont compilés dans une regex en trie appliquée en
+    lookahead à chaque position: on obtient le mot-clé le plus long qui
+    commence à chaque position, et les groupes des mots-clés qui en sont
+    des préfixes sont déduits d'un masque précalculé. Le masque obtenu est
+    exactement l'ensemble des groupes dont un mot-clé est sous-chaîne du
+    message.
+
+    La résolution des règles ne dépend que de ce masque (et des conditions
+    sur les dates/ID): pour chaque masque rencontré on mémorise la suite
+    des règles conditionnelles à tester et l'intention par défaut.
+    """
+
+    def __init__(self, groups: Dict[str, Tuple[str, ...]] = KEYWORD_GROUPS, rules=RULES):
+        self._bits = {group: 1 << i for i, group in enumerate(groups)}
+        keyword_mask: Dict[str, int] = {}
+        for group, words in groups.items():
+            for word in words:
+                keyword_mask[word] = keyword_mask.get(word, 0) | self._bits[group]
+
+        # Un mot-clé trouvé implique tous les mots-clés qui en sont préfixes
+        self._mask_of: Dict[str, int] = {}
+        for word in keyword_mask:
+            mask = 0
+            for other, other_mask in keyword_mask.items():
+                if word.startswith(other):
+                    mask |= other_mask
+            self._mask_of[word] = mask
+
+        self._rules = tuple(
+            (intent, tuple(self._mask(alternatives) for alternatives in required), condition)
+            for intent, required, condition in rules
+        )
+        self._plans: Dict[int, tuple] = {}
+        self._scanner = re.compile("(?=(" + _trie_pattern(keyword_mask) + "))")
+
+    def _mask(self, group_names: Tuple[str, ...]) -> int:
+        mask = 0
+        for name in group_names:
+            mask |= self._bits[name]
+        return mask
+
+    def _plan(self, found: int) -> tuple:
+        """Règles conditionnelles candidates puis intention inconditionnelle"""
+        conditional = []
+        for intent, required, condition in self._rules:
+            if all(found & mask for mask in required):
+                if condition is None:
+                    return tuple(conditional), intent
+                conditional.append((CONDITIONS[condition], intent))
+        return tuple(conditional), DEFAULT_INTENT
+
+    def matched_mask(self, message_lower: str) -> int:
+        mask_of = self._mask_of
+        found = 0
+        for word in self._scanner.findall(message_lower):
+            found |= mask_of[word]
+        return found
+
+    def matched_groups(self, message_lower: str) -> FrozenSet[str]:
+        found = self.matched_mask(message_lower)
+        return frozenset(group for group, bit in self._bits.items() if found & bit)
+
+    def detect(self, message: str) -> str:
+        found = self.matched_mask(message.lower())
+        plan = self._plans.get(found)
+        if plan is None:
+            plan = self._plans[found] = self._plan(found)
+        conditional, default = plan
+        for condition, intent in conditional:
+            if condition(message):
+                return intent
+        return default
+
+
+matcher = IntentMatcher()
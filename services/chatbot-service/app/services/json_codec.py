@@ -0,0 +1,20 @@
+"""Encodage JSON des réponses du chatbot.
+
+orjson (optionnel) encode directement en octets UTF-8, plusieurs fois plus
+vite que json; sans lui, json produit exactement la même sortie compacte
+que JSONResponse de FastAPI.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Corps JSON compact (UTF-8, sans échappement des accents)"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
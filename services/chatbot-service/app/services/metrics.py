@@ -0,0 +1,249 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Métriques au format texte Prometheus (exposition 0.0.4), sans dépendance:
+# compteurs et histogrammes indexés par le tuple des valeurs de labels.
+# Même cœur (_escape à Registry) que notification-service/app/services/metrics.py:
+# les deux copies doivent rester identiques.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Secondes: de la détection d'intention (~10 µs) aux appels amont lents
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [compteurs par seau (non cumulés) + débordement, somme]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Collected:
+    """Série lue au moment du scrape (`callback()` -> {labels: valeur}), gauge ou counter"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], callback: Callable[[], Dict[tuple, float]],
+                 kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collected(self, name: str, help: str, labelnames: Sequence[str],
+                  callback: Callable[[], Dict[tuple, float]], kind: str = "gauge") -> Collected:
+        return self.register(Collected(name, help, labelnames, callback, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                print(f"⚠️ Métrique {metric.name} indisponible: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter("chat_http_requests_total", "Requêtes HTTP reçues", ("route", "method", "status"))
+HTTP_SECONDS = registry.histogram("chat_http_request_seconds", "Durée des requêtes HTTP", ("route",))
+MESSAGES = registry.counter("chat_messages_total", "Messages traités par intention", ("intent",))
+INTENT_SECONDS = registry.histogram(
+    "chat_intent_seconds",
+    "Durée d'un message par intention et par étape (detect, upstream, local, total)",
+    ("intent", "stage"),
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "chat_upstream_request_seconds", "Durée des appels aux services amont (par tentative)", ("upstream", "endpoint")
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "chat_upstream_requests_total", "Appels aux services amont par code HTTP ou exception",
+    ("upstream", "endpoint", "status"),
+)
+
+
+# ============ TEMPS PAR MESSAGE ============
+
+class MessageTimings:
+    """Temps cumulés pendant le traitement d'un message (partagés avec ses sous-tâches)"""
+
+    __slots__ = ("detect", "upstream", "upstream_calls")
+
+    def __init__(self):
+        self.detect = 0.0
+        self.upstream = 0.0
+        self.upstream_calls = 0
+
+
+_timings: ContextVar[Optional[MessageTimings]] = ContextVar("chat_message_timings", default=None)
+
+
+@contextmanager
+def message_timings():
+    """Ouvre le relevé de temps d'un message pour le contexte courant"""
+    timings = MessageTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        try:
+            _timings.reset(token)
+        except ValueError:
+            # Générateur de flux fermé depuis un autre contexte (client déconnecté)
+            pass
+
+
+def current_timings() -> Optional[MessageTimings]:
+    return _timings.get()
+
+
+def record_message(intent: str, total: float, timings: MessageTimings):
+    """Enregistre la décomposition du temps d'un message.
+
+    `upstream` est la somme des appels amont (des appels parallèles peuvent
+    dépasser le temps total); `local` est le reste: règles, formatage, sessions.
+    """
+    MESSAGES.inc(intent)
+    INTENT_SECONDS.observe(total, intent, "total")
+    INTENT_SECONDS.observe(timings.detect, intent, "detect")
+    INTENT_SECONDS.observe(timings.upstream, intent, "upstream")
+    INTENT_SECONDS.observe(max(0.0, total - timings.detect - timings.upstream), intent, "local")
+
+
+def record_upstream(upstream: str, endpoint: str, status, seconds: float):
+    """Une tentative d'appel amont: code HTTP, ou nom de l'exception levée"""
+    UPSTREAM_SECONDS.observe(seconds, upstream, endpoint)
+    UPSTREAM_REQUESTS.inc(upstream, endpoint, status)
+
+
+def add_upstream_time(seconds: float):
+    """Temps d'attente d'un appel amont (réessais et lecture partagée compris) pour le message courant"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.upstream += seconds
+        timings.upstream_calls += 1
+
+
+def timed_detect(detect: Callable[[str], str], message: str) -> str:
+    started = time.perf_counter()
+    intent = detect(message)
+    timings = _timings.get()
+    if timings is not None:
+        timings.detect += time.perf_counter() - started
+    return intent
+
+
+# ============ MIDDLEWARE HTTP ============
+
+class RequestMetricsMiddleware:
+    """Middleware ASGI: nombre et durée des requêtes HTTP par route.
+
+    Le label est le gabarit de la route (`/api/chat`, pas l'URL réelle) pour
+    borner la cardinalité; la durée s'arrête au dernier octet envoyé, flux
+    SSE et NDJSON compris.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(route, scope["method"], status)
+            HTTP_SECONDS.observe(time.perf_counter() - started, route)
@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Tuple, Type
+
+
+class CircuitOpenError(Exception):
+    """Le disjoncteur d'un service amont est ouvert: échec immédiat"""
+
+    def __init__(self, upstream: str):
+        super().__init__(f"{upstream} momentanément indisponible (disjoncteur ouvert)")
+        self.upstream = upstream
+
+
+class UpstreamError(Exception):
+    """Réponse 5xx d'un service amont (comptée comme un échec du disjoncteur)"""
+
+    def __init__(self, upstream: str, status_code: int):
+        super().__init__(f"{upstream} a répondu {status_code}")
+        self.upstream = upstream
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Disjoncteur par service amont.
+
+    closed: les appels passent; après `failure_threshold` échecs consécutifs
+    il s'ouvre. open: les appels échouent immédiatement pendant
+    `reset_timeout` secondes. half_open: un seul appel d'essai passe; un
+    succès referme le disjoncteur, un échec le rouvre.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.successes = 0
+        self.failures = 0
+        self.rejections = 0
+        self.opens = 0
+        self.retries = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejections += 1
+        return False
+
+    def check(self) -> bool:
+        """Lève CircuitOpenError si l'appel doit échouer immédiatement.
+
+        Retourne True si l'appel est l'essai half_open: l'appelant doit alors
+        appeler release_trial() quelle que soit l'issue (finally).
+        """
+        trial = self.state == "half_open"
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        return trial
+
+    def release_trial(self):
+        """Libère l'essai half_open resté sans verdict (erreur non transitoire, annulation).
+
+        Sans cela, un essai terminé par une autre exception laisserait le
+        disjoncteur refuser tous les appels suivants jusqu'au redémarrage.
+        """
+        if self._state == "half_open":
+            self._trial_in_flight = False
+
+    def record_success(self):
+        self.successes += 1
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+        self._state = "closed"
+
+    def record_failure(self):
+        self.failures += 1
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+            if self._state != "open":
+                self.opens += 1
+            self._state = "open"
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self._consecutive_failures,
+            "open_for_s": round(time.monotonic() - self._opened_at, 3) if state == "open" else 0.0,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejections": self.rejections,
+            "opens": self.opens,
+            "retries": self.retries,
+        }
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Backoff exponentiel avec jitter complet: uniforme dans [0, min(max, base * 2^n)]"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+async def retry_async(
+    fn: Callable[[], Awaitable[Any]],
+    retries: int,
+    base_delay: float,
+    max_delay: float,
+    retry_on: Tuple[Type[BaseException], ...],
+    on_retry: Callable[[int, BaseException], None] = None,
+) -> Any:
+    """Réessaie `fn` au plus `retries` fois sur les exceptions `retry_on` (lectures idempotentes seulement)"""
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except retry_on as e:
+            if attempt >= retries:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+            attempt += 1
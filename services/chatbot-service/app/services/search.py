@@ -0,0 +1,91 @@
+import asyncio
+import unicodedata
+from typing import AsyncIterator, Optional
+
+from app.config import SEARCH_CONCURRENCY, SEARCH_CALL_TIMEOUT
+from app.services import api_client
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents, pour comparer les lieux"""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def property_location(prop: dict) -> str:
+    """Lieu d'une propriété: `location` ou ville/pays de l'adresse"""
+    address = prop.get("address") or {}
+    if isinstance(address, dict):
+        parts = [prop.get("location"), address.get("city"), address.get("country")]
+    else:
+        parts = [prop.get("location"), address]
+    return " ".join(str(p) for p in parts if p)
+
+
+def matches_filters(prop: dict, max_price: Optional[float] = None, location: Optional[str] = None) -> bool:
+    if max_price is not None:
+        try:
+            if float(prop.get("price")) > max_price:
+                return False
+        except (TypeError, ValueError):
+            return False
+    if location and normalize(location) not in normalize(property_location(prop)):
+        return False
+    return True
+
+
+async def iter_available_properties(
+    check_in: str,
+    check_out: str,
+    max_price: Optional[float] = None,
+    location: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """Produit les propriétés libres au fur et à mesure des vérifications.
+
+    Chaque vérification passe par un sémaphore (SEARCH_CONCURRENCY) et un
+    timeout (SEARCH_CALL_TIMEOUT); une vérification expirée compte comme
+    non vérifiable. Chaque élément produit vaut {"property", "verified"}.
+    """
+    properties = await api_client.get_all_properties()
+    candidates = [p for p in properties if p.get("_id") and matches_filters(p, max_price, location)]
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+    async def check(prop: dict):
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(
+                    api_client.check_availability(prop["_id"], check_in, check_out),
+                    SEARCH_CALL_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                result = {"available": True, "verified": False}
+        return prop, result
+
+    tasks = [asyncio.ensure_future(check(p)) for p in candidates]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            prop, result = await next_done
+            if result.get("available", True):
+                yield {"property": prop, "verified": result.get("verified", False)}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def find_available_properties(
+    check_in: str,
+    check_out: str,
+    max_price: Optional[float] = None,
+    location: Optional[str] = None,
+) -> list:
+    """Toutes les propriétés libres, vérifiées d'abord puis par prix croissant"""
+    results = [r async for r in iter_available_properties(check_in, check_out, max_price, location)]
+    results.sort(key=lambda r: (not r["verified"], _price(r["property"])))
+    return results
+
+
+def _price(prop: dict) -> float:
+    try:
+        return float(prop.get("price"))
+    except (TypeError, ValueError):
+        return float("inf")
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import (
+    SESSION_BACKEND,
+    SESSION_TTL,
+    SESSION_MAX_SESSIONS,
+    SESSION_MAX_BYTES,
+    SESSION_SQLITE_PATH,
+)
+
+# Surcoût approximatif d'une entrée d'OrderedDict (nœud + tuple d'entrée)
+_ENTRY_OVERHEAD = 160
+
+
+class SessionState:
+    """État conversationnel compact d'une session (flux multi-tours en cours)"""
+
+    __slots__ = ("flow", "property_id", "check_in", "check_out")
+
+    def __init__(self, flow: Optional[str] = None, property_id: Optional[str] = None,
+                 check_in: Optional[str] = None, check_out: Optional[str] = None):
+        self.flow = flow
+        self.property_id = property_id
+        self.check_in = check_in
+        self.check_out = check_out
+
+    def to_tuple(self) -> tuple:
+        return (self.flow, self.property_id, self.check_in, self.check_out)
+
+    @classmethod
+    def from_tuple(cls, values) -> "SessionState":
+        return cls(*values)
+
+    def size(self) -> int:
+        """Taille approximative en octets"""
+        return sys.getsizeof(self) + sum(sys.getsizeof(v) for v in self.to_tuple() if v is not None)
+
+
+class MemorySessionBackend:
+    """Sessions en mémoire: TTL, éviction LRU, plafond de sessions et d'octets"""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_bytes: int = SESSION_MAX_BYTES):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        # clé -> (expiration, état, taille estimée)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[SessionState]:
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._sessions.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, state: SessionState):
+        if key in self._sessions:
+            self._remove(key)
+        size = sys.getsizeof(key) + state.size() + _ENTRY_OVERHEAD
+        self._sessions[key] = (time.monotonic() + self.ttl, state, size)
+        self._bytes += size
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def delete(self, key: str):
+        if key in self._sessions:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self._bytes -= self._sessions.pop(key)[2]
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "estimated_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteSessionBackend:
+    """Sessions dans un fichier SQLite partagé entre workers uvicorn (WAL)"""
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH, ttl: float = SESSION_TTL,
+                 max_sessions: int = SESSION_MAX_SESSIONS):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._local = threading.local()
+        self._writes = 0
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " key TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions(accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Optional[SessionState]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT state, expires_at FROM sessions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            with conn:
+                conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+            return None
+        with conn:
+            conn.execute("UPDATE sessions SET accessed_at = ? WHERE key = ?", (now, key))
+        return SessionState.from_tuple(json.loads(row[0]))
+
+    def _set(self, key: str, state: SessionState):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (key, state, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(state.to_tuple(), separators=(",", ":")), now + self.ttl, now),
+            )
+        self._writes += 1
+        # Nettoyage périodique: expirées puis les moins récemment utilisées
+        if self._writes % 1000 == 0:
+            self._cleanup(conn, now)
+
+    def _cleanup(self, conn: sqlite3.Connection, now: float):
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            count = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            excess = count - self.max_sessions
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM sessions WHERE key IN (SELECT key FROM sessions ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+
+    def _delete(self, key: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> Optional[SessionState]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, state: SessionState):
+        await asyncio.to_thread(self._set, key, state)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+    def stats(self) -> dict:
+        count = self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": count,
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+        }
+
+
+def create_session_store():
+    """Backend choisi par SESSION_BACKEND (memory | sqlite)"""
+    if SESSION_BACKEND == "sqlite":
+        return SQLiteSessionBackend()
+    return MemorySessionBackend()
@@ -0,0 +1,84 @@
+import re
+import secrets
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+from app.config import TRACE_PROPAGATION
+
+# W3C Trace Context: version-trace_id-parent_id-flags, en hexadécimal minuscule
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+
+
+class TraceContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    flags: str
+
+
+_current: ContextVar[Optional[TraceContext]] = ContextVar("chat_trace_context", default=None)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[TraceContext]:
+    """En-tête traceparent entrant, None s'il est absent ou invalide"""
+    if not value:
+        return None
+    match = TRACEPARENT_RE.match(value.strip())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == INVALID_TRACE_ID or span_id == INVALID_SPAN_ID:
+        return None
+    return TraceContext(trace_id, span_id, flags)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def start_trace(traceparent: Optional[str] = None) -> TraceContext:
+    """Rejoint la trace de l'appelant, ou en ouvre une nouvelle, pour la requête courante"""
+    parent = parse_traceparent(traceparent)
+    if parent is None:
+        context = TraceContext(secrets.token_hex(16), new_span_id(), "01")
+    else:
+        context = TraceContext(parent.trace_id, new_span_id(), parent.flags)
+    _current.set(context)
+    return context
+
+
+def current_trace() -> Optional[TraceContext]:
+    return _current.get()
+
+
+def outgoing_headers(headers: Optional[dict] = None) -> Optional[dict]:
+    """Ajoute un traceparent (nouveau span enfant) aux en-têtes d'un appel amont"""
+    context = _current.get()
+    if context is None:
+        return headers
+    headers = dict(headers) if headers else {}
+    headers["traceparent"] = f"00-{context.trace_id}-{new_span_id()}-{context.flags}"
+    return headers
+
+
+class TraceContextMiddleware:
+    """Middleware ASGI: ouvre le contexte de trace de chaque requête HTTP ou WebSocket.
+
+    Inactif si TRACE_PROPAGATION=false: aucun en-tête n'est alors ajouté
+    aux appels vers property-service et reservation-service.
+    """
+
+    def __init__(self, app, enabled: bool = TRACE_PROPAGATION):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if self.enabled and scope["type"] in ("http", "websocket"):
+            traceparent = None
+            for name, value in scope["headers"]:
+                if name == b"traceparent":
+                    traceparent = value.decode("latin-1")
+                    break
+            start_trace(traceparent)
+        await self.app(scope, receive, send)
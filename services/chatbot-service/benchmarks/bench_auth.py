@@ -0,0 +1,49 @@
+"""Vérification des JWT: signature vérifiée à chaque message vs cache LRU par jeton.
+
+Jetons signés comme par auth-service (HS256, {id, role, iat, exp}); chaque
+utilisateur envoie plusieurs messages avec le même jeton.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_auth --users 1000 --messages 20
+"""
+import argparse
+import random
+import time
+
+from app.services import auth
+
+SECRET = "secret-de-benchmark"
+
+
+def make_tokens(n_users: int) -> list:
+    now = int(time.time())
+    return [
+        auth.sign({"id": f"{i:024x}", "role": "admin" if i % 50 == 0 else "tenant", "iat": now, "exp": now + 3600}, SECRET)
+        for i in range(n_users)
+    ]
+
+
+def run(verifier: auth.TokenVerifier, stream: list) -> float:
+    start = time.perf_counter()
+    for token in stream:
+        assert verifier.verify(token) is not None
+    return (time.perf_counter() - start) / len(stream) * 1e6
+
+
+def main(args):
+    tokens = make_tokens(args.users)
+    stream = tokens * args.messages
+    random.Random(0).shuffle(stream)
+    print(f"{len(stream)} messages, {args.users} jetons\n")
+    for label, max_entries in (("sans cache", 0), ("cache LRU", args.users * 2)):
+        verifier = auth.TokenVerifier(auth.SecretSource(SECRET), max_entries=max_entries)
+        cost = run(verifier, stream)
+        stats = verifier.stats()
+        print(f"{label:<12}{cost:7.2f} µs/message  {1e6 / cost:>12,.0f} vérifications/s  (hits {stats['hits']}, vérifiés {stats['verified']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20)
+    main(parser.parse_args())
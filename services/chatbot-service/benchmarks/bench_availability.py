@@ -0,0 +1,99 @@
+"""Disponibilité: parcours linéaire (ancien check_availability) vs index d'intervalles.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_availability --reservations 10000 --queries 20000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+
+from app.services.availability import AvailabilityIndex, PropertyIntervals
+
+EPOCH = date(2024, 1, 1)
+
+
+def make_reservations(n: int, rng: random.Random) -> list:
+    reservations = []
+    for i in range(n):
+        start = EPOCH + timedelta(days=rng.randrange(3650))
+        end = start + timedelta(days=rng.randint(1, 14))
+        reservations.append({
+            "_id": f"{i:024x}",
+            "startDate": f"{start.isoformat()}T00:00:00.000Z",
+            "endDate": f"{end.isoformat()}T00:00:00.000Z",
+            "status": rng.choice(["confirmed", "pending", "cancelled", "rejected"]),
+        })
+    return reservations
+
+
+def make_queries(n: int, rng: random.Random) -> list:
+    queries = []
+    for _ in range(n):
+        start = EPOCH + timedelta(days=rng.randrange(3650))
+        end = start + timedelta(days=rng.randint(1, 10))
+        queries.append((start.isoformat(), end.isoformat()))
+    return queries
+
+
+def linear_available(reservations: list, check_in: str, check_out: str) -> bool:
+    """Logique de l'ancien check_availability"""
+    for res in reservations:
+        if res.get("status") in ["confirmed", "pending"]:
+            res_start = res.get("startDate", "")[:10]
+            res_end = res.get("endDate", "")[:10]
+            if not (check_out <= res_start or check_in >= res_end):
+                return False
+    return True
+
+
+def timed(label: str, n: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    rate = f"  {n / elapsed:12,.0f} requêtes/s" if n > 1 else ""
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms{rate}")
+    return result
+
+
+def main(args):
+    rng = random.Random(42)
+    reservations = make_reservations(args.reservations, rng)
+    queries = make_queries(args.queries, rng)
+    linear_queries = queries[: max(1, args.queries // 20)]
+
+    index = timed("construction de l'index", 1, lambda: PropertyIntervals(reservations))
+    linear = timed(
+        f"linéaire ({len(linear_queries)} requêtes)", len(linear_queries),
+        lambda: [linear_available(reservations, a, b) for a, b in linear_queries],
+    )
+    indexed = timed(
+        f"index ({len(queries)} requêtes)", len(queries),
+        lambda: [not index.overlaps(a, b) for a, b in queries],
+    )
+    assert linear == indexed[: len(linear)], "résultats divergents"
+
+    # Requêtes groupées sur plusieurs propriétés
+    by_property = {f"{p:024x}": make_reservations(args.reservations, rng) for p in range(args.properties)}
+
+    async def loader(property_id):
+        return by_property[property_id]
+
+    engine = AvailabilityIndex(loader, ttl=300, max_properties=args.properties)
+    batch = [(rng.choice(list(by_property)), a, b) for a, b in queries]
+
+    # Premier passage: chargement des index
+    asyncio.run(engine.check_many(batch))
+    timed(
+        f"check_many ({args.properties} propriétés)", len(batch),
+        lambda: asyncio.run(engine.check_many(batch)),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reservations", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--properties", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,91 @@
+"""Recherche filtrée: balayage du catalogue complet vs réplique indexée.
+
+Le balayage reproduit l'ancien chemin (catalogue en cache, matches_filters
+sur chaque propriété puis tri par prix); la réplique répond par index
+inversé et dichotomie sur les prix. Vérifie d'abord que les deux donnent
+les mêmes propriétés, puis mesure les µs par requête et le coût d'une
+synchronisation incrémentale.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_catalogue --properties 20000
+"""
+import argparse
+import random
+import time
+
+from app.services.catalogue import CatalogueIndex, parse_query
+from app.services.search import matches_filters
+
+CITIES = ["Montréal", "Lyon", "Paris", "Québec", "Boulogne-sur-Mer", "Saint-Étienne", "Bordeaux", "Nantes"]
+QUERIES = [
+    "logement à Lyon sous 80$",
+    "appartement à Paris entre 50 et 120$",
+    "maison dans montréal",
+    "logement à Saint-Étienne à partir de 150$",
+    "propriétés sous 45$",
+    "logement à Marseille",
+]
+
+
+def make_catalogue(n: int) -> list:
+    rng = random.Random(42)
+    return [
+        {
+            "_id": f"{i:024x}",
+            "title": f"{rng.choice(['Appartement', 'Maison', 'Studio', 'Loft'])} {i}",
+            "price": rng.randint(30, 400),
+            "address": {"city": rng.choice(CITIES), "postalCode": f"{rng.randint(10000, 99999)}", "country": "France"},
+        }
+        for i in range(n)
+    ]
+
+
+def scan(properties: list, message: str) -> list:
+    """Ancien chemin: chaque propriété passe par matches_filters, puis tri par prix"""
+    query = parse_query(message)
+    results = [
+        prop for prop in properties
+        if matches_filters(prop, query.max_price, query.location)
+        and (query.min_price is None or float(prop["price"]) >= query.min_price)
+    ]
+    return sorted(results, key=lambda p: float(p["price"]))
+
+
+def timed(function, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main(args):
+    properties = make_catalogue(args.properties)
+    index = CatalogueIndex()
+    start = time.perf_counter()
+    index.sync(properties)
+    print(f"{args.properties} propriétés indexées en {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    print(f"{'requête':<44}{'résultats':>10}{'balayage':>12}{'index':>10}")
+    for message in QUERIES:
+        # Mêmes propriétés; l'index classe en plus par pertinence du titre
+        expected = {p["_id"] for p in scan(properties, message)}
+        found = [p["_id"] for p in index.search(parse_query(message))]
+        assert set(found) == expected and len(found) == len(expected), message
+        before = timed(lambda: scan(properties, message), max(1, args.rounds // 20))
+        after = timed(lambda: index.search(parse_query(message)), args.rounds)
+        print(f"{message:<44}{len(found):>10}{before:>9.0f} µs{after:>7.0f} µs")
+
+    # Synchronisation: instantané identique (304), puis 1 % de propriétés modifiées
+    print()
+    print(f"sync inchangée      {timed(lambda: index.sync(properties), 3) / 1000:8.1f} ms")
+    changed = [dict(p, price=p["price"] + 1) if i % 100 == 0 else p for i, p in enumerate(properties)]
+    start = time.perf_counter()
+    added, updated, removed = index.sync(changed)
+    print(f"sync 1 % modifiées  {(time.perf_counter() - start) * 1000:8.1f} ms  (+{added} ~{updated} -{removed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--properties", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
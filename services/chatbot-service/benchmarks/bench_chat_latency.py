@@ -0,0 +1,97 @@
+"""Latence p50/p99 de /api/chat: client éphémère par appel vs client partagé.
+
+Les caches (catalogue, cache HTTP) sont désactivés pour ces deux mesures:
+chaque message appelle le service amont. Une troisième ligne mesure le
+client partagé avec les caches, pour comparaison.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_chat_latency --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks import stub_upstream
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(app, n_requests: int, concurrency: int, message: str) -> list:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://chatbot") as client:
+        async def one():
+            async with sem:
+                start = time.perf_counter()
+                response = await client.post("/api/chat", json={"message": message})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        await asyncio.gather(*(one() for _ in range(n_requests)))
+    return latencies
+
+
+def report(label: str, latencies: list):
+    ms = [x * 1000 for x in latencies]
+    print(
+        f"{label:<22} p50={percentile(ms, 0.50):7.2f} ms  p99={percentile(ms, 0.99):7.2f} ms  "
+        f"mean={statistics.mean(ms):7.2f} ms"
+    )
+
+
+def set_caches(enabled: bool, defaults: dict):
+    from app.services import api_client
+
+    api_client.properties_cache.ttl = defaults["ttl"] if enabled else 0
+    api_client.properties_cache.stale_ttl = defaults["stale_ttl"] if enabled else 0
+    api_client.properties_cache.invalidate()
+    api_client.http_cache.max_bytes = defaults["max_bytes"] if enabled else 0
+
+
+async def main(args):
+    from app.main import app
+    from app.services import api_client, http_client
+
+    defaults = {
+        "ttl": api_client.properties_cache.ttl,
+        "stale_ttl": api_client.properties_cache.stale_ttl,
+        "max_bytes": api_client.http_cache.max_bytes,
+    }
+    set_caches(False, defaults)
+    message = "voir les propriétés"
+    # Avant: aucun client partagé, chaque appel ouvre son propre AsyncClient
+    await run(app, 50, args.concurrency, message)
+    report("client par appel", await run(app, args.requests, args.concurrency, message))
+
+    # Après: client partagé ouvert comme dans le lifespan
+    await http_client.start_client()
+    try:
+        await run(app, 50, args.concurrency, message)
+        report("client partagé", await run(app, args.requests, args.concurrency, message))
+
+        set_caches(True, defaults)
+        await run(app, 50, args.concurrency, message)
+        report("partagé + caches", await run(app, args.requests, args.concurrency, message))
+    finally:
+        await http_client.close_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    base_url = stub_upstream.start_in_thread()
+    os.environ["PROPERTY_SERVICE_URL"] = base_url
+    os.environ["RESERVATION_SERVICE_URL"] = base_url
+    asyncio.run(main(args))
@@ -0,0 +1,107 @@
+"""Cache HTTP des GET amont: téléchargement complet vs 304 (ETag) vs max-age.
+
+Le stub tourne dans un processus séparé: le temps CPU mesuré est celui du
+chatbot seul (requête, lecture du corps, décodage JSON). Lectures
+séquentielles par défaut: en concurrence, singleflight fusionne déjà les GET
+identiques et seule une partie atteint le cache HTTP.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_http_cache --requests 500 --properties 2000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks import stub_upstream
+
+MODES = [
+    ("sans validateur", ["--no-etags"]),
+    ("ETag (304)", []),
+    ("max-age=60", ["--max-age", "60"]),
+]
+
+
+def start_stub(port: int, n_properties: int, extra: list) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_upstream", "--port", str(port), "--properties", str(n_properties), *extra]
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/reservations", timeout=0.5)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("le stub n'a pas démarré")
+
+
+async def run(n_requests: int, concurrency: int) -> dict:
+    from app.services import api_client
+
+    api_client.http_cache.clear()
+    # Premier appel hors mesure: remplit le cache HTTP et ouvre les connexions
+    await api_client._fetch_all_properties()
+    before = api_client.http_cache_stats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            # Sous le cache catalogue (TTL): chaque appel va jusqu'au cache HTTP
+            await api_client._fetch_all_properties()
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    after = api_client.http_cache_stats()
+    return {
+        "wall": wall,
+        "cpu": cpu,
+        "full": after["misses"] - before["misses"],
+        "not_modified": after["not_modified"] - before["not_modified"],
+        "fresh": after["fresh_hits"] - before["fresh_hits"],
+    }
+
+
+async def main(args):
+    port = stub_upstream._free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    os.environ["PROPERTY_SERVICE_URL"] = base_url
+    os.environ["RESERVATION_SERVICE_URL"] = base_url
+    from app.services import http_client
+
+    body_size = None
+    print(f"{args.requests} lectures du catalogue ({args.properties} propriétés), concurrence {args.concurrency}\n")
+    print(f"{'mode':<18}{'req/s':>9}{'CPU/appel':>12}{'200':>7}{'304':>7}{'frais':>7}{'Mo reçus':>10}")
+    for label, extra in MODES:
+        stub = start_stub(port, args.properties, extra)
+        await http_client.start_client()
+        try:
+            if body_size is None:
+                async with http_client.get_client() as client:
+                    body_size = len((await client.get(f"{base_url}/api/properties")).content)
+            result = await run(args.requests, args.concurrency)
+        finally:
+            await http_client.close_client()
+            stub.terminate()
+            stub.wait()
+        print(
+            f"{label:<18}{args.requests / result['wall']:>9.0f}"
+            f"{result['cpu'] / args.requests * 1000:>9.3f} ms"
+            f"{result['full']:>7}{result['not_modified']:>7}{result['fresh']:>7}"
+            f"{result['full'] * body_size / 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--properties", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,98 @@
+"""Détection d'intention: règles par mots-clés vs classifieur TF-IDF vs hybride.
+
+Exactitude sur le corpus annoté (validation croisée: le classifieur ne voit
+jamais les messages qu'il évalue) et sur des paraphrases jamais vues à
+l'entraînement (benchmarks/intent_paraphrases.json), puis messages/s: un
+message par appel et par lots (chemins /api/chat/batch et rejeu).
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_intent_classifier --folds 5
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from app.services.intent_classifier import HybridDetector, IntentClassifier, KeywordDetector, training_data
+from benchmarks.bench_intents import use_corpus_places
+
+HERE = os.path.dirname(__file__)
+CORPUS_PATH = os.path.join(HERE, "intent_corpus.json")
+PARAPHRASES_PATH = os.path.join(HERE, "intent_paraphrases.json")
+
+
+class ClassifierOnly:
+    """Classifieur seul (argmax), pour comparaison"""
+
+    def __init__(self, classifier: IntentClassifier):
+        self.classifier = classifier
+
+    def detect_many(self, messages):
+        return self.classifier.predict(messages)[0]
+
+    def detect(self, message):
+        return self.detect_many([message])[0]
+
+
+def accuracy(detector, items: list) -> float:
+    predicted = detector.detect_many([item["message"] for item in items])
+    return sum(p == item["intent"] for p, item in zip(predicted, items)) / len(items)
+
+
+def cross_validation(items: list, folds: int, epochs: int) -> dict:
+    """Exactitude moyenne de chaque backend sur les plis tenus à l'écart"""
+    base_messages, base_labels = training_data()
+    order = list(range(len(items)))
+    random.Random(0).shuffle(order)
+    scores = {"règles": 0.0, "classifieur": 0.0, "hybride": 0.0}
+    for fold in range(folds):
+        held = {i for k, i in enumerate(order) if k % folds == fold}
+        train = [items[i] for i in range(len(items)) if i not in held]
+        test = [items[i] for i in sorted(held)]
+        model = IntentClassifier.train(
+            base_messages + [t["message"] for t in train], base_labels + [t["intent"] for t in train], epochs=epochs
+        )
+        scores["règles"] += accuracy(KeywordDetector(), test) / folds
+        scores["classifieur"] += accuracy(ClassifierOnly(model), test) / folds
+        scores["hybride"] += accuracy(HybridDetector(model), test) / folds
+    return scores
+
+
+def throughput(function, messages: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function(messages)
+    return len(messages) * rounds / (time.perf_counter() - start)
+
+
+def main(args):
+    use_corpus_places()
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = [item for item in json.load(f) if item["message"].strip()]
+    with open(PARAPHRASES_PATH, encoding="utf-8") as f:
+        paraphrases = json.load(f)
+
+    print(f"Validation croisée ({args.folds} plis) sur {len(corpus)} messages du corpus...")
+    cv = cross_validation(corpus, args.folds, args.epochs)
+
+    messages, labels = training_data(CORPUS_PATH)
+    model = IntentClassifier.train(messages, labels, epochs=args.epochs)
+    detectors = {"règles": KeywordDetector(), "classifieur": ClassifierOnly(model), "hybride": HybridDetector(model)}
+
+    batch = [item["message"] for item in corpus]
+    batch = (batch * (args.batch // len(batch) + 1))[:args.batch]
+    print(f"\n{'backend':<13}{'corpus (CV)':>12}{'paraphrases':>13}{'msg/s (1 par appel)':>22}{'msg/s (lots)':>15}")
+    for name, detector in detectors.items():
+        single = throughput(lambda ms: [detector.detect(m) for m in ms], batch[:1000], 1)
+        batched = throughput(detector.detect_many, batch, args.rounds)
+        print(f"{name:<13}{cv[name]:>12.1%}{accuracy(detector, paraphrases):>13.1%}{single:>22,.0f}{batched:>15,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,177 @@
+"""Détection d'intention: cascade de mots-clés d'origine vs IntentMatcher compilé.
+
+Mesure les messages/s des deux sur le corpus de référence
+(benchmarks/intent_corpus.json). L'équivalence avec le corpus est vérifiée
+par tests/test_intents.py (python -m pytest tests).
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_intents --rounds 20
+"""
+import argparse
+import json
+import os
+import re
+import time
+from typing import Optional, Tuple
+
+from app.services import intent_matcher
+from app.services.intent_matcher import matcher
+from app.services.search import normalize
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "intent_corpus.json")
+# Villes du catalogue supposées par le corpus (lieux en minuscules: "maison dans montréal")
+CORPUS_PLACES = frozenset(("montreal", "lyon", "paris", "quebec", "marseille"))
+
+
+class LegacyEngine:
+    """Copie de ChatbotEngine.detect_intent avant la table compilée"""
+
+    def parse_reservation_request(self, message: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        date_pattern = r'(\d{4}-\d{2}-\d{2})'
+        dates = re.findall(date_pattern, message)
+        
+        id_pattern = r'([a-fA-F0-9]{24})'
+        ids = re.findall(id_pattern, message)
+        
+        property_id = ids[0] if ids else None
+        check_in = dates[0] if len(dates) >= 1 else None
+        check_out = dates[1] if len(dates) >= 2 else None
+        
+        return property_id, check_in, check_out
+
+    def extract_id(self, message: str) -> Optional[str]:
+        id_pattern = r'([a-fA-F0-9]{24})'
+        ids = re.findall(id_pattern, message)
+        return ids[0] if ids else None
+
+    def detect_intent(self, message: str, user_role: Optional[str] = None) -> str:
+        """Détecte l'intention de l'utilisateur - uniquement questions liées au site"""
+        message_lower = message.lower()
+        
+        # ============ INTENTIONS COMMUNES ============
+        
+        # Salutations
+        if any(word in message_lower for word in ["bonjour", "salut", "hello", "hi", "hey", "bonsoir"]):
+            return "greeting"
+        
+        # Aide
+        if any(word in message_lower for word in ["aide", "help", "aider", "quoi faire", "que peux-tu", "que peux tu", "commandes"]):
+            return "help"
+        
+        # Fonctionnement du site
+        if any(phrase in message_lower for phrase in ["comment fonctionne", "comment ça marche", "comment ca marche", "c'est quoi", "qu'est-ce que", "présentation", "presentation", "fonctionnement", "à quoi sert", "a quoi sert", "expliquer le site", "explique le site"]):
+            return "site_info"
+        
+        # Remerciement
+        if any(word in message_lower for word in ["merci", "thanks", "parfait", "super", "génial", "excellent"]):
+            return "thanks"
+        
+        # Au revoir
+        if any(word in message_lower for word in ["bye", "au revoir", "à bientôt", "ciao", "bonne journée", "bonne nuit"]):
+            return "goodbye"
+        
+        # ============ PROPRIÉTÉS ============
+        
+        # Chercher une propriété libre sur une période
+        if any(word in message_lower for word in ["libre", "disponible", "dispo", "trouve", "cherche"]):
+            property_id, check_in, check_out = self.parse_reservation_request(message)
+            if check_in and check_out and not property_id:
+                return "find_available"
+        
+        # Voir les propriétés
+        if any(word in message_lower for word in ["propriété", "propriétés", "proprietes", "logement", "logements", "appartement", "maison", "liste", "voir les", "afficher"]):
+            if "supprimer" in message_lower or "effacer" in message_lower or "delete" in message_lower:
+                return "admin_delete_property"
+            return "list_properties"
+        
+        # ============ RÉSERVATIONS ============
+        
+        # Mes réservations (locataire)
+        if any(word in message_lower for word in ["mes réservation", "mes reservation", "mes reservations", "mes réservations", "mon historique", "mes locations"]):
+            return "my_reservations"
+        
+        # Voir toutes les réservations (admin)
+        if ("toutes" in message_lower or "all" in message_lower or "tout" in message_lower) and ("réservation" in message_lower or "reservation" in message_lower):
+            return "admin_all_reservations"
+        
+        # Supprimer réservation (admin)
+        if ("supprimer" in message_lower or "effacer" in message_lower or "delete" in message_lower or "annuler" in message_lower) and ("réservation" in message_lower or "reservation" in message_lower):
+            return "admin_delete_reservation"
+        
+        # Réserver
+        if any(word in message_lower for word in ["réserver", "reserver", "reservation", "réservation", "book", "louer"]):
+            return "make_reservation"
+        
+        # ============ VÉRIFIER SI C'EST UNE RÉSERVATION DIRECTE ============
+        
+        property_id, check_in, check_out = self.parse_reservation_request(message)
+        if property_id and check_in and check_out:
+            return "create_reservation"
+        
+        # ============ SUPPRESSION AVEC ID ============
+        
+        if self.extract_id(message) and ("supprimer" in message_lower or "effacer" in message_lower or "delete" in message_lower):
+            if "réservation" in message_lower or "reservation" in message_lower:
+                return "admin_delete_reservation"
+            else:
+                return "admin_delete_property"
+        
+        # ============ INFORMATIONS SUR LE SITE ============
+        
+        # Prix
+        if any(word in message_lower for word in ["prix", "coût", "cout", "tarif", "combien", "payer", "paiement"]):
+            return "price_info"
+        
+        # Annulation
+        if any(word in message_lower for word in ["annuler", "annulation", "cancel", "rembours"]):
+            return "cancel_info"
+        
+        # Avis
+        if any(word in message_lower for word in ["avis", "review", "commentaire", "note", "évaluation", "evaluation"]):
+            return "reviews_info"
+        
+        # Compte
+        if any(word in message_lower for word in ["compte", "profil", "inscription", "connexion", "mot de passe", "password", "login", "signup"]):
+            return "account_info"
+        
+        # Contact
+        if any(word in message_lower for word in ["contact", "contacter", "téléphone", "telephone", "email", "support", "joindre"]):
+            return "contact"
+        
+        # ============ QUESTION HORS SUJET ============
+        return "out_of_scope"
+
+
+def use_corpus_places():
+    """Lieux connus du matcher = ceux du corpus, sans réplique du catalogue"""
+    intent_matcher.set_place_lookup(lambda text: normalize(text) in CORPUS_PLACES)
+
+
+def load_corpus() -> list:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def throughput(label: str, detect, messages: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            detect(message)
+    elapsed = time.perf_counter() - start
+    rate = len(messages) * rounds / elapsed
+    print(f"{label:<10} {rate:12,.0f} messages/s")
+    return rate
+
+
+def main(args):
+    use_corpus_places()
+    messages = [c["message"] for c in load_corpus()]
+    before = throughput("cascade", LegacyEngine().detect_intent, messages, args.rounds)
+    after = throughput("compilé", matcher.detect, messages, args.rounds)
+    print(f"accélération x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    main(parser.parse_args())
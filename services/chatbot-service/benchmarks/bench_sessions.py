@@ -0,0 +1,73 @@
+"""Mémoire et débit du store de sessions à 100k sessions.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_sessions --sessions 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.services.session_store import MemorySessionBackend, SQLiteSessionBackend, SessionState
+
+
+def make_state(i: int) -> SessionState:
+    # Flux "réserver" à mi-parcours: ID connu, date d'arrivée connue
+    return SessionState("reserve", f"{i:024x}", "2024-07-01", None)
+
+
+async def bench_memory(n: int):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    store = MemorySessionBackend(ttl=3600, max_sessions=n, max_bytes=1 << 40)
+    start = time.perf_counter()
+    for i in range(n):
+        await store.set(f"user-{i:08d}", make_state(i))
+    write = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    start = time.perf_counter()
+    for i in range(n):
+        await store.get(f"user-{i:08d}")
+    read = time.perf_counter() - start
+
+    stats = store.stats()
+    print(f"mémoire  {n:,} sessions: {allocated / n:6.0f} o/session mesurés (tracemalloc), "
+          f"{stats['estimated_bytes'] / n:6.0f} o/session estimés, total {allocated / 1e6:.1f} Mo")
+    print(f"mémoire  écriture {n / write:12,.0f} ops/s  lecture {n / read:12,.0f} ops/s")
+
+
+async def bench_sqlite(n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.sqlite3")
+        store = SQLiteSessionBackend(path, ttl=3600, max_sessions=n)
+        start = time.perf_counter()
+        for i in range(n):
+            store._set(f"user-{i:08d}", make_state(i))
+        write = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(0, n, 10):
+            store._get(f"user-{i:08d}")
+        read = time.perf_counter() - start
+        size = os.path.getsize(path) + sum(
+            os.path.getsize(path + suffix) for suffix in ("-wal", "-shm") if os.path.exists(path + suffix)
+        )
+        print(f"sqlite   {n:,} sessions: {size / n:6.0f} o/session sur disque")
+        print(f"sqlite   écriture {n / write:12,.0f} ops/s  lecture {(n // 10) / read:12,.0f} ops/s")
+
+
+async def main(args):
+    await bench_memory(args.sessions)
+    if not args.skip_sqlite:
+        await bench_sqlite(args.sessions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--skip-sqlite", action="store_true")
+    asyncio.run(main(parser.parse_args()))
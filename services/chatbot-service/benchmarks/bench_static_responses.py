@@ -0,0 +1,123 @@
+"""Débit de /api/chat: dictionnaire + validation ChatResponse vs corps pré-encodés.
+
+L'application ASGI est appelée directement (middlewares compris, sans
+client HTTP ni réseau): les req/s mesurées sont celles d'un cœur du
+service. "avant" rejoue l'ancien endpoint (process_message puis
+response_model=ChatResponse); "après" est /api/chat. Le second tableau
+isole la part du moteur et de l'encodage, hors FastAPI.
+
+    cd services/chatbot-service
+    python -m benchmarks.bench_static_responses --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks import stub_upstream
+
+MESSAGES = [
+    ("bonjour", None),
+    ("aide", "admin"),
+    ("politique d'annulation", None),
+    ("quelle est la météo demain", None),
+    ("voir les propriétés", None),
+]
+
+
+async def call(app, path: str, payload: dict) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"chatbot"), (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1234), "server": ("chatbot", 80),
+    }
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def throughput(app, path: str, payload: dict, n_requests: int) -> float:
+    for _ in range(50):
+        await call(app, path, payload)
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        await call(app, path, payload)
+    return n_requests / (time.perf_counter() - start)
+
+
+async def engine_cost(function, n_requests: int) -> float:
+    """µs par message d'une fonction async"""
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        await function()
+    return (time.perf_counter() - start) / n_requests * 1e6
+
+
+async def main(args):
+    from app.config import JWT_SECRET
+    from app.main import ChatRequest, ChatResponse, app, authenticated, chatbot
+    from app.services import auth, http_client, json_codec
+
+    async def legacy_chat(request: ChatRequest):
+        return await chatbot.process_message(**authenticated(request))
+
+    # Le rôle vient du jeton: un jeton admin signé comme par auth-service
+    tokens = {None: None, "admin": auth.sign({"id": "65a000000000000000000001", "role": "admin", "exp": time.time() + 3600}, JWT_SECRET)}
+
+    app.add_api_route("/bench/legacy-chat", legacy_chat, methods=["POST"], response_model=ChatResponse)
+    print(f"encodage JSON: {'orjson' if json_codec.orjson is not None else 'json'}\n")
+
+    await http_client.start_client()
+    try:
+        print(f"{'message':<34}{'intention':<18}{'avant req/s':>12}{'après req/s':>13}{'gain':>7}")
+        for message, role in MESSAGES:
+            payload = {"message": message, "token": tokens[role]}
+            before_body = await call(app, "/bench/legacy-chat", payload)
+            after_body = await call(app, "/api/chat", payload)
+            assert json.loads(before_body) == json.loads(after_body), message
+            before = await throughput(app, "/bench/legacy-chat", payload, args.requests)
+            after = await throughput(app, "/api/chat", payload, args.requests)
+            label = f"{message} ({role})" if role else message
+            intent = json.loads(after_body)["intent"]
+            print(f"{label:<34}{intent:<18}{before:>12,.0f}{after:>13,.0f}{after / before:>6.2f}x")
+
+        # Moteur seul: dictionnaire + ChatResponse + JSON vs octets
+        print(f"\n{'message':<34}{'dict+modèle µs':>15}{'octets µs':>11}")
+        for message, role in MESSAGES:
+            async def before():
+                response = await chatbot.process_message(message, **auth.identify(tokens[role]))
+                return ChatResponse.model_validate(response).model_dump_json().encode("utf-8")
+
+            async def after():
+                return await chatbot.process_message_json(message, **auth.identify(tokens[role]))
+
+            label = f"{message} ({role})" if role else message
+            print(f"{label:<34}{await engine_cost(before, args.requests):>15.1f}{await engine_cost(after, args.requests):>11.1f}")
+    finally:
+        await http_client.close_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    base_url = stub_upstream.start_in_thread()
+    # Secret propre au benchmark (le service n'a pas de secret par défaut)
+    os.environ.setdefault("JWT_SECRET", "bench-static-responses")
+    os.environ["PROPERTY_SERVICE_URL"] = base_url
+    os.environ["RESERVATION_SERVICE_URL"] = base_url
+    asyncio.run(main(args))
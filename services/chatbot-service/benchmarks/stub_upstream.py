@@ -0,0 +1,111 @@
+"""Faux property-service / reservation-service pour les benchmarks du chatbot.
+
+Lancement autonome:  python -m benchmarks.stub_upstream --port 3999
+"""
+import argparse
+import hashlib
+import json
+import socket
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+N_PROPERTIES = 200
+
+
+def make_properties(n: int = N_PROPERTIES) -> list:
+    return [
+        {
+            "_id": f"{i:024x}",
+            "title": f"Appartement {i}",
+            "price": 40 + (i * 7) % 160,
+            "location": ["Montréal", "Lyon", "Paris", "Québec"][i % 4],
+        }
+        for i in range(n)
+    ]
+
+
+def json_response(request: Request, payload, stub: FastAPI) -> Response:
+    """Réponse JSON avec ETag faible et 304 sur If-None-Match, comme Express par défaut"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    headers = {}
+    if stub.state.max_age is not None:
+        headers["Cache-Control"] = f"max-age={stub.state.max_age}"
+    if stub.state.etags:
+        etag = f'W/"{len(body):x}-{hashlib.sha1(body).hexdigest()[:27]}"'
+        headers["ETag"] = etag
+        if etag in request.headers.get("if-none-match", ""):
+            stub.state.not_modified += 1
+            return Response(status_code=304, headers=headers)
+    stub.state.bytes_sent += len(body)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def create_stub_app(n_properties: int = N_PROPERTIES, etags: bool = True, max_age: Optional[int] = None) -> FastAPI:
+    """`etags`: validateurs et 304; `max_age`: Cache-Control envoyé (None = aucun).
+
+    `stub.state.properties` peut être modifié pour simuler un catalogue qui change;
+    `bytes_sent` et `not_modified` comptent ce qui a transité.
+    """
+    stub = FastAPI()
+    properties = make_properties(n_properties)
+    by_id = {p["_id"]: p for p in properties}
+    stub.state.properties = properties
+    stub.state.etags = etags
+    stub.state.max_age = max_age
+    stub.state.bytes_sent = 0
+    stub.state.not_modified = 0
+
+    @stub.get("/api/properties")
+    async def list_properties(request: Request):
+        catalogue = stub.state.properties
+        return json_response(request, {"success": True, "count": len(catalogue), "data": catalogue}, stub)
+
+    @stub.get("/api/properties/{property_id}")
+    async def get_property(property_id: str, request: Request):
+        return json_response(request, {"success": True, "data": by_id.get(property_id)}, stub)
+
+    @stub.get("/api/reservations")
+    async def my_reservations(request: Request):
+        return json_response(request, {"success": True, "data": []}, stub)
+
+    @stub.post("/api/reservations", status_code=201)
+    async def create_reservation(payload: dict):
+        return {"success": True, "data": {"_id": f"{len(payload):024x}", "status": "pending", **payload}}
+
+    @stub.get("/api/reservations/property/{property_id}")
+    async def property_reservations(property_id: str, request: Request):
+        return json_response(request, [], stub)
+
+    return stub
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_thread(n_properties: int = N_PROPERTIES, port: int = 0, stub: Optional[FastAPI] = None) -> str:
+    """Démarre le stub (ou `stub` s'il est fourni) dans un thread et retourne son URL de base"""
+    port = port or _free_port()
+    config = uvicorn.Config(stub or create_stub_app(n_properties), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=3999)
+    parser.add_argument("--properties", type=int, default=N_PROPERTIES)
+    parser.add_argument("--no-etags", action="store_true", help="désactive ETag et 304")
+    parser.add_argument("--max-age", type=int, default=None, help="Cache-Control: max-age envoyé")
+    args = parser.parse_args()
+    stub = create_stub_app(args.properties, etags=not args.no_etags, max_age=args.max_age)
+    uvicorn.run(stub, host="127.0.0.1", port=args.port, log_level="warning")
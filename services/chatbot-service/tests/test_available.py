@@ -0,0 +1,20 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("body", [
+    {"check_in": "2026-13-01", "check_out": "2026-12-05"},
+    {"check_in": "2026-12-5", "check_out": "2026-12-10"},
+    {"check_in": "demain", "check_out": "2026-12-10"},
+])
+def test_invalid_dates_are_rejected(body):
+    assert client.post("/api/chat/available", json=body).status_code == 422
+
+
+def test_check_out_must_follow_check_in():
+    body = {"check_in": "2026-12-10", "check_out": "2026-12-05"}
+    assert client.post("/api/chat/available", json=body).status_code == 400
@@ -0,0 +1,48 @@
+"""Corpus de référence de la détection d'intention (benchmarks/intent_corpus.json).
+
+    cd services/chatbot-service
+    python -m pytest tests
+"""
+import os
+
+import pytest
+
+from benchmarks.bench_intents import LegacyEngine, load_corpus, use_corpus_places
+from app.services import intent_classifier
+from app.services.intent_matcher import ID_RE, matcher
+
+CORPUS = load_corpus()
+use_corpus_places()
+
+
+def mismatches(detect, key: str = "intent") -> list:
+    return [
+        (c["message"], c.get(key, c["intent"]), detect(c["message"]))
+        for c in CORPUS
+        if detect(c["message"]) != c.get(key, c["intent"])
+    ]
+
+
+def test_matcher_matches_corpus():
+    assert mismatches(matcher.detect) == []
+
+
+def test_legacy_cascade_matches_corpus():
+    # Champ "legacy": intention rendue par la cascade d'origine pour les intentions ajoutées depuis
+    assert mismatches(LegacyEngine().detect_intent, key="legacy") == []
+
+
+def test_classifier_never_guesses_admin_or_id_intents():
+    for intent in ("admin_delete_property", "admin_delete_reservation", "admin_all_reservations", "create_reservation"):
+        assert intent in intent_classifier.RULE_ONLY_INTENTS
+
+
+@pytest.mark.skipif(intent_classifier.np is None or not os.path.exists(intent_classifier.INTENT_MODEL_PATH),
+                    reason="numpy ou modèle d'intentions absent")
+def test_hybrid_id_only_messages_never_delete():
+    # Un ID seul (ex.: tapé pendant une réservation) ne doit jamais déclencher une suppression
+    detector = intent_classifier.HybridDetector(intent_classifier.IntentClassifier.load(intent_classifier.INTENT_MODEL_PATH))
+    messages = [c["message"] for c in CORPUS if c["intent"] == "out_of_scope" and ID_RE.search(c["message"])]
+    assert messages
+    for message, intent in zip(messages, detector.detect_many(messages)):
+        assert not intent.startswith("admin_delete"), message
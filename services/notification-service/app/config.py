@@ -13,6 +13,50 @@ class Settings:
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     SMTP_FROM_NAME: str = os.getenv("SMTP_FROM_NAME", "LocaHome")
     SMTP_FROM_EMAIL: str = os.getenv("SMTP_FROM_EMAIL", "noreply@locahome.com")
+    SMTP_START_TLS: bool = os.getenv("SMTP_START_TLS", "true").lower() in ("1", "true", "yes")
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", 10))
+    
+    # Pool de connexions SMTP persistantes
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", 4))
+    SMTP_POOL_HEALTHCHECK_AFTER: float = float(os.getenv("SMTP_POOL_HEALTHCHECK_AFTER", 30))
+    SMTP_POOL_MAX_IDLE: float = float(os.getenv("SMTP_POOL_MAX_IDLE", 240))
+    SMTP_POOL_MAX_MESSAGES: int = int(os.getenv("SMTP_POOL_MAX_MESSAGES", 100))
+    
+    # File d'envoi asynchrone
+    NOTIFICATION_QUEUE_SIZE: int = int(os.getenv("NOTIFICATION_QUEUE_SIZE", 1000))
+    NOTIFICATION_WORKERS: int = int(os.getenv("NOTIFICATION_WORKERS", 4))
+    NOTIFICATION_DRAIN_TIMEOUT: float = float(os.getenv("NOTIFICATION_DRAIN_TIMEOUT", 30))
+    # Fenêtre (secondes) pendant laquelle une même notification n'est envoyée qu'une fois
+    IDEMPOTENCY_WINDOW: float = float(os.getenv("IDEMPOTENCY_WINDOW", 600))
+    
+    # Limitation de débit par token buckets: envois/seconde et rafale (0 = illimité)
+    SMTP_ACCOUNT_RATE: float = float(os.getenv("SMTP_ACCOUNT_RATE", 10))
+    SMTP_ACCOUNT_BURST: int = int(os.getenv("SMTP_ACCOUNT_BURST", 20))
+    DOMAIN_RATE: float = float(os.getenv("DOMAIN_RATE", 5))
+    DOMAIN_BURST: int = int(os.getenv("DOMAIN_BURST", 20))
+    # Limites propres à certains domaines: "gmail.com=2:10,outlook.com=1:5" (débit:rafale)
+    DOMAIN_RATE_OVERRIDES: str = os.getenv("DOMAIN_RATE_OVERRIDES", "")
+    RECIPIENT_RATE: float = float(os.getenv("RECIPIENT_RATE", 0.2))
+    RECIPIENT_BURST: int = int(os.getenv("RECIPIENT_BURST", 5))
+    
+    # Envoi groupé (/bulk)
+    BULK_MAX_JOBS: int = int(os.getenv("BULK_MAX_JOBS", 1000))
+    BULK_SESSIONS: int = int(os.getenv("BULK_SESSIONS", 4))
+    
+    # Outbox durable (SQLite): réessais avec backoff puis dead letters
+    OUTBOX_PATH: str = os.getenv("OUTBOX_PATH", "data/outbox.sqlite3")
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+    OUTBOX_RETRY_BASE_DELAY: float = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", 5))
+    OUTBOX_RETRY_MAX_DELAY: float = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", 600))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+    OUTBOX_SENT_RETENTION: float = float(os.getenv("OUTBOX_SENT_RETENTION", 86400))
+    OUTBOX_SYNCHRONOUS: str = os.getenv("OUTBOX_SYNCHRONOUS", "FULL")
+    
+    # Templates: rechargement automatique (développement) et cache de bytecode
+    TEMPLATES_AUTO_RELOAD: bool = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+    TEMPLATES_BYTECODE_CACHE_DIR: str = os.getenv("TEMPLATES_BYTECODE_CACHE_DIR", "data/jinja_cache")
+    TEMPLATES_INLINE_CSS: bool = os.getenv("TEMPLATES_INLINE_CSS", "true").lower() in ("1", "true", "yes")
+    TEMPLATES_RENDER_CACHE_SIZE: int = int(os.getenv("TEMPLATES_RENDER_CACHE_SIZE", 1024))
     
     # Frontend URL
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3005")
@@ -1,14 +1,35 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from app.config import settings
 from app.routes.email import router as email_router
+from app.services.metrics import CONTENT_TYPE, registry
+from app.services.send_queue import send_queue
+from app.services.smtp_pool import smtp_pool
+from app.services.templates import renderer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Templates compilés et layout pré-rendu avant la première requête
+    renderer.load()
+    # Connexions SMTP persistantes partagées par toutes les requêtes
+    await smtp_pool.start()
+    await send_queue.start()
+    yield
+    # Vide la file d'envoi (le reste demeure dans l'outbox) avant de fermer les connexions SMTP
+    await send_queue.stop()
+    await smtp_pool.close()
+
 
 app = FastAPI(
     title="Notification Service",
     description="Service de notifications par email pour LocaHome",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -23,6 +44,24 @@ app.add_middleware(
 # Routes
 app.include_router(email_router)
 
+# Jauges lues à chaque scrape de /metrics
+registry.collected(
+    "notification_queue_depth", "Notifications en file, par type", ("type",),
+    lambda: {(kind,): depth for kind, depth in send_queue.depth_by_type().items()},
+)
+registry.collected(
+    "notification_queue_jobs", "Notifications non terminées (active: file, envoi et réessais)", ("state",),
+    lambda: {(state,): count for state, count in send_queue.counts().items() if state != "dead_letters"},
+)
+registry.collected(
+    "notification_dead_letters", "Notifications abandonnées depuis le démarrage", (),
+    lambda: {(): send_queue.counts()["dead_letters"]},
+)
+registry.collected(
+    "notification_smtp_connections", "Connexions SMTP du pool", ("state",),
+    lambda: {("idle",): smtp_pool.stats()["idle"], ("in_use",): smtp_pool.stats()["in_use"]},
+)
+
 
 @app.get("/")
 async def root():
@@ -41,6 +80,18 @@ async def health():
     }
 
 
+@app.get("/api/notifications/stats")
+async def stats():
+    """Compteurs de la file d'envoi et du pool SMTP"""
+    return {"queue": await send_queue.stats(), "smtp_pool": smtp_pool.stats(), "templates": renderer.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     print(f"🚀 Notification Service démarré sur le port {settings.PORT}")
     uvicorn.run("app.main:app", host="0.0.0.0", port=settings.PORT, reload=True)
@@ -1,107 +1,107 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
 from app.schemas import (
     WelcomeEmailRequest,
     NewReservationEmailRequest,
     ReservationConfirmedEmailRequest,
     ReservationRejectedEmailRequest,
     ReservationCancelledEmailRequest,
-    EmailResponse
-)
-from app.services.email_service import (
-    send_welcome_email,
-    send_new_reservation_email,
-    send_reservation_confirmed_email,
-    send_reservation_rejected_email,
-    send_reservation_cancelled_email
+    JobAcceptedResponse,
+    JobStatusResponse,
+    BulkNotificationRequest,
+    BulkNotificationResponse
 )
+from app.services.send_queue import send_queue, QueueFullError
 
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
 
 
-@router.post("/welcome", response_model=EmailResponse)
-async def send_welcome(request: WelcomeEmailRequest):
-    """Envoie un email de bienvenue après inscription"""
-    success = await send_welcome_email(
-        to_email=request.email,
-        first_name=request.first_name,
-        role=request.role
-    )
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Erreur lors de l'envoi de l'email")
+async def enqueue(kind: str, request: BaseModel, message: str, idempotency_key: Optional[str] = None) -> JobAcceptedResponse:
+    """Écrit la notification dans l'outbox et répond sans attendre le SMTP.
+
+    Sans en-tête Idempotency-Key, la clé est l'empreinte du contenu: un
+    renvoi identique dans la fenêtre d'idempotence n'envoie pas un second email.
+    """
+    try:
+        submission = await send_queue.submit(kind, request.model_dump(), idempotency_key)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     
-    return EmailResponse(success=True, message="Email de bienvenue envoyé")
+    if submission.duplicate:
+        message = "Notification déjà reçue, elle ne sera pas renvoyée"
+    return JobAcceptedResponse(success=True, message=message, job_id=submission.job_id,
+                               status=submission.status, duplicate=submission.duplicate)
 
 
-@router.post("/new-reservation", response_model=EmailResponse)
-async def send_new_reservation(request: NewReservationEmailRequest):
+@router.post("/welcome", response_model=JobAcceptedResponse, status_code=202)
+async def send_welcome(request: WelcomeEmailRequest, idempotency_key: Optional[str] = Header(None)):
+    """Envoie un email de bienvenue après inscription"""
+    return await enqueue("welcome", request, "Email de bienvenue en cours d'envoi", idempotency_key)
+
+
+@router.post("/new-reservation", response_model=JobAcceptedResponse, status_code=202)
+async def send_new_reservation(request: NewReservationEmailRequest, idempotency_key: Optional[str] = Header(None)):
     """Notifie le propriétaire d'une nouvelle demande de réservation"""
-    success = await send_new_reservation_email(
-        to_email=request.owner_email,
-        owner_name=request.owner_name,
-        tenant_name=request.tenant_name,
-        property_title=request.property_title,
-        start_date=request.start_date,
-        end_date=request.end_date,
-        total_price=request.total_price
-    )
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Erreur lors de l'envoi de l'email")
-    
-    return EmailResponse(success=True, message="Notification envoyée au propriétaire")
+    return await enqueue("new_reservation", request, "Notification en cours d'envoi au propriétaire", idempotency_key)
 
 
-@router.post("/reservation-confirmed", response_model=EmailResponse)
-async def send_reservation_confirmed(request: ReservationConfirmedEmailRequest):
+@router.post("/reservation-confirmed", response_model=JobAcceptedResponse, status_code=202)
+async def send_reservation_confirmed(request: ReservationConfirmedEmailRequest, idempotency_key: Optional[str] = Header(None)):
     """Notifie le locataire que sa réservation est confirmée"""
-    success = await send_reservation_confirmed_email(
-        to_email=request.tenant_email,
-        tenant_name=request.tenant_name,
-        property_title=request.property_title,
-        property_address=request.property_address,
-        start_date=request.start_date,
-        end_date=request.end_date,
-        total_price=request.total_price
-    )
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Erreur lors de l'envoi de l'email")
-    
-    return EmailResponse(success=True, message="Email de confirmation envoyé au locataire")
+    return await enqueue("reservation_confirmed", request, "Email de confirmation en cours d'envoi au locataire", idempotency_key)
 
 
-@router.post("/reservation-rejected", response_model=EmailResponse)
-async def send_reservation_rejected(request: ReservationRejectedEmailRequest):
+@router.post("/reservation-rejected", response_model=JobAcceptedResponse, status_code=202)
+async def send_reservation_rejected(request: ReservationRejectedEmailRequest, idempotency_key: Optional[str] = Header(None)):
     """Notifie le locataire que sa réservation est refusée (avec raison optionnelle)"""
-    success = await send_reservation_rejected_email(
-        to_email=request.tenant_email,
-        tenant_name=request.tenant_name,
-        property_title=request.property_title,
-        start_date=request.start_date,
-        end_date=request.end_date,
-        rejection_reason=request.rejection_reason
-    )
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Erreur lors de l'envoi de l'email")
-    
-    return EmailResponse(success=True, message="Email de refus envoyé au locataire")
+    return await enqueue("reservation_rejected", request, "Email de refus en cours d'envoi au locataire", idempotency_key)
 
 
-@router.post("/reservation-cancelled", response_model=EmailResponse)
-async def send_reservation_cancelled(request: ReservationCancelledEmailRequest):
+@router.post("/reservation-cancelled", response_model=JobAcceptedResponse, status_code=202)
+async def send_reservation_cancelled(request: ReservationCancelledEmailRequest, idempotency_key: Optional[str] = Header(None)):
     """Notifie qu'une réservation a été annulée"""
-    success = await send_reservation_cancelled_email(
-        to_email=request.recipient_email,
-        recipient_name=request.recipient_name,
-        cancelled_by=request.cancelled_by,
-        property_title=request.property_title,
-        start_date=request.start_date,
-        end_date=request.end_date
-    )
+    return await enqueue("reservation_cancelled", request, "Email d'annulation en cours d'envoi", idempotency_key)
+
+
+@router.post("/bulk", response_model=BulkNotificationResponse)
+async def send_bulk_notifications(request: BulkNotificationRequest, idempotency_key: Optional[str] = Header(None)):
+    """Envoie un lot de notifications (ex.: annulation de toutes les réservations d'une propriété).
+
+    Mêmes limites de débit et même idempotence que les envois unitaires:
+    rejouer le même lot n'envoie pas un second email.
+    """
+    jobs = [(job.type, job.model_dump(exclude={"type"})) for job in request.jobs]
+    try:
+        results = await send_queue.send_batch(jobs, idempotency_key)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     
-    if not success:
-        raise HTTPException(status_code=500, detail="Erreur lors de l'envoi de l'email")
+    fresh = [r["status"] for r in results if not r["duplicate"]]
+    sent, retrying, failed = fresh.count("sent"), fresh.count("retrying"), fresh.count("failed")
+    duplicates = len(results) - len(fresh)
+    message = f"{sent} email(s) envoyé(s), {failed} échec(s)"
+    if retrying:
+        message += f", {retrying} en attente de réessai"
+    if duplicates:
+        message += f", {duplicates} doublon(s) déjà reçu(s)"
+    return BulkNotificationResponse(
+        success=failed == 0 and retrying == 0,
+        message=message,
+        sent=sent,
+        failed=failed,
+        retrying=retrying,
+        duplicates=duplicates,
+        results=results
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Statut d'une notification mise en file"""
+    job = await send_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
     
-    return EmailResponse(success=True, message="Email d'annulation envoyé")
+    return JobStatusResponse(**job)
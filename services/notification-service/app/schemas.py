@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Annotated, List, Literal, Optional, Union
+
+from app.config import settings
 
 
 class WelcomeEmailRequest(BaseModel):
@@ -49,3 +51,83 @@ class ReservationCancelledEmailRequest(BaseModel):
 class EmailResponse(BaseModel):
     success: bool
     message: str
+
+
+class JobAcceptedResponse(BaseModel):
+    success: bool
+    message: str
+    job_id: str
+    status: str
+    duplicate: bool = False
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    type: str
+    status: str  # 'queued', 'sending', 'retrying', 'sent' or 'failed'
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+
+
+# ============ ENVOI GROUPÉ ============
+
+class BulkWelcomeJob(WelcomeEmailRequest):
+    type: Literal["welcome"]
+
+
+class BulkNewReservationJob(NewReservationEmailRequest):
+    type: Literal["new_reservation"]
+
+
+class BulkReservationConfirmedJob(ReservationConfirmedEmailRequest):
+    type: Literal["reservation_confirmed"]
+
+
+class BulkReservationRejectedJob(ReservationRejectedEmailRequest):
+    type: Literal["reservation_rejected"]
+
+
+class BulkReservationCancelledJob(ReservationCancelledEmailRequest):
+    type: Literal["reservation_cancelled"]
+
+
+BulkJob = Annotated[
+    Union[
+        BulkWelcomeJob,
+        BulkNewReservationJob,
+        BulkReservationConfirmedJob,
+        BulkReservationRejectedJob,
+        BulkReservationCancelledJob,
+    ],
+    Field(discriminator="type"),
+]
+
+
+class BulkNotificationRequest(BaseModel):
+    jobs: List[BulkJob] = Field(..., min_length=1, max_length=settings.BULK_MAX_JOBS)
+
+
+class BulkRecipientResult(BaseModel):
+    index: int
+    recipient: Optional[str] = None
+    success: bool
+    error: Optional[str] = None
+    job_id: Optional[str] = None
+    # sent | retrying (nouvel essai planifié) | failed, ou statut du job d'origine pour un doublon
+    status: str
+    # Déjà reçue (même clé d'idempotence): pas de second email
+    duplicate: bool = False
+
+
+class BulkNotificationResponse(BaseModel):
+    success: bool
+    message: str
+    sent: int
+    failed: int
+    # Échecs remis en file avec backoff (suivis via /jobs/{job_id})
+    retrying: int = 0
+    # Doublons d'envois déjà reçus, comptés à part
+    duplicates: int = 0
+    results: List[BulkRecipientResult]
@@ -0,0 +1,160 @@
+import re
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+# Inlining CSS minimal, appliqué une seule fois aux sources des templates.
+# Sélecteurs pris en charge: balise, .classe, balise.classe et le combinateur
+# descendant (".header h1"). Les pseudo-classes restent dans le bloc <style>,
+# conservé pour les clients qui le lisent: les propriétés d'une règle
+# structurelle (.info-row:last-child) ne sont pas inlinées sur l'élément de
+# base, sinon le style en ligne l'emporterait sur elle.
+
+RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+STYLE_BLOCK_RE = re.compile(r"<style[^>]*>(.*?)</style>", re.DOTALL | re.IGNORECASE)
+TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*?)(/?)>")
+CLASS_ATTR_RE = re.compile(r"\bclass\s*=\s*\"([^\"]*)\"")
+STYLE_ATTR_RE = re.compile(r"\bstyle\s*=\s*\"([^\"]*)\"")
+SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*)?((?:\.[a-zA-Z_-][\w-]*)*)$")
+STATE_PSEUDO_CLASSES = {"hover", "active", "focus", "visited", "link"}
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+NO_INLINE_ELEMENTS = {"html", "head", "meta", "title", "style", "script", "link"}
+
+# (balise ou None, classes requises)
+SimpleSelector = Tuple[str, FrozenSet[str]]
+# (balise, classes) d'un élément ouvert
+Element = Tuple[str, FrozenSet[str]]
+
+
+def _parse_simple(selector: str):
+    match = SIMPLE_SELECTOR_RE.match(selector)
+    if not match or not selector:
+        return None
+    tag = match.group(1).lower() if match.group(1) else None
+    classes = frozenset(c for c in match.group(2).split(".") if c)
+    return tag, classes
+
+
+def _parse_declarations(body: str) -> List[Tuple[str, str]]:
+    declarations = []
+    for item in body.split(";"):
+        if ":" in item:
+            prop, value = item.split(":", 1)
+            if prop.strip() and value.strip():
+                declarations.append((prop.strip().lower(), " ".join(value.split())))
+    return declarations
+
+
+class Stylesheet:
+    """Règles CSS applicables en ligne, triées par spécificité puis par ordre"""
+
+    def __init__(self, css: str):
+        rules = []
+        self.deferred = []
+        order = 0
+        for selectors, body in RULE_RE.findall(css):
+            declarations = _parse_declarations(body)
+            for selector in selectors.split(","):
+                names = selector.split()
+                if not names:
+                    continue
+                *names, last = names
+                last, _, pseudo = last.partition(":")
+                parts = [_parse_simple(p) for p in names + [last]]
+                if any(p is None for p in parts):
+                    continue
+                if pseudo:
+                    if pseudo not in STATE_PSEUDO_CLASSES:
+                        self.deferred.append((tuple(parts), {prop for prop, _ in declarations}))
+                    continue
+                specificity = (sum(len(c) for _, c in parts), sum(1 for t, _ in parts if t))
+                rules.append((specificity, order, tuple(parts), declarations))
+                order += 1
+        rules.sort(key=lambda r: (r[0], r[1]))
+        self.rules = [(parts, declarations) for _, _, parts, declarations in rules]
+
+    @classmethod
+    def from_html(cls, html: str) -> "Stylesheet":
+        return cls("\n".join(STYLE_BLOCK_RE.findall(html)))
+
+    def styles_for(self, stack: Sequence[Element]) -> Dict[str, str]:
+        """Déclarations qui s'appliquent au dernier élément de la pile"""
+        styles: Dict[str, str] = {}
+        for parts, declarations in self.rules:
+            if _matches(parts, stack):
+                styles.update(declarations)
+        for parts, properties in self.deferred:
+            if styles and _matches(parts, stack):
+                for prop in properties:
+                    styles.pop(prop, None)
+        return styles
+
+
+def _matches_element(selector: SimpleSelector, element: Element) -> bool:
+    tag, classes = selector
+    return (tag is None or tag == element[0]) and classes <= element[1]
+
+
+def _matches(parts: Tuple[SimpleSelector, ...], stack: Sequence[Element]) -> bool:
+    if not stack or not _matches_element(parts[-1], stack[-1]):
+        return False
+    position = len(stack) - 2
+    for selector in reversed(parts[:-1]):
+        while position >= 0 and not _matches_element(selector, stack[position]):
+            position -= 1
+        if position < 0:
+            return False
+        position -= 1
+    return True
+
+
+def _element(tag: str, attrs: str) -> Element:
+    match = CLASS_ATTR_RE.search(attrs)
+    classes = frozenset(match.group(1).split()) if match and "{" not in match.group(1) else frozenset()
+    return tag.lower(), classes
+
+
+def open_elements(html: str) -> List[Element]:
+    """Pile des éléments encore ouverts à la fin d'un fragment HTML"""
+    stack: List[Element] = []
+    for closing, tag, attrs, self_closing in TAG_RE.findall(html):
+        tag = tag.lower()
+        if closing:
+            while stack and stack.pop()[0] != tag:
+                pass
+        elif tag not in VOID_ELEMENTS and not self_closing:
+            stack.append(_element(tag, attrs))
+    return stack
+
+
+def inline_css(html: str, stylesheet: Stylesheet, ancestors: Sequence[Element] = ()) -> str:
+    """Ajoute les styles des règles applicables dans l'attribut style de chaque balise.
+
+    Un style déjà présent dans la balise garde la priorité. `ancestors` est
+    la pile des éléments qui entourent le fragment (bloc d'un layout).
+    """
+    stack: List[Element] = list(ancestors)
+    output = []
+    last = 0
+    for match in TAG_RE.finditer(html):
+        closing, tag, attrs, self_closing = match.groups()
+        tag = tag.lower()
+        if closing:
+            while stack and stack.pop()[0] != tag:
+                pass
+            continue
+        element = _element(tag, attrs)
+        stack.append(element)
+        styles = stylesheet.styles_for(stack) if tag not in NO_INLINE_ELEMENTS else {}
+        if tag in VOID_ELEMENTS or self_closing:
+            stack.pop()
+        if not styles:
+            continue
+        existing = STYLE_ATTR_RE.search(attrs)
+        if existing:
+            styles.update(_parse_declarations(existing.group(1)))
+            attrs = attrs[:existing.start()].rstrip() + attrs[existing.end():]
+        style = "; ".join(f"{prop}: {value}" for prop, value in styles.items())
+        output.append(html[last:match.start()])
+        output.append(f'<{tag}{attrs.rstrip()} style="{style}"{" /" if self_closing else ""}>')
+        last = match.end()
+    output.append(html[last:])
+    return "".join(output)
@@ -1,138 +1,337 @@
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from jinja2 import Environment, FileSystemLoader
-import os
+import base64
+import time
+import uuid
+from email.headerregistry import Address
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formatdate
+from functools import lru_cache
+from typing import Awaitable, Callable, List, Optional, Tuple
 
 from app.config import settings
+from app.services.html_text import html_to_text
+from app.services.metrics import FAILURES, MIME_SECONDS, RENDER_SECONDS, SEND_SECONDS, SENT
+from app.services.smtp_pool import RawMessage, SMTPPool, smtp_pool
+from app.services.templates import renderer
 
-# Configuration Jinja2 pour les templates
-template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
-env = Environment(loader=FileSystemLoader(template_dir))
+# Frontière multipart fixe: les parties sont encodées en base64, dont
+# l'alphabet ne contient pas "-", une ligne "--frontière" ne peut donc
+# pas apparaître dans le contenu.
+BOUNDARY = f"=_locahome_{uuid.uuid4().hex}"
+PART_HEADERS = {
+    subtype: (
+        f"--{BOUNDARY}\r\nContent-Type: text/{subtype}; charset=\"utf-8\"\r\n"
+        "Content-Transfer-Encoding: base64\r\n\r\n"
+    ).encode()
+    for subtype in ("plain", "html")
+}
+CLOSING_BOUNDARY = f"--{BOUNDARY}--\r\n".encode()
 
 
-async def send_email(to_email: str, subject: str, html_content: str) -> bool:
-    """Envoie un email via SMTP"""
+@lru_cache(maxsize=16)
+def sender_headers(from_name: str, from_email: str) -> bytes:
+    """En-têtes communs à tous les emails d'un expéditeur, sérialisés une seule fois"""
+    headers = EmailMessage(policy=SMTP)
+    headers["From"] = Address(from_name, addr_spec=from_email)
+    headers["MIME-Version"] = "1.0"
+    headers["Content-Type"] = f'multipart/alternative; boundary="{BOUNDARY}"'
+    return b"".join(SMTP.fold_binary(name, value) for name, value in headers.items())
+
+
+@lru_cache(maxsize=1024)
+def encode_header(value: str) -> str:
+    """Valeur d'en-tête ASCII (RFC 2047, mots base64 d'au plus 45 octets)"""
+    if value.isascii() and "\r" not in value and "\n" not in value:
+        return value
+    data = value.encode("utf-8")
+    words = []
+    start = 0
+    while start < len(data):
+        end = min(start + 45, len(data))
+        # Ne pas couper un caractère UTF-8 entre deux mots encodés
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        words.append(f"=?utf-8?b?{base64.b64encode(data[start:end]).decode()}?=")
+        start = end
+    return "\r\n ".join(words)
+
+
+def _encode_body(content: str) -> bytes:
+    return base64.encodebytes(content.encode("utf-8")).replace(b"\n", b"\r\n")
+
+
+def build_message(to_email: str, subject: str, html_content: str,
+                  text_content: Optional[str] = None) -> RawMessage:
+    """Construit un email multipart/alternative (texte brut + HTML) prêt à l'envoi.
+
+    Seuls les en-têtes propres au message sont encodés: le bloc de
+    l'expéditeur est réutilisé d'un envoi à l'autre.
+    """
+    if text_content is None:
+        text_content = html_to_text(html_content)
+    sender = settings.SMTP_FROM_EMAIL
+    domain = sender.rpartition("@")[2] or "localhost"
+    headers = (
+        f"To: {encode_header(to_email)}\r\n"
+        f"Subject: {encode_header(subject)}\r\n"
+        f"Date: {formatdate()}\r\n"
+        f"Message-ID: <{uuid.uuid4().hex}@{domain}>\r\n\r\n"
+    )
+    data = b"".join((
+        sender_headers(settings.SMTP_FROM_NAME, sender),
+        headers.encode("ascii"),
+        PART_HEADERS["plain"], _encode_body(text_content),
+        PART_HEADERS["html"], _encode_body(html_content),
+        CLOSING_BOUNDARY,
+    ))
+    return RawMessage(sender, [to_email], data)
+
+
+async def deliver(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None):
+    """Envoie un email via une connexion SMTP persistante du pool (lève une exception en cas d'échec)"""
+    with MIME_SECONDS.time():
+        message = build_message(to_email, subject, html_content, text_content)
+    await smtp_pool.send(message)
+
+    print(f"✅ Email envoyé à {to_email}: {subject}")
+
+
+async def send_email(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None) -> bool:
+    """Envoie un email, retourne False en cas d'échec"""
     try:
-        message = MIMEMultipart("alternative")
-        message["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM_EMAIL}>"
-        message["To"] = to_email
-        message["Subject"] = subject
-        
-        html_part = MIMEText(html_content, "html")
-        message.attach(html_part)
-        
-        await aiosmtplib.send(
-            message,
-            hostname=settings.SMTP_HOST,
-            port=settings.SMTP_PORT,
-            username=settings.SMTP_USER,
-            password=settings.SMTP_PASSWORD,
-            start_tls=True,
-        )
-        
-        print(f"✅ Email envoyé à {to_email}: {subject}")
+        await deliver(to_email, subject, html_content, text_content)
         return True
-        
+
     except Exception as e:
         print(f"❌ Erreur envoi email à {to_email}: {str(e)}")
         return False
 
 
-async def send_welcome_email(to_email: str, first_name: str, role: str) -> bool:
+# ============ RENDU DES TEMPLATES: (sujet, html, texte) ============
+
+def render_welcome_email(first_name: str, role: str) -> Tuple[str, str, str]:
     """Email de bienvenue après inscription"""
-    template = env.get_template("welcome.html")
-    html_content = template.render(
+    html_content, text_content = renderer.render_email(
+        "welcome.html",
         first_name=first_name,
-        role="propriétaire" if role == "owner" else "locataire",
-        frontend_url=settings.FRONTEND_URL
+        role="propriétaire" if role == "owner" else "locataire"
     )
-    return await send_email(to_email, "Bienvenue sur LocaHome ! 🏠", html_content)
+    return "Bienvenue sur LocaHome ! 🏠", html_content, text_content
 
 
-async def send_new_reservation_email(
-    to_email: str,
+def render_new_reservation_email(
     owner_name: str,
     tenant_name: str,
     property_title: str,
     start_date: str,
     end_date: str,
     total_price: float
-) -> bool:
+) -> Tuple[str, str, str]:
     """Email au propriétaire quand un locataire fait une demande"""
-    template = env.get_template("new_reservation.html")
-    html_content = template.render(
+    html_content, text_content = renderer.render_email(
+        "new_reservation.html",
         owner_name=owner_name,
         tenant_name=tenant_name,
         property_title=property_title,
         start_date=start_date,
         end_date=end_date,
-        total_price=total_price,
-        frontend_url=settings.FRONTEND_URL
+        total_price=total_price
     )
-    return await send_email(to_email, f"Nouvelle demande de réservation - {property_title}", html_content)
+    return f"Nouvelle demande de réservation - {property_title}", html_content, text_content
 
 
-async def send_reservation_confirmed_email(
-    to_email: str,
+def render_reservation_confirmed_email(
     tenant_name: str,
     property_title: str,
     property_address: str,
     start_date: str,
     end_date: str,
     total_price: float
-) -> bool:
+) -> Tuple[str, str, str]:
     """Email au locataire quand sa réservation est confirmée"""
-    template = env.get_template("reservation_confirmed.html")
-    html_content = template.render(
+    html_content, text_content = renderer.render_email(
+        "reservation_confirmed.html",
         tenant_name=tenant_name,
         property_title=property_title,
         property_address=property_address,
         start_date=start_date,
         end_date=end_date,
-        total_price=total_price,
-        frontend_url=settings.FRONTEND_URL
+        total_price=total_price
     )
-    return await send_email(to_email, f"Réservation confirmée - {property_title} ✅", html_content)
+    return f"Réservation confirmée - {property_title} ✅", html_content, text_content
 
 
-async def send_reservation_rejected_email(
-    to_email: str,
+def render_reservation_rejected_email(
     tenant_name: str,
     property_title: str,
     start_date: str,
     end_date: str,
     rejection_reason: str = None
-) -> bool:
+) -> Tuple[str, str, str]:
     """Email au locataire quand sa réservation est refusée"""
-    template = env.get_template("reservation_rejected.html")
-    html_content = template.render(
+    html_content, text_content = renderer.render_email(
+        "reservation_rejected.html",
         tenant_name=tenant_name,
         property_title=property_title,
         start_date=start_date,
         end_date=end_date,
-        rejection_reason=rejection_reason,
-        frontend_url=settings.FRONTEND_URL
+        rejection_reason=rejection_reason
     )
-    return await send_email(to_email, f"Réservation refusée - {property_title}", html_content)
+    return f"Réservation refusée - {property_title}", html_content, text_content
 
 
-async def send_reservation_cancelled_email(
-    to_email: str,
+def render_reservation_cancelled_email(
     recipient_name: str,
     cancelled_by: str,
     property_title: str,
     start_date: str,
     end_date: str
-) -> bool:
+) -> Tuple[str, str, str]:
     """Email quand une réservation est annulée (au locataire et/ou propriétaire)"""
-    template = env.get_template("reservation_cancelled.html")
-    html_content = template.render(
+    html_content, text_content = renderer.render_email(
+        "reservation_cancelled.html",
         recipient_name=recipient_name,
         cancelled_by=cancelled_by,
         property_title=property_title,
         start_date=start_date,
-        end_date=end_date,
-        frontend_url=settings.FRONTEND_URL
+        end_date=end_date
     )
-    return await send_email(to_email, f"Réservation annulée - {property_title}", html_content)
+    return f"Réservation annulée - {property_title}", html_content, text_content
+
+
+# Type de notification -> (rendu, champ du destinataire dans la requête)
+NOTIFICATIONS = {
+    "welcome": (render_welcome_email, "email"),
+    "new_reservation": (render_new_reservation_email, "owner_email"),
+    "reservation_confirmed": (render_reservation_confirmed_email, "tenant_email"),
+    "reservation_rejected": (render_reservation_rejected_email, "tenant_email"),
+    "reservation_cancelled": (render_reservation_cancelled_email, "recipient_email"),
+}
+
+
+def recipient_of(kind: str, payload: dict) -> str:
+    """Adresse du destinataire d'une notification"""
+    return payload[NOTIFICATIONS[kind][1]]
+
+
+def render_notification(kind: str, payload: dict) -> Tuple[str, str, str, str]:
+    """Rend une notification à partir des champs de la requête validée: (destinataire, sujet, html, texte)"""
+    render, recipient_field = NOTIFICATIONS[kind]
+    fields = dict(payload)
+    to_email = fields.pop(recipient_field)
+    with RENDER_SECONDS.time(kind):
+        return (to_email, *render(**fields))
+
+
+async def send_notification(kind: str, payload: dict):
+    """Rend et envoie une notification (lève une exception en cas d'échec)"""
+    started = time.perf_counter()
+    try:
+        await deliver(*render_notification(kind, payload))
+    except Exception as e:
+        FAILURES.inc(kind, type(e).__name__)
+        raise
+    SEND_SECONDS.observe(time.perf_counter() - started, kind)
+    SENT.inc(kind)
+
+
+async def send_bulk(jobs: List[Tuple[str, dict]], pool: SMTPPool = smtp_pool,
+                    sessions: int = settings.BULK_SESSIONS,
+                    before_send: Optional[Callable[[RawMessage], Awaitable[None]]] = None) -> List[dict]:
+    """Envoie un lot de notifications: tout est rendu d'abord, puis envoyé sur
+    quelques sessions SMTP réutilisées. Retourne un résultat par destinataire.
+
+    `before_send` est attendu avant chaque message (jetons du RateLimiter).
+    """
+    results = []
+    messages, positions = [], []
+    for index, (kind, payload) in enumerate(jobs):
+        try:
+            to_email, subject, html_content, text_content = render_notification(kind, payload)
+        except Exception as e:
+            FAILURES.inc(kind, type(e).__name__)
+            results.append({"index": index, "recipient": None, "success": False, "error": f"Erreur de rendu: {e}"})
+            continue
+        results.append({"index": index, "recipient": to_email, "success": True, "error": None})
+        with MIME_SECONDS.time():
+            messages.append(build_message(to_email, subject, html_content, text_content))
+        positions.append(index)
+
+    errors = await pool.send_many(messages, sessions, before_send)
+    for index, error in zip(positions, errors):
+        kind = jobs[index][0]
+        if error is not None:
+            FAILURES.inc(kind, type(error).__name__)
+            results[index]["success"] = False
+            results[index]["error"] = f"{type(error).__name__}: {error}"
+        else:
+            SENT.inc(kind)
+
+    sent = sum(1 for r in results if r["success"])
+    print(f"✅ Envoi groupé: {sent}/{len(results)} emails envoyés")
+    return results
+
+
+# ============ ENVOI DIRECT ============
+
+async def send_welcome_email(to_email: str, first_name: str, role: str) -> bool:
+    """Email de bienvenue après inscription"""
+    return await send_email(to_email, *render_welcome_email(first_name, role))
+
+
+async def send_new_reservation_email(
+    to_email: str,
+    owner_name: str,
+    tenant_name: str,
+    property_title: str,
+    start_date: str,
+    end_date: str,
+    total_price: float
+) -> bool:
+    """Email au propriétaire quand un locataire fait une demande"""
+    return await send_email(to_email, *render_new_reservation_email(
+        owner_name, tenant_name, property_title, start_date, end_date, total_price
+    ))
+
+
+async def send_reservation_confirmed_email(
+    to_email: str,
+    tenant_name: str,
+    property_title: str,
+    property_address: str,
+    start_date: str,
+    end_date: str,
+    total_price: float
+) -> bool:
+    """Email au locataire quand sa réservation est confirmée"""
+    return await send_email(to_email, *render_reservation_confirmed_email(
+        tenant_name, property_title, property_address, start_date, end_date, total_price
+    ))
+
+
+async def send_reservation_rejected_email(
+    to_email: str,
+    tenant_name: str,
+    property_title: str,
+    start_date: str,
+    end_date: str,
+    rejection_reason: str = None
+) -> bool:
+    """Email au locataire quand sa réservation est refusée"""
+    return await send_email(to_email, *render_reservation_rejected_email(
+        tenant_name, property_title, start_date, end_date, rejection_reason
+    ))
+
+
+async def send_reservation_cancelled_email(
+    to_email: str,
+    recipient_name: str,
+    cancelled_by: str,
+    property_title: str,
+    start_date: str,
+    end_date: str
+) -> bool:
+    """Email quand une réservation est annulée (au locataire et/ou propriétaire)"""
+    return await send_email(to_email, *render_reservation_cancelled_email(
+        recipient_name, cancelled_by, property_title, start_date, end_date
+    ))
@@ -0,0 +1,41 @@
+import re
+from html import unescape
+
+# Conversion HTML -> texte brut pour la partie text/plain des emails.
+# Appliquée aux sources des templates (balises Jinja comprises) au
+# chargement, pas au rendu: les {{ variables }} traversent la conversion
+# et sont substituées ensuite dans le texte.
+
+DROP_RE = re.compile(r"<!--.*?-->|<(head|style|script|title)\b.*?</\1\s*>", re.DOTALL | re.IGNORECASE)
+LINK_RE = re.compile(r"<a\b[^>]*?\bhref\s*=\s*\"([^\"]*)\"[^>]*>(.*?)</a\s*>", re.DOTALL | re.IGNORECASE)
+PARAGRAPH_RE = re.compile(r"</?(p|h[1-6]|ul|ol|table|blockquote|center)\b[^>]*>", re.IGNORECASE)
+LINE_RE = re.compile(r"<br\b[^>]*>|</?(div|tr|header|footer|section|hr)\b[^>]*>", re.IGNORECASE)
+ITEM_RE = re.compile(r"<li\b[^>]*>", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]+>")
+WHITESPACE_RE = re.compile(r"\s+")
+LINE_BREAKS_RE = re.compile(r" ?\n[ \n]*")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+# Instruction Jinja seule sur sa ligne: collée au texte suivant pour qu'une
+# branche non rendue ne laisse pas de lignes vides (trim_blocks mange le \n)
+STATEMENT_LINE_RE = re.compile(r"\n+(\{%.*?%\})\n+")
+
+
+def _link(match) -> str:
+    href, label = match.group(1), TAG_RE.sub("", match.group(2)).strip()
+    if not label or label == href:
+        return href
+    return f"{label} ({href})"
+
+
+def html_to_text(html: str) -> str:
+    """Texte lisible d'un document HTML: paragraphes, listes et liens (« libellé (url) »)"""
+    html = DROP_RE.sub("", html)
+    html = WHITESPACE_RE.sub(" ", html)
+    html = LINK_RE.sub(_link, html)
+    html = LINE_BREAKS_RE.sub("\n", LINE_RE.sub("\n", html))
+    html = PARAGRAPH_RE.sub("\n\n", html)
+    html = ITEM_RE.sub("\n- ", html)
+    text = unescape(TAG_RE.sub("", html))
+    lines = (line.strip() for line in text.split("\n"))
+    text = BLANK_LINES_RE.sub("\n\n", "\n".join(lines))
+    return STATEMENT_LINE_RE.sub(r"\n\n\1", text).strip() + "\n"
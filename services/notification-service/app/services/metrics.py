@@ -0,0 +1,165 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence
+
+# Métriques au format texte Prometheus (exposition 0.0.4), sans dépendance.
+# Chaque service est construit et déployé seul, sans paquet partagé: le cœur
+# (_escape à Registry) est le même que chatbot-service/app/services/metrics.py
+# et doit le rester; seul Histogram.time() est propre à ce service.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Secondes: de la milliseconde (rendu) à la dizaine de secondes (SMTP lent)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [compteurs par seau (non cumulés) + débordement, somme]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues) -> Iterator[None]:
+        """Chronomètre un bloc: `with histogram.time("label"): ...`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Collected:
+    """Série lue au moment du scrape (`callback()` -> {labels: valeur}), gauge ou counter"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], callback: Callable[[], Dict[tuple, float]],
+                 kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collected(self, name: str, help: str, labelnames: Sequence[str],
+                  callback: Callable[[], Dict[tuple, float]], kind: str = "gauge") -> Collected:
+        return self.register(Collected(name, help, labelnames, callback, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                print(f"⚠️ Métrique {metric.name} indisponible: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ============ INSTRUMENTS DU SERVICE ============
+
+TEMPLATE_RENDERS = registry.counter(
+    "notification_template_renders_total", "Rendus de templates, servis par le LRU ou non", ("template", "cache")
+)
+RENDER_SECONDS = registry.histogram(
+    "notification_render_seconds", "Durée du rendu HTML + texte d'une notification", ("type",)
+)
+MIME_SECONDS = registry.histogram(
+    "notification_mime_build_seconds", "Durée de construction du message MIME", ()
+)
+SMTP_HANDSHAKE_SECONDS = registry.histogram(
+    "notification_smtp_handshake_seconds", "Durée d'ouverture d'une connexion SMTP par étape", ("stage",)
+)
+SMTP_TRANSMIT_SECONDS = registry.histogram(
+    "notification_smtp_transmit_seconds", "Durée de l'échange MAIL/RCPT/DATA d'un message", ()
+)
+SEND_SECONDS = registry.histogram(
+    "notification_send_seconds", "Durée totale d'un envoi (rendu, MIME, SMTP)", ("type",)
+)
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "notification_queue_wait_seconds", "Temps passé en file avant l'envoi", ("type",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+SENT = registry.counter("notification_sent_total", "Notifications envoyées", ("type",))
+FAILURES = registry.counter(
+    "notification_failures_total", "Échecs d'envoi par type de notification et d'exception", ("type", "exception")
+)
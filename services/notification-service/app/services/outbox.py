@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outbox ("
+    " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+    " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+    " next_attempt_at REAL NOT NULL, last_error TEXT,"
+    " created_at REAL NOT NULL, updated_at REAL NOT NULL, idempotency_key TEXT)",
+    "CREATE INDEX IF NOT EXISTS outbox_status ON outbox(status, updated_at)",
+    "CREATE TABLE IF NOT EXISTS dead_letters ("
+    " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+    " attempts INTEGER NOT NULL, last_error TEXT,"
+    " created_at REAL NOT NULL, failed_at REAL NOT NULL)",
+)
+
+
+class OutboxRecord:
+    """Ligne en attente de l'outbox, rechargée au démarrage"""
+
+    __slots__ = ("id", "kind", "payload", "attempts", "next_attempt_at", "created_at", "idempotency_key")
+
+    def __init__(self, id: str, kind: str, payload: dict, attempts: int, next_attempt_at: float, created_at: float,
+                 idempotency_key: Optional[str] = None):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.next_attempt_at = next_attempt_at
+        self.created_at = created_at
+        self.idempotency_key = idempotency_key
+
+
+class Outbox:
+    """Journal durable des notifications (SQLite en WAL).
+
+    Toutes les écritures passent par une seule tâche qui regroupe les
+    opérations arrivées pendant la transaction précédente et les valide
+    en un seul COMMIT (group commit): un fsync pour tout le lot au lieu
+    d'un par notification. Une notification n'est acquittée qu'une fois
+    son lot validé sur disque.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.OUTBOX_PATH,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        sent_retention: float = settings.OUTBOX_SENT_RETENTION,
+        synchronous: str = settings.OUTBOX_SYNCHRONOUS,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.sent_retention = sent_retention
+        self.synchronous = synchronous
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ops: List[Tuple[tuple, asyncio.Future]] = []
+        self._inflight: List[Tuple[tuple, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._commits_since_cleanup = 0
+        self.commits = 0
+        self.writes = 0
+        self.batch_failures = 0
+
+    # ============ CYCLE DE VIE ============
+
+    async def open(self):
+        # Un seul thread possède la connexion: lectures et écritures sont sérialisées
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        await self._run(self._open)
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        # Bases créées avant l'ajout des clés d'idempotence
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "idempotency_key" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN idempotency_key TEXT")
+
+    async def close(self):
+        """Valide les écritures en attente puis ferme la base"""
+        if self._writer is not None:
+            await asyncio.gather(*(future for _, future in self._inflight + self._ops), return_exceptions=True)
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        if self._executor is not None:
+            await self._run(self._conn.close)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ============ ÉCRITURES (GROUP COMMIT) ============
+
+    def _submit(self, op: tuple) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._ops.append((op, future))
+        self._wakeup.set()
+        return future
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._ops:
+                batch, self._ops = self._ops[:self.batch_size], self._ops[self.batch_size:]
+                self._inflight = batch
+                try:
+                    await self._run(self._apply, [op for op, _ in batch])
+                except Exception as e:
+                    if len(batch) == 1:
+                        self._settle(batch[0][1], e)
+                    else:
+                        # Lot annulé (ROLLBACK): chaque écriture est rejouée seule,
+                        # seule l'écriture fautive reçoit l'exception
+                        self.batch_failures += 1
+                        for op, future in batch:
+                            try:
+                                await self._run(self._apply, [op])
+                            except Exception as op_error:
+                                self._settle(future, op_error)
+                            else:
+                                self._settle(future)
+                    continue
+                finally:
+                    self._inflight = []
+                for _, future in batch:
+                    self._settle(future)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, error: Optional[BaseException] = None):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def _apply(self, ops: List[tuple]):
+        now = time.time()
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for op in ops:
+                action = op[0]
+                if action == "insert":
+                    _, job_id, kind, payload, created_at, idempotency_key = op
+                    conn.execute(
+                        "INSERT INTO outbox (id, kind, payload, status, attempts, next_attempt_at, created_at, updated_at,"
+                        " idempotency_key) VALUES (?, ?, ?, 'pending', 0, ?, ?, ?, ?)",
+                        (job_id, kind, payload, created_at, created_at, now, idempotency_key),
+                    )
+                elif action == "sent":
+                    _, job_id, attempts = op
+                    conn.execute(
+                        "UPDATE outbox SET status = 'sent', attempts = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                        (attempts, now, job_id),
+                    )
+                elif action == "retry":
+                    _, job_id, attempts, next_attempt_at, error = op
+                    conn.execute(
+                        "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                        (attempts, next_attempt_at, error, now, job_id),
+                    )
+                elif action == "dead":
+                    _, job_id, attempts, error = op
+                    conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters (id, kind, payload, attempts, last_error, created_at, failed_at)"
+                        " SELECT id, kind, payload, ?, ?, created_at, ? FROM outbox WHERE id = ?",
+                        (attempts, error, now, job_id),
+                    )
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.commits += 1
+        self.writes += len(ops)
+        # Purge périodique des notifications envoyées depuis longtemps
+        self._commits_since_cleanup += 1
+        if self._commits_since_cleanup >= 1000:
+            self._commits_since_cleanup = 0
+            conn.execute("DELETE FROM outbox WHERE status = 'sent' AND updated_at < ?", (now - self.sent_retention,))
+
+    async def add(self, job_id: str, kind: str, payload: dict, created_at: float, idempotency_key: Optional[str] = None):
+        """Écrit une notification sur disque (retourne une fois le lot validé)"""
+        await self._submit(
+            ("insert", job_id, kind, json.dumps(payload, separators=(",", ":")), created_at, idempotency_key)
+        )
+
+    async def mark_sent(self, job_id: str, attempts: int):
+        await self._submit(("sent", job_id, attempts))
+
+    async def mark_retry(self, job_id: str, attempts: int, next_attempt_at: float, error: str):
+        await self._submit(("retry", job_id, attempts, next_attempt_at, error))
+
+    async def mark_dead(self, job_id: str, attempts: int, error: str):
+        """Déplace la notification vers la table dead_letters"""
+        await self._submit(("dead", job_id, attempts, error))
+
+    # ============ LECTURES ============
+
+    def _pending(self) -> List[OutboxRecord]:
+        rows = self._conn.execute(
+            "SELECT id, kind, payload, attempts, next_attempt_at, created_at, idempotency_key FROM outbox"
+            " WHERE status = 'pending' ORDER BY created_at"
+        ).fetchall()
+        return [OutboxRecord(r[0], r[1], json.loads(r[2]), r[3], r[4], r[5], r[6]) for r in rows]
+
+    async def pending(self) -> List[OutboxRecord]:
+        """Notifications non envoyées (rejouées au démarrage)"""
+        return await self._run(self._pending)
+
+    def _recent_keys(self, since: float) -> List[Tuple[str, str, float]]:
+        return self._conn.execute(
+            "SELECT idempotency_key, id, created_at FROM outbox"
+            " WHERE idempotency_key IS NOT NULL AND created_at >= ? ORDER BY created_at", (since,)
+        ).fetchall()
+
+    async def recent_keys(self, since: float) -> List[Tuple[str, str, float]]:
+        """Clés d'idempotence des notifications reçues depuis `since`: (clé, id, created_at)"""
+        return await self._run(self._recent_keys, since)
+
+    def _find(self, job_id: str) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT kind, status, attempts, last_error, created_at, updated_at FROM outbox WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is not None:
+            kind, status, attempts, error, created_at, updated_at = row
+            if status == "pending":
+                status = "retrying" if attempts else "queued"
+            finished_at = updated_at if status == "sent" else None
+            return {"job_id": job_id, "type": kind, "status": status, "attempts": attempts,
+                    "error": error, "created_at": created_at, "finished_at": finished_at}
+        row = self._conn.execute(
+            "SELECT kind, attempts, last_error, created_at, failed_at FROM dead_letters WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is not None:
+            kind, attempts, error, created_at, failed_at = row
+            return {"job_id": job_id, "type": kind, "status": "failed", "attempts": attempts,
+                    "error": error, "created_at": created_at, "finished_at": failed_at}
+        return None
+
+    async def find(self, job_id: str) -> Optional[dict]:
+        return await self._run(self._find, job_id)
+
+    def _counts(self) -> dict:
+        counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        counts["dead"] = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return counts
+
+    async def stats(self) -> dict:
+        counts = await self._run(self._counts)
+        return {
+            "path": self.path,
+            "pending": counts.get("pending", 0),
+            "sent": counts.get("sent", 0),
+            "dead_letters": counts["dead"],
+            "commits": self.commits,
+            "writes": self.writes,
+            "writes_per_commit": round(self.writes / self.commits, 2) if self.commits else 0.0,
+            "batch_failures": self.batch_failures,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+class TokenBucket:
+    """Seau de jetons: `rate` envois par seconde en régime établi, `burst` d'un coup"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Secondes à attendre avant qu'un jeton soit disponible (0 = tout de suite)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+def parse_overrides(value: str) -> Dict[str, Tuple[float, int]]:
+    """"gmail.com=2:10,outlook.com=1" -> {"gmail.com": (2.0, 10), "outlook.com": (1.0, 1)}"""
+    overrides = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        domain, _, limit = item.partition("=")
+        rate, _, burst = limit.partition(":")
+        overrides[domain.strip().lower()] = (float(rate), int(burst or 1))
+    return overrides
+
+
+class RateLimiter:
+    """Token buckets par compte SMTP, par domaine et par destinataire.
+
+    Un envoi consomme un jeton dans chacun des trois seaux; il attend tant
+    que l'un d'eux est vide. Les seaux de domaine et de destinataire sont
+    créés à la demande et oubliés une fois pleins quand il y en a trop.
+    """
+
+    def __init__(
+        self,
+        account: str = settings.SMTP_USER or settings.SMTP_FROM_EMAIL,
+        account_rate: float = settings.SMTP_ACCOUNT_RATE,
+        account_burst: int = settings.SMTP_ACCOUNT_BURST,
+        domain_rate: float = settings.DOMAIN_RATE,
+        domain_burst: int = settings.DOMAIN_BURST,
+        domain_overrides: Optional[Dict[str, Tuple[float, int]]] = None,
+        recipient_rate: float = settings.RECIPIENT_RATE,
+        recipient_burst: int = settings.RECIPIENT_BURST,
+        max_buckets: int = 10000,
+    ):
+        self.account = account
+        self.accounts = {account: TokenBucket(account_rate, account_burst)}
+        self.domain_limit = (domain_rate, domain_burst)
+        self.domain_overrides = (
+            domain_overrides if domain_overrides is not None else parse_overrides(settings.DOMAIN_RATE_OVERRIDES)
+        )
+        self.recipient_limit = (recipient_rate, recipient_burst)
+        self.max_buckets = max_buckets
+        self.domains: Dict[str, TokenBucket] = {}
+        self.recipients: Dict[str, TokenBucket] = {}
+        self.throttled = 0
+
+    def _bucket(self, buckets: Dict[str, TokenBucket], key: str, limit: Tuple[float, int], now: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= self.max_buckets:
+                for stale in [k for k, b in buckets.items() if b.is_full(now)]:
+                    del buckets[stale]
+            bucket = buckets[key] = TokenBucket(*limit)
+        return bucket
+
+    def buckets_for(self, recipient: str, now: float) -> List[TokenBucket]:
+        recipient = recipient.lower()
+        domain = recipient.rpartition("@")[2]
+        return [
+            self.accounts[self.account],
+            self._bucket(self.domains, domain, self.domain_overrides.get(domain, self.domain_limit), now),
+            self._bucket(self.recipients, recipient, self.recipient_limit, now),
+        ]
+
+    async def acquire(self, recipient: str):
+        """Attend puis consomme un jeton dans les trois seaux (envois hors FairScheduler)"""
+        while True:
+            now = time.monotonic()
+            buckets = self.buckets_for(recipient, now)
+            delay = max(bucket.delay(now) for bucket in buckets)
+            if delay == 0:
+                for bucket in buckets:
+                    bucket.consume(now)
+                return
+            self.throttled += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        account = self.accounts[self.account]
+        account.delay(now)
+        return {
+            "account": self.account,
+            "account_tokens": round(account.tokens, 2),
+            "domains": len(self.domains),
+            "recipients": len(self.recipients),
+            "throttled": self.throttled,
+        }
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Optional, Tuple
+
+from app.services.metrics import QUEUE_WAIT_SECONDS
+from app.services.rate_limit import RateLimiter
+
+
+class FairScheduler:
+    """File d'envoi équitable et limitée en débit.
+
+    Une sous-file par type de notification, servies à tour de rôle: une
+    rafale d'annulations ne retarde pas les emails de bienvenue. Chaque
+    envoi attend ses jetons (compte SMTP, domaine, destinataire); si le
+    domaine du premier job d'une sous-file est saturé, le suivant passe,
+    dans la limite de `scan_limit` jobs examinés par sous-file.
+
+    Interface proche d'asyncio.Queue (put, get, task_done, join, qsize)
+    pour les workers de SendQueue.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, scan_limit: int = 64, wait_samples: int = 1000):
+        self.limiter = limiter or RateLimiter()
+        self.scan_limit = scan_limit
+        self._queues: Dict[str, Deque] = {}
+        self._order: Deque[str] = deque()
+        self._ready = asyncio.Event()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        # Temps passé en file (secondes) par les derniers jobs distribués
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self.dispatched = 0
+        self.max_wait = 0.0
+
+    def put(self, job):
+        queue = self._queues.get(job.kind)
+        if queue is None:
+            queue = self._queues[job.kind] = deque()
+            self._order.append(job.kind)
+        job.ready_at = time.monotonic()
+        queue.append(job)
+        self._unfinished += 1
+        self._finished.clear()
+        self._ready.set()
+
+    def _next(self, now: float) -> Tuple[Optional[object], Optional[float]]:
+        """Prochain job envoyable, sinon le délai avant qu'un jeton se libère"""
+        wait = None
+        for _ in range(len(self._order)):
+            kind = self._order[0]
+            # Le type servi passe en fin de tour
+            self._order.rotate(-1)
+            queue = self._queues[kind]
+            for index, job in enumerate(islice(queue, self.scan_limit)):
+                buckets = self.limiter.buckets_for(job.recipient, now)
+                delay = max(bucket.delay(now) for bucket in buckets)
+                if delay == 0:
+                    for bucket in buckets:
+                        bucket.consume(now)
+                    del queue[index]
+                    return job, None
+                wait = delay if wait is None else min(wait, delay)
+                if buckets[0].delay(now) > 0:
+                    # Compte SMTP saturé: aucun autre job ne peut partir
+                    return None, wait
+        return None, wait
+
+    async def get(self):
+        while True:
+            now = time.monotonic()
+            job, wait = self._next(now)
+            if job is not None:
+                waited = now - job.ready_at
+                self._waits.append(waited)
+                QUEUE_WAIT_SECONDS.observe(waited, job.kind)
+                self.max_wait = max(self.max_wait, waited)
+                self.dispatched += 1
+                return job
+            if wait is not None:
+                self.limiter.throttled += 1
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+    def depth_by_type(self) -> Dict[str, int]:
+        return {kind: len(queue) for kind, queue in self._queues.items()}
+
+    def qsize(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "depth": self.qsize(),
+            "depth_by_type": self.depth_by_type(),
+            "dispatched": self.dispatched,
+            "wait_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(self.max_wait * 1000, 1),
+                "samples": len(waits),
+            },
+            "rate_limit": self.limiter.stats(),
+        }
@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Awaitable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.services.email_service import recipient_of, send_bulk, send_notification
+from app.services.outbox import Outbox
+from app.services.rate_limit import RateLimiter
+from app.services.scheduler import FairScheduler
+
+
+class QueueFullError(Exception):
+    """La file d'envoi est pleine: le client doit réessayer plus tard"""
+
+
+class Job:
+    """Notification en attente d'envoi et son statut"""
+
+    __slots__ = ("id", "kind", "payload", "recipient", "idempotency_key", "status", "attempts", "error",
+                 "created_at", "finished_at", "ready_at")
+
+    def __init__(self, kind: str, payload: dict, id: Optional[str] = None, attempts: int = 0,
+                 created_at: Optional[float] = None, idempotency_key: Optional[str] = None):
+        self.id = id or uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.recipient = recipient_of(kind, payload)
+        self.idempotency_key = idempotency_key
+        self.status = "queued"  # queued | sending | retrying | sent | failed
+        self.attempts = attempts
+        self.error: Optional[str] = None
+        self.created_at = created_at or time.time()
+        self.finished_at: Optional[float] = None
+        # Dernière mise en file (time.monotonic), pour mesurer l'attente
+        self.ready_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "type": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class Submission(NamedTuple):
+    job_id: str
+    status: str
+    duplicate: bool
+
+
+def idempotency_key(kind: str, payload: dict, key: Optional[str] = None) -> str:
+    """Clé fournie par le client (en-tête Idempotency-Key) ou empreinte du contenu"""
+    if key is None:
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+    return f"{kind}:{key}"
+
+
+def retry_delay(attempts: int, base_delay: float, max_delay: float) -> float:
+    """Backoff exponentiel avec jitter (±20 %) après `attempts` échecs"""
+    delay = min(max_delay, base_delay * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class SendQueue:
+    """File d'envoi adossée à l'outbox durable, vidée par N workers.
+
+    Une notification est écrite dans l'outbox avant la réponse 202: un
+    redémarrage ou une panne SMTP ne la perd plus. Les échecs sont réessayés
+    avec backoff exponentiel; après `max_attempts` tentatives la notification
+    part dans la table dead_letters. Au démarrage, les notifications non
+    envoyées sont rejouées. À l'arrêt, la file est vidée dans la limite de
+    `drain_timeout` secondes; ce qui reste sera rejoué au prochain démarrage.
+
+    Les workers puisent dans un FairScheduler (tour de rôle entre types,
+    token buckets par compte, domaine et destinataire). Une notification
+    déjà reçue avec la même clé d'idempotence dans les `idempotency_window`
+    dernières secondes n'est pas renvoyée: la réponse pointe vers le job
+    existant. Une notification abandonnée (dead letter) libère sa clé.
+    """
+
+    def __init__(
+        self,
+        outbox: Optional[Outbox] = None,
+        maxsize: int = settings.NOTIFICATION_QUEUE_SIZE,
+        workers: int = settings.NOTIFICATION_WORKERS,
+        drain_timeout: float = settings.NOTIFICATION_DRAIN_TIMEOUT,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+        retry_base_delay: float = settings.OUTBOX_RETRY_BASE_DELAY,
+        retry_max_delay: float = settings.OUTBOX_RETRY_MAX_DELAY,
+        idempotency_window: float = settings.IDEMPOTENCY_WINDOW,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        self.outbox = outbox or Outbox()
+        self.limiter = limiter or RateLimiter()
+        self.idempotency_window = idempotency_window
+        self.maxsize = maxsize
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._queue: Optional[FairScheduler] = None
+        # Notifications ni envoyées ni abandonnées (en file, en cours, en attente de réessai)
+        self._active: Dict[str, Job] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # Clé d'idempotence -> (job, reçu le), par ordre d'arrivée
+        self._recent: Dict[str, Tuple[str, float]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+        self._sending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.replayed = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    async def start(self):
+        """Ouvre l'outbox, rejoue les notifications en attente et démarre les workers"""
+        await self.outbox.open()
+        self._queue = FairScheduler(self.limiter)
+        now = time.time()
+        for key, job_id, created_at in await self.outbox.recent_keys(now - self.idempotency_window):
+            self._recent[key] = (job_id, created_at)
+        for record in await self.outbox.pending():
+            job = Job(record.kind, record.payload, record.id, record.attempts, record.created_at,
+                      record.idempotency_key)
+            self._active[job.id] = job
+            self._schedule(job, record.next_attempt_at - now)
+            self.replayed += 1
+        if self.replayed:
+            print(f"🔁 {self.replayed} notifications rejouées depuis l'outbox")
+        self._accepting = True
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Refuse les nouveaux jobs, vide la file puis arrête les workers et l'outbox"""
+        self._accepting = False
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        if self._queue is not None:
+            if self._queue.qsize():
+                print(f"⏳ Envoi des {self._queue.qsize()} notifications en attente...")
+            # join() attend aussi les envois déjà commencés par les workers
+            try:
+                await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._active:
+            print(f"💾 {len(self._active)} notifications conservées dans l'outbox pour le prochain démarrage")
+        self._active.clear()
+        await self.outbox.close()
+
+    async def submit(self, kind: str, payload: dict, key: Optional[str] = None) -> Submission:
+        """Écrit la notification dans l'outbox puis la met en file.
+
+        Un doublon (même clé d'idempotence dans la fenêtre) n'est pas remis
+        en file. Lève QueueFullError si trop de notifications sont en attente.
+        """
+        if not self._accepting:
+            raise QueueFullError("Service en cours d'arrêt")
+        key = idempotency_key(kind, payload, key)
+        self._forget_expired_keys()
+        seen = self._recent.get(key)
+        if seen is not None:
+            self.duplicates += 1
+            job = self._active.get(seen[0])
+            return Submission(seen[0], job.status if job is not None else "sent", True)
+        if len(self._active) >= self.maxsize:
+            self.rejected += 1
+            raise QueueFullError("File d'envoi pleine")
+        job = Job(kind, payload, idempotency_key=key)
+        self._active[job.id] = job
+        self._recent[key] = (job.id, job.created_at)
+        try:
+            await self.outbox.add(job.id, kind, payload, job.created_at, key)
+        except BaseException:
+            del self._active[job.id]
+            self._recent.pop(key, None)
+            raise
+        self.submitted += 1
+        self._queue.put(job)
+        return Submission(job.id, job.status, False)
+
+    async def send_batch(self, jobs: List[Tuple[str, dict]], key: Optional[str] = None) -> List[dict]:
+        """Envoie un lot tout de suite (POST /bulk), sous les mêmes garanties que la file.
+
+        - idempotence: chaque notification a sa clé (empreinte du contenu, ou
+          "Idempotency-Key:index"); un doublon n'est pas renvoyé
+        - outbox: le lot est écrit avant l'envoi; un échec repart en réessai
+          (backoff, FairScheduler) comme un job de la file, jusqu'à max_attempts
+        - débit: chaque message attend ses jetons (compte, domaine, destinataire)
+          dans le RateLimiter partagé avec les workers
+        """
+        if not self._accepting:
+            raise QueueFullError("Service en cours d'arrêt")
+        self._forget_expired_keys()
+        results: List[Optional[dict]] = [None] * len(jobs)
+        fresh: List[Tuple[int, Job]] = []
+        # Doublons à l'intérieur du lot: même résultat que la première occurrence
+        repeated: List[Tuple[int, int]] = []
+        first_index: Dict[str, int] = {}
+        for index, (kind, payload) in enumerate(jobs):
+            job_key = idempotency_key(kind, payload, f"{key}:{index}" if key is not None else None)
+            if job_key in first_index:
+                self.duplicates += 1
+                repeated.append((index, first_index[job_key]))
+                continue
+            seen = self._recent.get(job_key)
+            if seen is not None:
+                self.duplicates += 1
+                job = self._active.get(seen[0])
+                status = job.status if job is not None else "sent"
+                results[index] = {"index": index, "recipient": recipient_of(kind, payload), "success": status == "sent",
+                                  "error": None, "job_id": seen[0], "duplicate": True, "status": status}
+                continue
+            job = Job(kind, payload, idempotency_key=job_key)
+            self._recent[job_key] = (job.id, job.created_at)
+            first_index[job_key] = index
+            fresh.append((index, job))
+
+        written = await asyncio.gather(
+            *(self.outbox.add(job.id, job.kind, job.payload, job.created_at, job.idempotency_key) for _, job in fresh),
+            return_exceptions=True,
+        )
+        batch: List[Tuple[int, Job]] = []
+        for (index, job), error in zip(fresh, written):
+            if isinstance(error, BaseException):
+                self._recent.pop(job.idempotency_key, None)
+                results[index] = {"index": index, "recipient": job.recipient, "success": False,
+                                  "error": f"Outbox: {error}", "job_id": None, "duplicate": False, "status": "failed"}
+            else:
+                batch.append((index, job))
+        self.submitted += len(batch)
+
+        async def acquire(message):
+            await self.limiter.acquire(message.recipients[0])
+
+        sent: List[dict] = []
+        if batch:
+            self._sending += len(batch)
+            try:
+                sent = await send_bulk([(job.kind, job.payload) for _, job in batch], before_send=acquire)
+            finally:
+                self._sending -= len(batch)
+
+        updates = []
+        for (index, job), result in zip(batch, sent):
+            job.attempts = 1
+            if result["success"]:
+                job.status, job.finished_at = "sent", time.time()
+                updates.append(self.outbox.mark_sent(job.id, job.attempts))
+                self.sent += 1
+            else:
+                updates.append(self._fail(job, result["error"]))
+            results[index] = {**result, "index": index, "job_id": job.id, "duplicate": False, "status": job.status}
+        # Outbox non mise à jour: la ligne reste "pending" et sera rejouée au démarrage
+        for error in await asyncio.gather(*updates, return_exceptions=True):
+            if isinstance(error, BaseException):
+                print(f"❌ Erreur outbox après envoi groupé: {error}")
+        for index, original in repeated:
+            results[index] = {**results[original], "index": index, "duplicate": True}
+        return results
+
+    def _forget_expired_keys(self):
+        expired_before = time.time() - self.idempotency_window
+        while self._recent:
+            key, (_, received_at) = next(iter(self._recent.items()))
+            if received_at >= expired_before:
+                break
+            del self._recent[key]
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Statut d'un job: en mémoire s'il est actif, sinon depuis l'outbox"""
+        job = self._active.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return await self.outbox.find(job_id)
+
+    def _schedule(self, job: Job, delay: float):
+        if delay <= 0:
+            self._queue.put(job)
+        else:
+            self._timers[job.id] = asyncio.get_running_loop().call_later(delay, self._requeue, job)
+
+    def _requeue(self, job: Job):
+        self._timers.pop(job.id, None)
+        self._queue.put(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                # L'outbox n'a pas pu être mise à jour: la ligne reste en attente et sera rejouée au démarrage
+                print(f"❌ Erreur outbox pour le job {job.id}: {e}")
+                if job.status == "sending":
+                    job.status, job.error, job.finished_at = "failed", f"{type(e).__name__}: {e}", time.time()
+                    self._active.pop(job.id, None)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: Job):
+        job.status = "sending"
+        self._sending += 1
+        try:
+            await send_notification(job.kind, job.payload)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self._sending -= 1
+        job.attempts += 1
+
+        # L'état en mémoire suit l'envoi réel, avant l'écriture dans l'outbox
+        if error is None:
+            job.status, job.error, job.finished_at = "sent", None, time.time()
+            self._active.pop(job.id, None)
+            self.sent += 1
+            await self.outbox.mark_sent(job.id, job.attempts)
+        else:
+            await self._fail(job, error)
+
+    def _fail(self, job: Job, error: str) -> Awaitable[None]:
+        """Tentative échouée: réessai planifié, ou abandon après max_attempts.
+
+        L'état en mémoire est mis à jour tout de suite; retourne l'écriture
+        outbox correspondante, à attendre.
+        """
+        if job.attempts >= self.max_attempts:
+            job.status, job.error, job.finished_at = "failed", error, time.time()
+            self._active.pop(job.id, None)
+            # Un nouvel envoi de la même notification sera accepté
+            if job.idempotency_key is not None:
+                self._recent.pop(job.idempotency_key, None)
+            self.dead += 1
+            print(f"❌ Notification {job.id} abandonnée après {job.attempts} tentatives: {error}")
+            return self.outbox.mark_dead(job.id, job.attempts, error)
+        delay = retry_delay(job.attempts, self.retry_base_delay, self.retry_max_delay)
+        job.status, job.error = "retrying", error
+        self._active[job.id] = job
+        self.retried += 1
+        print(f"⚠️ Notification {job.id}: tentative {job.attempts} échouée ({error}), nouvel essai dans {delay:.1f}s")
+        if self._accepting:
+            self._schedule(job, delay)
+        return self.outbox.mark_retry(job.id, job.attempts, time.time() + delay, error)
+
+    def depth_by_type(self) -> Dict[str, int]:
+        return self._queue.depth_by_type() if self._queue is not None else {}
+
+    def counts(self) -> Dict[str, int]:
+        """Compteurs instantanés, lus sans accès à l'outbox (jauges /metrics)"""
+        return {
+            "active": len(self._active),
+            "sending": self._sending,
+            "scheduled_retries": len(self._timers),
+            "dead_letters": self.dead,
+        }
+
+    async def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "scheduler": self._queue.stats() if self._queue is not None else None,
+            "sending": self._sending,
+            "active": len(self._active),
+            "scheduled_retries": len(self._timers),
+            "maxsize": self.maxsize,
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "idempotency_keys": len(self._recent),
+            "replayed": self.replayed,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead_letters": self.dead,
+            "outbox": await self.outbox.stats() if self._accepting else None,
+        }
+
+
+# File partagée, démarrée et vidée par le lifespan de l'application
+send_queue = SendQueue()
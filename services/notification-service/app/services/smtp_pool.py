@@ -0,0 +1,312 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import Awaitable, Callable, List, Optional, Sequence, Union
+
+import aiosmtplib
+
+from app.config import settings
+from app.services.metrics import SMTP_HANDSHAKE_SECONDS, SMTP_TRANSMIT_SECONDS
+
+# Erreurs qui rendent une connexion inutilisable (à fermer puis recréer)
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    asyncio.TimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+# Remplacements de session tolérés par send_many avant d'abandonner les messages restants
+MAX_SESSION_RECONNECTS = 3
+
+
+class RawMessage:
+    """Message déjà sérialisé et son enveloppe SMTP: envoyé tel quel, sans
+    repasser par email.generator à chaque envoi"""
+
+    __slots__ = ("sender", "recipients", "data")
+
+    def __init__(self, sender: str, recipients: Sequence[str], data: bytes):
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.data = data
+
+
+OutgoingMessage = Union[Message, RawMessage]
+
+
+async def transmit(smtp: aiosmtplib.SMTP, message: OutgoingMessage):
+    with SMTP_TRANSMIT_SECONDS.time():
+        if isinstance(message, RawMessage):
+            return await smtp.sendmail(message.sender, message.recipients, message.data)
+        return await smtp.send_message(message)
+
+
+class PooledConnection:
+    """Connexion SMTP authentifiée et son historique d'utilisation"""
+
+    __slots__ = ("smtp", "created_at", "last_used", "messages")
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages = 0
+
+
+class SMTPPool:
+    """Pool de connexions SMTP persistantes (TCP + STARTTLS + AUTH une seule fois).
+
+    Au plus `size` connexions ouvertes simultanément. Une connexion restée
+    inactive plus de `healthcheck_after` secondes est vérifiée par NOOP avant
+    d'être réutilisée; au-delà de `max_idle` secondes ou de `max_messages`
+    envois elle est fermée et remplacée (les fournisseurs coupent d'eux-mêmes
+    les sessions trop longues).
+    """
+
+    def __init__(
+        self,
+        hostname: str = settings.SMTP_HOST,
+        port: int = settings.SMTP_PORT,
+        username: str = settings.SMTP_USER,
+        password: str = settings.SMTP_PASSWORD,
+        start_tls: bool = settings.SMTP_START_TLS,
+        timeout: float = settings.SMTP_TIMEOUT,
+        size: int = settings.SMTP_POOL_SIZE,
+        healthcheck_after: float = settings.SMTP_POOL_HEALTHCHECK_AFTER,
+        max_idle: float = settings.SMTP_POOL_MAX_IDLE,
+        max_messages: int = settings.SMTP_POOL_MAX_MESSAGES,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.size = size
+        self.healthcheck_after = healthcheck_after
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self._idle: "deque[PooledConnection]" = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_use = 0
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.noops = 0
+        self.reconnects = 0
+        self.discarded = 0
+        self.sent = 0
+        self.failures = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    async def start(self):
+        """Ouvre le pool (les connexions sont établies à la première utilisation)"""
+        self._closed = False
+        self._semaphore()
+
+    async def close(self):
+        """Ferme proprement (QUIT) toutes les connexions inactives"""
+        self._closed = True
+        while self._idle:
+            await self._quit(self._idle.popleft())
+
+    async def _connect(self) -> PooledConnection:
+        # STARTTLS et AUTH sont faits séparément pour chronométrer chaque étape
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=False,
+            timeout=self.timeout,
+        )
+        with SMTP_HANDSHAKE_SECONDS.time("connect"):
+            await smtp.connect()
+        try:
+            if self.start_tls:
+                with SMTP_HANDSHAKE_SECONDS.time("starttls"):
+                    await smtp.starttls()
+            if self.username:
+                with SMTP_HANDSHAKE_SECONDS.time("auth"):
+                    await smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        self.created += 1
+        return PooledConnection(smtp)
+
+    async def _quit(self, conn: PooledConnection):
+        try:
+            await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    def _discard(self, conn: PooledConnection):
+        self.discarded += 1
+        conn.smtp.close()
+
+    async def _checkout(self) -> PooledConnection:
+        """Connexion inactive encore saine, sinon une nouvelle connexion"""
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            idle_for = now - conn.last_used
+            if not conn.smtp.is_connected or idle_for > self.max_idle or conn.messages >= self.max_messages:
+                await self._quit(conn)
+                continue
+            if idle_for > self.healthcheck_after:
+                self.noops += 1
+                try:
+                    await conn.smtp.noop()
+                except Exception:
+                    self._discard(conn)
+                    continue
+            self.reused += 1
+            return conn
+        return await self._connect()
+
+    def _checkin(self, conn: PooledConnection):
+        conn.last_used = time.monotonic()
+        if self._closed:
+            conn.smtp.close()
+        else:
+            self._idle.append(conn)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Emprunte une connexion; elle est rendue au pool, ou fermée si elle est cassée"""
+        async with self._semaphore():
+            conn = await self._checkout()
+            self._in_use += 1
+            try:
+                yield conn
+            except CONNECTION_ERRORS:
+                self._discard(conn)
+                raise
+            except aiosmtplib.SMTPException:
+                # Refus du serveur (destinataire invalide...): la session reste utilisable
+                try:
+                    await conn.smtp.rset()
+                except Exception:
+                    self._discard(conn)
+                    raise
+                self._checkin(conn)
+                raise
+            except BaseException:
+                self._discard(conn)
+                raise
+            else:
+                self._checkin(conn)
+            finally:
+                self._in_use -= 1
+
+    async def send(self, message: OutgoingMessage):
+        """Envoie un message sur une connexion du pool.
+
+        Si une connexion réutilisée a été coupée par le serveur, le message
+        est renvoyé une fois sur une connexion neuve.
+        """
+        try:
+            for attempt in range(2):
+                reused = False
+                try:
+                    async with self.connection() as conn:
+                        reused = conn.last_used > conn.created_at
+                        result = await transmit(conn.smtp, message)
+                        conn.messages += 1
+                    self.sent += 1
+                    return result
+                except CONNECTION_ERRORS:
+                    if attempt or not reused:
+                        raise
+                    self.reconnects += 1
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def send_many(self, messages: List[OutgoingMessage], sessions: int,
+                        before_send: Optional[Callable[[OutgoingMessage], Awaitable[None]]] = None) -> List[Optional[Exception]]:
+        """Envoie une liste de messages sur au plus `sessions` connexions gardées ouvertes.
+
+        Chaque session enchaîne les messages sans repasser par le pool.
+        Retourne, pour chaque message, None s'il est parti ou l'exception
+        rencontrée. Un message interrompu par une coupure de connexion est
+        renvoyé une fois sur une nouvelle session. `before_send` est attendu
+        avant chaque transmission (limites de débit).
+        """
+        errors: List[Optional[Exception]] = [None] * len(messages)
+        pending = deque(range(len(messages)))
+        attempts = [0] * len(messages)
+
+        def fail_pending(error: Exception):
+            while pending:
+                index = pending.popleft()
+                errors[index] = error
+                self.failures += 1
+
+        async def session():
+            reconnects = 0
+            while pending:
+                attempted = False
+                try:
+                    async with self.connection() as conn:
+                        while pending and conn.messages < self.max_messages:
+                            index = pending.popleft()
+                            attempts[index] += 1
+                            attempted = True
+                            try:
+                                if before_send is not None:
+                                    await before_send(messages[index])
+                                await transmit(conn.smtp, messages[index])
+                            except CONNECTION_ERRORS as e:
+                                if attempts[index] < 2:
+                                    pending.appendleft(index)
+                                else:
+                                    errors[index] = e
+                                    self.failures += 1
+                                raise
+                            except aiosmtplib.SMTPException as e:
+                                # Destinataire refusé...: la session reste utilisable
+                                errors[index] = e
+                                self.failures += 1
+                                await conn.smtp.rset()
+                                continue
+                            conn.messages += 1
+                            self.sent += 1
+                except (*CONNECTION_ERRORS, aiosmtplib.SMTPException) as e:
+                    # Session impossible à ouvrir (connexion, STARTTLS, AUTH refusés...) ou
+                    # remplacée trop souvent: les messages restants échouent
+                    if not attempted or reconnects >= MAX_SESSION_RECONNECTS:
+                        fail_pending(e)
+                        return
+                    # Coupure ou RSET refusé: la session est remplacée, les messages restants continuent
+                    reconnects += 1
+                    self.reconnects += 1
+
+        await asyncio.gather(*(session() for _ in range(max(1, min(sessions, self.size, len(messages))))))
+        return errors
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "created": self.created,
+            "reused": self.reused,
+            "noops": self.noops,
+            "reconnects": self.reconnects,
+            "discarded": self.discarded,
+            "sent": self.sent,
+            "failures": self.failures,
+        }
+
+
+# Pool partagé, ouvert et fermé par le lifespan de l'application
+smtp_pool = SMTPPool()
@@ -0,0 +1,200 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from app.config import settings
+from app.services.css_inline import Stylesheet, inline_css, open_elements
+from app.services.html_text import html_to_text
+from app.services.metrics import TEMPLATE_RENDERS
+
+# Configuration Jinja2 pour les templates
+template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+LAYOUT = "base.html"
+CONTENT_BLOCK = "content"
+EMAIL_TEMPLATES = (
+    "welcome.html",
+    "new_reservation.html",
+    "reservation_confirmed.html",
+    "reservation_rejected.html",
+    "reservation_cancelled.html",
+)
+
+# Marqueur remplacé par le bloc content lors du pré-rendu du layout
+_CONTENT_MARKER = "\x00content\x00"
+_BLOCK_TAG = f"{{% block {CONTENT_BLOCK} %}}"
+_BLOCK_RE = re.compile(r"\{%-?\s*block\s+" + CONTENT_BLOCK + r"\s*-?%\}(.*?)\{%-?\s*endblock\b[^%]*%\}", re.DOTALL)
+
+
+class InliningLoader(FileSystemLoader):
+    """Chargeur qui inline le <style> de base.html dans les sources des emails.
+
+    La transformation est faite une fois, quand Jinja charge la source: le
+    résultat est compilé et mis en cache (mémoire et bytecode) comme
+    n'importe quel template, l'envoi ne parse donc jamais de CSS. Les
+    éléments d'un template enfant sont inlinés comme s'ils étaient déjà
+    placés dans le bloc content du layout.
+    """
+
+    def __init__(self, searchpath: str, layout: str = LAYOUT, templates: Tuple[str, ...] = EMAIL_TEMPLATES):
+        super().__init__(searchpath)
+        self.layout = layout
+        self.templates = templates
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template == self.layout:
+            source = inline_css(source, Stylesheet.from_html(source))
+        elif template in self.templates:
+            layout, _, _ = super().get_source(environment, self.layout)
+            ancestors = open_elements(layout.split(_BLOCK_TAG)[0])
+            source = inline_css(source, Stylesheet.from_html(layout), ancestors)
+        return source, filename, uptodate
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Cache disque du bytecode compilé: accélère les démarrages à froid"""
+    if not settings.TEMPLATES_BYTECODE_CACHE_DIR:
+        return None
+    os.makedirs(settings.TEMPLATES_BYTECODE_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(settings.TEMPLATES_BYTECODE_CACHE_DIR)
+
+
+env = Environment(
+    loader=InliningLoader(template_dir) if settings.TEMPLATES_INLINE_CSS else FileSystemLoader(template_dir),
+    auto_reload=settings.TEMPLATES_AUTO_RELOAD,
+    bytecode_cache=_bytecode_cache(),
+)
+
+
+class TemplateRenderer:
+    """Rendu des emails avec le layout pré-rendu.
+
+    Les parties de base.html qui ne dépendent d'aucune donnée du
+    destinataire (en-tête, <style>, pied de page) sont rendues une seule
+    fois au chargement; à chaque envoi seul le bloc `content` du template
+    est exécuté puis entouré des deux moitiés du layout. Avec
+    `auto_reload` (développement), les templates sont rendus normalement
+    pour que les modifications soient prises en compte.
+
+    Les rendus sont mémorisés dans un LRU borné (`cache_size` entrées):
+    un même email rendu à nouveau (réessai, doublon) ne repasse pas par
+    Jinja. Les contextes non hachables ne sont pas mémorisés.
+
+    La partie texte brut est un second template compilé au chargement:
+    le layout et le bloc content sont convertis en texte une fois, balises
+    Jinja comprises, et chaque envoi ne fait que substituer les variables.
+    """
+
+    def __init__(self, environment: Environment = env, static_vars: Optional[dict] = None,
+                 cache_size: int = settings.TEMPLATES_RENDER_CACHE_SIZE):
+        self.env = environment
+        self.static_vars = static_vars if static_vars is not None else {"frontend_url": settings.FRONTEND_URL}
+        self.cache_size = cache_size
+        self.text_env = environment.overlay(trim_blocks=True, lstrip_blocks=True)
+        self._templates: Dict[str, Template] = {}
+        self._text_templates: Dict[str, Template] = {}
+        self._layout: Optional[Tuple[str, str]] = None
+        self._rendered: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Compile tous les templates et pré-rend le layout (appelé au démarrage)"""
+        for name in (LAYOUT,) + EMAIL_TEMPLATES:
+            self._templates[name] = self.env.get_template(name)
+        skeleton = self.env.from_string(
+            f'{{% extends "{LAYOUT}" %}}{{% block {CONTENT_BLOCK} %}}{_CONTENT_MARKER}{{% endblock %}}'
+        )
+        head, tail = skeleton.render(**self.static_vars).split(_CONTENT_MARKER)
+        self._layout = (head, tail)
+        for name in (LAYOUT,) + EMAIL_TEMPLATES:
+            self._text_templates[name] = self._compile_text(name)
+
+    def get_template(self, name: str) -> Template:
+        template = self._templates.get(name)
+        if template is None or self.env.auto_reload:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def _compile_text(self, name: str) -> Template:
+        """Version texte d'un email: bloc content placé dans le layout puis converti"""
+        layout = self.env.loader.get_source(self.env, LAYOUT)[0]
+        body = ""
+        if name != LAYOUT:
+            body = _BLOCK_RE.search(self.env.loader.get_source(self.env, name)[0]).group(1)
+        return self.text_env.from_string(html_to_text(_BLOCK_RE.sub(lambda _: body, layout, count=1)))
+
+    def render(self, name: str, **context) -> str:
+        """Rend un template d'email (layout compris), depuis le LRU si possible"""
+        return self._memoized(name, "html", context, self._render)
+
+    def render_text(self, name: str, **context) -> str:
+        """Rend la partie texte brut d'un email, depuis le LRU si possible"""
+        return self._memoized(name, "text", context, self._render_text)
+
+    def render_email(self, name: str, **context) -> Tuple[str, str]:
+        """Parties HTML et texte brut d'un email: (html, texte)"""
+        return self.render(name, **context), self.render_text(name, **context)
+
+    def _memoized(self, name: str, part: str, context: dict, render) -> str:
+        if self.cache_size <= 0 or self.env.auto_reload:
+            TEMPLATE_RENDERS.inc(name, "bypass")
+            return render(name, context)
+        try:
+            key = (name, part, frozenset(context.items()))
+            output = self._rendered.get(key)
+        except TypeError:
+            TEMPLATE_RENDERS.inc(name, "bypass")
+            return render(name, context)
+        if output is not None:
+            self._rendered.move_to_end(key)
+            self.hits += 1
+            TEMPLATE_RENDERS.inc(name, "hit")
+            return output
+        self.misses += 1
+        TEMPLATE_RENDERS.inc(name, "miss")
+        output = self._rendered[key] = render(name, context)
+        if len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+        return output
+
+    def _render_text(self, name: str, context: dict) -> str:
+        variables = {**self.static_vars, **context}
+        if name not in (LAYOUT,) + EMAIL_TEMPLATES:
+            return html_to_text(self._render(name, context))
+        template = self._text_templates.get(name)
+        if template is None or self.env.auto_reload:
+            template = self._text_templates[name] = self._compile_text(name)
+        return template.render(variables)
+
+    def _render(self, name: str, context: dict) -> str:
+        template = self.get_template(name)
+        variables = {**self.static_vars, **context}
+        if self._layout is not None and not self.env.auto_reload and name == LAYOUT and not context:
+            return "".join(self._layout)
+        # Seuls les templates d'email connus héritent du layout
+        if self._layout is None or self.env.auto_reload or name not in EMAIL_TEMPLATES:
+            return template.render(variables)
+        head, tail = self._layout
+        block = template.blocks[CONTENT_BLOCK]
+        return head + "".join(block(template.new_context(variables))) + tail
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "templates": len(self._templates),
+            "css_inlined": isinstance(self.env.loader, InliningLoader),
+            "render_cache_size": len(self._rendered),
+            "render_cache_max": self.cache_size,
+            "render_cache_hits": self.hits,
+            "render_cache_misses": self.misses,
+            "render_cache_hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Rendu partagé, chargé par le lifespan de l'application
+renderer = TemplateRenderer()
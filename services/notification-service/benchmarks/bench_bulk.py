@@ -0,0 +1,76 @@
+"""Débit de l'envoi groupé (/bulk) vs un appel par email, contre un aiosmtpd local.
+
+    cd services/notification-service
+    pip install aiosmtpd
+    python -m benchmarks.bench_bulk --emails 500 --sessions 4 --handshake-ms 50 --data-ms 20
+"""
+import argparse
+import asyncio
+import time
+
+from aiosmtpd.controller import Controller
+
+from app.services.email_service import build_message, render_notification, send_bulk
+from app.services.smtp_pool import SMTPPool
+from benchmarks.bench_smtp_throughput import PASSWORD, USER, SinkHandler, _free_port, authenticate
+
+
+def make_jobs(n: int) -> list:
+    return [
+        ("reservation_cancelled", {
+            "recipient_email": f"locataire{i}@example.com",
+            "recipient_name": f"Locataire {i}",
+            "cancelled_by": "le propriétaire",
+            "property_title": "Appartement Plateau",
+            "start_date": "2024-07-01",
+            "end_date": "2024-07-05",
+        })
+        for i in range(n)
+    ]
+
+
+def make_pool(port: int, size: int) -> SMTPPool:
+    return SMTPPool(hostname="127.0.0.1", port=port, username=USER, password=PASSWORD,
+                    start_tls=False, size=size, max_messages=100000)
+
+
+async def one_by_one(jobs: list, pool: SMTPPool):
+    # Équivalent d'un appel HTTP /reservation-cancelled par destinataire, l'un après l'autre
+    for kind, payload in jobs:
+        await pool.send(build_message(*render_notification(kind, payload)))
+
+
+async def main(args):
+    handler = SinkHandler(args.handshake_ms / 1000, args.data_ms / 1000)
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port,
+                            authenticator=authenticate, auth_require_tls=False)
+    controller.start()
+    jobs = make_jobs(args.emails)
+    try:
+        pool = make_pool(port, args.sessions)
+        start = time.perf_counter()
+        await one_by_one(jobs, pool)
+        elapsed = time.perf_counter() - start
+        await pool.close()
+        print(f"{'un appel par email':<24} {args.emails / elapsed:10,.1f} emails/s")
+
+        pool = make_pool(port, args.sessions)
+        start = time.perf_counter()
+        results = await send_bulk(jobs, pool=pool, sessions=args.sessions)
+        elapsed = time.perf_counter() - start
+        await pool.close()
+        failed = sum(1 for r in results if not r["success"])
+        print(f"{'bulk':<24} {args.emails / elapsed:10,.1f} emails/s  ({failed} échecs, "
+              f"{pool.created} sessions SMTP)")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    parser.add_argument("--data-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+"""Coût de construction + sérialisation d'un email, jusqu'aux octets transmis en DATA.
+
+Compare l'ancien MIMEMultipart (HTML seul), le même avec une partie texte
+convertie à chaque envoi, et build_message() (texte pré-compilé par
+template, bloc d'en-têtes de l'expéditeur réutilisé).
+
+    cd services/notification-service
+    python -m benchmarks.bench_mime --messages 5000
+"""
+import argparse
+import time
+from email import message_from_bytes
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.policy import default
+
+from aiosmtplib.email import flatten_message
+
+from app.config import settings
+from app.services.email_service import build_message, render_notification
+from app.services.html_text import html_to_text
+from app.services.templates import renderer
+from benchmarks.bench_templates import CONTEXTS
+
+JOB = ("reservation_confirmed", dict(CONTEXTS["reservation_confirmed.html"], tenant_email="marie@example.com"))
+
+
+def legacy_message(to_email: str, subject: str, html_content: str, text_content: str = None) -> bytes:
+    message = MIMEMultipart("alternative")
+    message["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM_EMAIL}>"
+    message["To"] = to_email
+    message["Subject"] = subject
+    if text_content is not None:
+        message.attach(MIMEText(text_content, "plain"))
+    message.attach(MIMEText(html_content, "html"))
+    return flatten_message(message)
+
+
+def rate(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def main(args):
+    renderer.load()
+    kind, payload = JOB
+    to_email, subject, html_content, text_content = render_notification(kind, payload)
+
+    parsed = message_from_bytes(build_message(to_email, subject, html_content, text_content).data, policy=default)
+    assert [part.get_content() for part in parsed.iter_parts()] == [text_content, html_content]
+    assert parsed["Subject"] == subject and parsed["To"] == to_email
+
+    html_only = rate(lambda: legacy_message(to_email, subject, html_content), args.messages)
+    with_text = rate(lambda: legacy_message(to_email, subject, html_content, html_to_text(html_content)), args.messages)
+    # Rendu compris (mêmes données: servi par le LRU du renderer)
+    fast = rate(lambda: build_message(*render_notification(kind, payload)).data, args.messages)
+    fast_no_render = rate(lambda: build_message(to_email, subject, html_content, text_content).data, args.messages)
+
+    for label, value in (
+        ("MIMEMultipart, HTML seul", html_only),
+        ("MIMEMultipart + texte converti par envoi", with_text),
+        ("build_message (rendu compris)", fast),
+        ("build_message (sérialisation seule)", fast_no_render),
+    ):
+        print(f"{label:<42} {value:10,.0f} messages/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,54 @@
+"""Débit d'écriture de l'outbox: un COMMIT (fsync) par notification vs group commit.
+
+    cd services/notification-service
+    python -m benchmarks.bench_outbox --enqueues 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+from app.services.outbox import Outbox
+
+PAYLOAD = {
+    "recipient_email": "locataire@example.com",
+    "recipient_name": "Marie",
+    "cancelled_by": "le propriétaire",
+    "property_title": "Appartement Plateau",
+    "start_date": "2024-07-01",
+    "end_date": "2024-07-05",
+}
+
+
+async def run(label: str, n: int, concurrency: int, batch_size: int, synchronous: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(os.path.join(tmp, "outbox.sqlite3"), batch_size=batch_size, synchronous=synchronous)
+        await outbox.open()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                await outbox.add(uuid.uuid4().hex, "reservation_cancelled", PAYLOAD, time.time())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n)))
+        elapsed = time.perf_counter() - start
+        await outbox.close()
+        print(f"{label:<34} {n / elapsed:10,.0f} enqueues/s  "
+              f"{outbox.commits:6} commits ({outbox.writes / outbox.commits:.1f} écritures/commit)")
+
+
+async def main(args):
+    await run("un commit par notification", args.enqueues, args.concurrency, 1, args.synchronous)
+    await run("group commit", args.enqueues, args.concurrency, args.batch_size, args.synchronous)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--enqueues", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--synchronous", default="FULL")
+    asyncio.run(main(parser.parse_args()))
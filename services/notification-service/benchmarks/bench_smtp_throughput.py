@@ -0,0 +1,121 @@
+"""Débit d'envoi: une connexion SMTP par email (ancien code) vs pool persistant.
+
+Le serveur de remplacement est un aiosmtpd local (AUTH LOGIN/PLAIN, sans TLS).
+`--handshake-ms` simule le coût réseau de l'établissement d'une session
+(EHLO/STARTTLS/AUTH vers un vrai fournisseur).
+
+    cd services/notification-service
+    pip install aiosmtpd
+    python -m benchmarks.bench_smtp_throughput --emails 500 --concurrency 20 --pool-size 4 --handshake-ms 50
+"""
+import argparse
+import asyncio
+import socket
+import logging
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from app.services.smtp_pool import SMTPPool
+
+USER, PASSWORD = "bench", "secret"
+
+# aiosmtpd 1.4 journalise un avertissement de dépréciation à chaque AUTH
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+
+class SinkHandler:
+    """Accepte et jette les messages; retarde EHLO pour simuler la poignée de main,
+    et DATA pour simuler le temps de traitement du fournisseur"""
+
+    def __init__(self, handshake_delay: float, data_delay: float = 0.0):
+        self.handshake_delay = handshake_delay
+        self.data_delay = data_delay
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_delay:
+            await asyncio.sleep(self.data_delay)
+        self.received += 1
+        return "250 OK"
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=auth_data.login == USER.encode() and auth_data.password == PASSWORD.encode())
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_message(i: int) -> MIMEMultipart:
+    message = MIMEMultipart("alternative")
+    message["From"] = "LocaHome <noreply@locahome.com>"
+    message["To"] = f"user{i}@example.com"
+    message["Subject"] = f"Réservation confirmée #{i}"
+    message.attach(MIMEText("\n".join(f"<p>Ligne {n} du gabarit de réservation</p>" for n in range(60)), "html"))
+    return message
+
+
+async def run(label: str, n: int, concurrency: int, send):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await send(make_message(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n / elapsed:10,.1f} emails/s  ({elapsed:.2f} s pour {n})")
+
+
+async def main(args):
+    handler = SinkHandler(args.handshake_ms / 1000)
+    port = _free_port()
+    controller = Controller(
+        handler, hostname="127.0.0.1", port=port,
+        authenticator=authenticate, auth_require_tls=False,
+    )
+    controller.start()
+    try:
+        async def per_message(message):
+            await aiosmtplib.send(
+                message, hostname="127.0.0.1", port=port,
+                username=USER, password=PASSWORD, start_tls=False,
+            )
+
+        await run("connexion par email", args.emails, args.concurrency, per_message)
+
+        pool = SMTPPool(
+            hostname="127.0.0.1", port=port, username=USER, password=PASSWORD,
+            start_tls=False, size=args.pool_size, max_messages=args.emails,
+        )
+        await pool.start()
+        await run(f"pool ({args.pool_size} connexions)", args.emails, args.concurrency, pool.send)
+        await pool.close()
+        print(f"pool: {pool.stats()}")
+        print(f"reçus par le serveur: {handler.received}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Rendus par seconde des six templates: Environment par défaut, rendu pré-compilé
+(CSS inliné au chargement) et rendu mémorisé (même contexte rendu à nouveau).
+
+    cd services/notification-service
+    python -m benchmarks.bench_templates --renders 5000
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.config import settings
+from app.services.css_inline import Stylesheet, inline_css
+from app.services.templates import EMAIL_TEMPLATES, LAYOUT, InliningLoader, TemplateRenderer, template_dir
+
+CONTEXTS = {
+    LAYOUT: {},
+    "welcome.html": {"first_name": "Marie", "role": "locataire"},
+    "new_reservation.html": {"owner_name": "Jean", "tenant_name": "Marie", "property_title": "Appartement Plateau",
+                             "start_date": "2024-07-01", "end_date": "2024-07-05", "total_price": 480.0},
+    "reservation_confirmed.html": {"tenant_name": "Marie", "property_title": "Appartement Plateau",
+                                   "property_address": "123 rue Saint-Denis, Montréal",
+                                   "start_date": "2024-07-01", "end_date": "2024-07-05", "total_price": 480.0},
+    "reservation_rejected.html": {"tenant_name": "Marie", "property_title": "Appartement Plateau",
+                                  "start_date": "2024-07-01", "end_date": "2024-07-05",
+                                  "rejection_reason": "Dates déjà réservées"},
+    "reservation_cancelled.html": {"recipient_name": "Marie", "cancelled_by": "le propriétaire",
+                                   "property_title": "Appartement Plateau",
+                                   "start_date": "2024-07-01", "end_date": "2024-07-05"},
+}
+
+
+def rate(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def cold_start(bytecode_dir=None) -> float:
+    """Temps de compilation des six templates dans un Environment neuf"""
+    cache = FileSystemBytecodeCache(bytecode_dir) if bytecode_dir else None
+    environment = Environment(loader=FileSystemLoader(template_dir), bytecode_cache=cache)
+    start = time.perf_counter()
+    for name in (LAYOUT,) + EMAIL_TEMPLATES:
+        environment.get_template(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(args):
+    # Ancien code: Environment par défaut, get_template() + render() complet à chaque envoi
+    legacy = Environment(loader=FileSystemLoader(template_dir))
+    inlined = Environment(loader=InliningLoader(template_dir), auto_reload=False)
+    renderer = TemplateRenderer(inlined, cache_size=0)
+    renderer.load()
+    memoized = TemplateRenderer(inlined)
+    memoized.load()
+    stylesheet = Stylesheet.from_html(legacy.loader.get_source(legacy, LAYOUT)[0])
+
+    print(f"{'template':<28} {'défaut':>12} {'+ inlining':>12} {'pré-compilé':>12} {'mémorisé':>12}")
+    for name, context in CONTEXTS.items():
+        full = dict(context, frontend_url=settings.FRONTEND_URL)
+        assert renderer.render(name, **context) == inlined.get_template(name).render(**full), name
+        assert memoized.render(name, **context) == renderer.render(name, **context), name
+        before = rate(lambda: legacy.get_template(name).render(**full), args.renders)
+        # Ce que coûterait un inlining à chaque envoi (passe de type premailer)
+        per_message = rate(lambda: inline_css(legacy.get_template(name).render(**full), stylesheet), args.renders // 10)
+        after = rate(lambda: renderer.render(name, **context), args.renders)
+        cached = rate(lambda: memoized.render(name, **context), args.renders)
+        print(f"{name:<28} {before:10,.0f}/s {per_message:10,.0f}/s {after:10,.0f}/s {cached:10,.0f}/s")
+
+    tmp = tempfile.mkdtemp()
+    try:
+        without = cold_start()
+        cold_start(tmp)  # remplit le cache
+        with_cache = cold_start(tmp)
+        print(f"démarrage à froid: {without:.1f} ms sans cache de bytecode, {with_cache:.1f} ms avec")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=5000)
+    main(parser.parse_args())